@@ -0,0 +1,212 @@
+"""路径检测基准测试 - 在临时目录中构造模拟安装树，测量 PathDetector 的耗时与文件系统调用次数
+
+用法（任意平台均可运行，不需要 Windows 与真实安装）：
+    python benchmarks/bench_path_detector.py
+    python benchmarks/bench_path_detector.py --users 200 --wps-versions 3 --langs 8 --repeat 5
+
+模拟树结构（每个盘符对应 <临时目录>/<盘符>）：
+    C/Users/<用户>/AppData/Local/Kingsoft/WPS Office/<版本>/office6/mui/<语言>/resource/splash
+    C/Users/<用户>/AppData/Roaming/Seewo/EasiNote5/Resources/Banner/Banner.png
+    C/Program Files (x86)/Seewo/EasiNote5/EasiNote5_<版本>/Main/...
+    D/Program Files/Kingsoft/WPS Office/office6/mui/<语言>/res/splash
+以及若干不含目标文件的干扰目录。
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# 允许直接以脚本方式运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.path_detector import PathDetector
+from utils.registry_index import FakeRegistryProvider, set_registry_provider, get_uninstall_index
+from utils.scan_engine import ScanSession, set_fs_root
+
+
+PNG_STUB = b"\x89PNG\r\n\x1a\n"
+
+
+def _touch(path, data=PNG_STUB):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _make_wps_splash(splash_dir):
+    """创建一个完整的 WPS splash 目录（根目录与 hdpi 各一套启动图）"""
+    for name in PathDetector.WPS_SPLASH_FILES:
+        _touch(os.path.join(splash_dir, name))
+        _touch(os.path.join(splash_dir, "hdpi", name))
+
+
+def build_tree(root, args):
+    """构造模拟安装树
+
+    Returns:
+        dict: 预期的检测结果数量 {"banner", "splashscreen", "wps_users", "wps_program_files"}
+    """
+    langs = [f"lang_{k:02d}" for k in range(args.langs)]
+    expected = {"banner": 0, "splashscreen": 0, "wps_users": 0, "wps_program_files": 0}
+
+    users_dir = os.path.join(root, "C", "Users")
+    for i in range(args.users):
+        user_dir = os.path.join(users_dir, f"user{i:04d}")
+        local = os.path.join(user_dir, "AppData", "Local")
+        roaming = os.path.join(user_dir, "AppData", "Roaming")
+        os.makedirs(os.path.join(user_dir, "Documents"), exist_ok=True)
+
+        # 每隔 args.wps_every 个用户安装一份 WPS，只有最后一个语言目录包含完整的启动图
+        if args.wps_every and i % args.wps_every == 0:
+            wps_base = os.path.join(local, "Kingsoft", "WPS Office")
+            for v in range(args.wps_versions):
+                version_dir = os.path.join(wps_base, f"12.1.0.{20000 + v}")
+                for lang in langs:
+                    os.makedirs(os.path.join(version_dir, "office6", "mui", lang, "resource"), exist_ok=True)
+                os.makedirs(os.path.join(version_dir, "office6", "addons"), exist_ok=True)
+            _make_wps_splash(os.path.join(
+                wps_base, f"12.1.0.{20000 + args.wps_versions - 1}",
+                "office6", "mui", langs[-1], "resource", "splash",
+            ))
+            expected["wps_users"] += 1
+
+        # 每隔 args.banner_every 个用户安装一份希沃白板 Banner
+        if args.banner_every and i % args.banner_every == 0:
+            _touch(os.path.join(roaming, "Seewo", "EasiNote5", "Resources", "Banner", "Banner.png"))
+            expected["banner"] += 1
+
+        for d in range(args.decoys):
+            os.makedirs(os.path.join(local, f"Vendor{d:02d}", "App", "cache"), exist_ok=True)
+            os.makedirs(os.path.join(roaming, f"Vendor{d:02d}", "settings"), exist_ok=True)
+
+    # 希沃白板安装目录：新旧两种布局交替
+    easinote_base = os.path.join(root, "C", "Program Files (x86)", "Seewo", "EasiNote5")
+    for v in range(args.easinote_versions):
+        version_dir = os.path.join(easinote_base, f"EasiNote5_5.2.{v}.{1000 + v}")
+        if v % 2 == 0:
+            _touch(os.path.join(version_dir, "Main", "Resources", "Startup", "SplashScreen.png"))
+        else:
+            _touch(os.path.join(version_dir, "Main", "Assets", "SplashScreen.png"))
+        expected["splashscreen"] += 1
+    os.makedirs(os.path.join(easinote_base, "Logs"), exist_ok=True)
+
+    # D 盘 Program Files 下的 WPS（旧版 res 布局）
+    wps_pf = os.path.join(root, "D", "Program Files", "Kingsoft", "WPS Office", "office6")
+    for lang in langs:
+        os.makedirs(os.path.join(wps_pf, "mui", lang, "res"), exist_ok=True)
+    _make_wps_splash(os.path.join(wps_pf, "mui", langs[0], "res", "splash"))
+    expected["wps_program_files"] += 1
+
+    # Program Files 下的干扰目录
+    for drive in ("C", "D"):
+        for d in range(args.decoys):
+            os.makedirs(os.path.join(root, drive, "Program Files", f"Vendor{d:02d}", "bin"), exist_ok=True)
+    os.makedirs(os.path.join(root, "D", "Users"), exist_ok=True)
+
+    return expected
+
+
+def build_registry(args):
+    """构造模拟注册表：大量无关卸载项 + 一条希沃白板卸载项"""
+    provider = FakeRegistryProvider()
+    for i in range(args.registry_entries):
+        provider.add_uninstall_entry(f"{{APP-{i:05d}}}", f"Some Application {i}", f"C:\\Apps\\App{i}")
+    provider.add_uninstall_entry("EasiNote5", "希沃白板5", "")
+    return provider
+
+
+def _timeit(func, repeat):
+    """多次运行 func(session)，返回 (结果, 耗时列表, 最后一次的调用计数)"""
+    times = []
+    result = None
+    session = None
+    for _ in range(repeat):
+        session = ScanSession()
+        start = time.perf_counter()
+        result = func(session)
+        times.append(time.perf_counter() - start)
+    return result, times, session.stats.snapshot()
+
+
+def _report(name, result, times, stats, expected=None):
+    count = len(result)
+    check = "" if expected is None else (" ✓" if count == expected else f" ✗ (预期 {expected})")
+    print(
+        f"{name:<28} 最短 {min(times) * 1000:8.2f} ms  中位 {statistics.median(times) * 1000:8.2f} ms  "
+        f"scandir {stats.get('scandir', 0):6d}  stat {stats.get('stat', 0):6d}  "
+        f"结果 {count}{check}"
+    )
+
+
+def run(args):
+    root = tempfile.mkdtemp(prefix="seewo-bench-")
+    old_userprofile = os.environ.get("USERPROFILE")
+    try:
+        start = time.perf_counter()
+        expected = build_tree(root, args)
+        print(f"模拟树构建完成: {root}（{(time.perf_counter() - start):.2f} s）")
+        print(
+            f"  用户 {args.users}，WPS 版本 {args.wps_versions}，语言 {args.langs}，"
+            f"希沃白板版本 {args.easinote_versions}，干扰目录 {args.decoys}，"
+            f"注册表卸载项 {args.registry_entries}\n"
+        )
+
+        set_fs_root(root)
+        # 当前用户不含 WPS，迫使检测遍历其他所有用户目录
+        os.environ["USERPROFILE"] = os.path.join(root, "C", "Users", "current")
+        os.makedirs(os.environ["USERPROFILE"], exist_ok=True)
+
+        provider = build_registry(args)
+        set_registry_provider(provider)
+        start = time.perf_counter()
+        get_uninstall_index()
+        print(
+            f"{'注册表索引':<28} 耗时 {(time.perf_counter() - start) * 1000:8.2f} ms  "
+            f"打开键 {provider.open_count}\n"
+        )
+
+        result, times, stats = _timeit(PathDetector.detect_all_paths, args.repeat)
+        _report("detect_all_paths", result, times, stats, expected["banner"] + expected["splashscreen"])
+
+        result, times, stats = _timeit(PathDetector.detect_wps_paths, args.repeat)
+        _report("detect_wps_paths", result, times, stats, 1)
+
+        result, times, stats = _timeit(lambda session: list(PathDetector.iter_wps_paths(session=session)), args.repeat)
+        _report(
+            "iter_wps_paths (全部)", result, times, stats,
+            expected["wps_users"] + expected["wps_program_files"],
+        )
+    finally:
+        set_fs_root(None)
+        set_registry_provider(None)
+        if old_userprofile is None:
+            os.environ.pop("USERPROFILE", None)
+        else:
+            os.environ["USERPROFILE"] = old_userprofile
+        if args.keep:
+            print(f"\n已保留模拟树: {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PathDetector 基准测试")
+    parser.add_argument("--users", type=int, default=50, help="用户目录数量")
+    parser.add_argument("--wps-versions", type=int, default=2, help="每个用户的 WPS 版本目录数量")
+    parser.add_argument("--langs", type=int, default=4, help="每个 WPS 版本的 mui 语言目录数量")
+    parser.add_argument("--easinote-versions", type=int, default=4, help="希沃白板版本目录数量")
+    parser.add_argument("--decoys", type=int, default=5, help="每个用户 / Program Files 下的干扰目录数量")
+    parser.add_argument("--wps-every", type=int, default=5, help="每隔多少个用户安装一份 WPS（0 表示不安装）")
+    parser.add_argument("--banner-every", type=int, default=3, help="每隔多少个用户存在 Banner.png（0 表示不存在）")
+    parser.add_argument("--registry-entries", type=int, default=500, help="模拟注册表中的无关卸载项数量")
+    parser.add_argument("--repeat", type=int, default=3, help="每项检测的运行次数")
+    parser.add_argument("--keep", action="store_true", help="保留生成的模拟树")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""写入方式基准测试 - 比较 copy / kernel / reflink / hardlink 四种写入方式部署启动图的耗时
+
+用法：
+    python benchmarks/bench_write_modes.py
+    python benchmarks/bench_write_modes.py --size-kb 2048 --targets 12 --repeat 10
+    python benchmarks/bench_write_modes.py --dir D:\\bench   # 指定测试目录（测试不同文件系统）
+
+每种方式分别测量：
+    atomic_write         直接写入全部目标（临时文件 + os.replace）
+    replace_multiple     通过 ImageReplacer 批量替换（两张源图片交替，避免“已是最新”跳过写入）
+当前平台或文件系统不支持某种方式时会自动回退，“实际”一列显示真正使用的方式。
+批量替换还会输出 ImageReplacer.call_stats 统计的平均每个目标的系统调用次数。
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# 允许直接以脚本方式运行
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.replacer import ImageReplacer
+from core.write_strategies import WRITE_MODES, atomic_write
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _make_source(path, size):
+    with open(path, "wb") as f:
+        f.write(PNG_SIGNATURE + os.urandom(max(0, size - len(PNG_SIGNATURE))))
+
+
+def _make_targets(root, count):
+    targets = []
+    for i in range(count):
+        path = os.path.join(root, "targets", f"user{i:03d}", "Banner.png")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(PNG_SIGNATURE + b"original")
+        targets.append(path)
+    return targets
+
+
+def _report(name, mode, used, times, total_bytes):
+    best = min(times)
+    throughput = total_bytes / best / (1024 * 1024) if best > 0 else 0.0
+    print(
+        f"{name:<18} {mode:<9} 实际 {used:<9} 最短 {best * 1000:8.2f} ms  "
+        f"中位 {statistics.median(times) * 1000:8.2f} ms  {throughput:8.1f} MB/s"
+    )
+
+
+def bench_atomic_write(source, targets, mode, repeat):
+    times = []
+    used = set()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for target in targets:
+            used.add(atomic_write(source, target, mode)[0])
+        times.append(time.perf_counter() - start)
+    return "/".join(sorted(used)), times
+
+
+def bench_replacer(root, sources, targets, mode, repeat):
+    replacer = ImageReplacer(backup_dir=os.path.join(root, f"backups_{mode}"), write_mode=mode)
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        success, msg, _, _, failed, _ = replacer.replace_multiple_images(sources[i % 2], targets)
+        times.append(time.perf_counter() - start)
+        if failed:
+            print(f"  警告: {msg}")
+    return times, replacer.call_stats.snapshot().get("replace")
+
+
+def run(args):
+    root = tempfile.mkdtemp(prefix="seewo-write-bench-", dir=args.dir)
+    try:
+        size = args.size_kb * 1024
+        sources = [os.path.join(root, "library", name) for name in ("a.png", "b.png")]
+        os.makedirs(os.path.dirname(sources[0]), exist_ok=True)
+        for source in sources:
+            _make_source(source, size)
+        targets = _make_targets(root, args.targets)
+        total_bytes = size * len(targets)
+
+        print(f"测试目录: {root}")
+        print(f"  源图片 {args.size_kb} KB，目标 {args.targets} 个，每项运行 {args.repeat} 次\n")
+
+        actual = {}
+        for mode in WRITE_MODES:
+            actual[mode], times = bench_atomic_write(sources[0], targets, mode, args.repeat)
+            _report("atomic_write", mode, actual[mode], times, total_bytes)
+
+        print()
+        for mode in WRITE_MODES:
+            # 每种方式都从原始目标开始，第一次运行包含备份原始文件，单独列出
+            shutil.rmtree(os.path.join(root, "targets"))
+            targets = _make_targets(root, args.targets)
+            times, call_totals = bench_replacer(root, sources, targets, mode, args.repeat)
+            print(f"{'首次替换（含备份）':<18} {mode:<9} 耗时 {times[0] * 1000:8.2f} ms")
+            if len(times) > 1:
+                _report("replace_multiple", mode, actual[mode], times[1:], total_bytes)
+            if call_totals:
+                syscalls = call_totals["syscalls"]
+                per_target = sum(syscalls.values()) / call_totals["calls"]
+                detail = ", ".join(f"{name} {n}" for name, n in sorted(syscalls.items()))
+                print(f"{'':<18} 平均每个目标 {per_target:.1f} 次调用（{detail}）")
+    finally:
+        if args.keep:
+            print(f"\n已保留测试目录: {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="写入方式基准测试")
+    parser.add_argument("--size-kb", type=int, default=1024, help="源图片大小（KB）")
+    parser.add_argument("--targets", type=int, default=6, help="目标文件数量")
+    parser.add_argument("--repeat", type=int, default=5, help="每项测试的运行次数")
+    parser.add_argument("--dir", default=None, help="测试目录所在位置（默认系统临时目录）")
+    parser.add_argument("--keep", action="store_true", help="保留生成的测试目录")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,528 @@
+# file: core/backup_manifest.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from core.png_header import read_png_size
+
+
+# 旧版备份文件名：<原文件名>_<YYYYmmdd_HHMMSS>.png
+LEGACY_BACKUP_PATTERN = re.compile(r"^(?P<stem>.+)_(?P<stamp>\d{8}_\d{6})\.png$", re.IGNORECASE)
+# 对象文件名：<sha256>.png（写入中的临时文件等其他文件名不属于对象）
+OBJECT_FILE_PATTERN = re.compile(r"^[0-9a-f]{64}\.png$")
+
+
+def target_key(target_path):
+    """备份索引的键：规范化后的完整目标路径（忽略大小写与分隔符差异）"""
+    return os.path.normcase(os.path.abspath(target_path))
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """流式计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def describe_compaction(report):
+    """备份压缩结果的简短说明"""
+    removed = len(report["removed"]) + report["removed_objects"]
+    action = "将删除" if report.get("dry_run") else "已删除"
+    return (
+        f"{action} {removed} 个备份文件，释放 {report['freed'] / 1024:.1f} KB"
+        f"（{report['total_before'] / 1024:.1f} KB → {report['total_after'] / 1024:.1f} KB）"
+    )
+
+
+class BackupManifest:
+    """备份索引 - 以完整目标路径为键记录每个备份
+
+    索引保存在备份目录下的 manifest.json：
+        {
+            "version": 2,
+            "entries": {规范化目标路径: {"target", "file", "sha256", "size", "created"
+                                          [, "legacy", "own", "deployed", "history"]}},
+            "legacy": {规范化原文件名: [旧版备份文件名, ...]}
+        }
+    查找备份只需一次字典查询，不再列举备份目录；WPS 根目录与 hdpi 下的同名文件、
+    不同用户的 Banner.png 各自拥有独立的备份。
+
+    备份内容按哈希去重保存在 objects/<sha256>.png 中，每个不同的原始文件只保存一份；
+    记录中的 "file" 指向对应的对象文件，多个目标可以引用同一个对象。
+    不再被任何记录引用的对象由 gc() 清理。
+
+    "deployed" 是程序最近一次写入目标的内容哈希。目标内容既不是已备份的原始文件、
+    也不是程序写入的内容时，说明原始文件已被替换（如希沃更新），新的原始文件作为
+    新一代备份登记（见 record_generation），被取代的各代按时间从早到晚保存在 "history" 中。
+
+    同一原文件名的多个旧版备份同样是该目标的多代备份，最早的一代是原始文件；
+    compact() 按保留策略删除被取代的各代备份：旧版备份中最早的一代、各记录当前的
+    一代与仍被引用的备份始终保留。
+
+    首次运行时（manifest.json 不存在）会列举一次备份目录，把旧版按文件名前缀
+    匹配的 *_YYYYmmdd_HHMMSS.png 备份登记到 legacy 中，并在迁移时一次性把旧版备份
+    分配给已知的目标（见 _adopt_legacy）。旧版备份无法得知原始完整路径，每个旧版备份
+    至多分配给一个目标，无法确定归属时不分配；lookup() 只读取索引，没有副作用。
+    分配得到的记录带有 "legacy": True，对应目标之后自己的原始文件另行备份在 "own" 中
+    （见 record_own），不会因为分配了旧版备份而跳过。
+    """
+
+    MANIFEST_VERSION = 2
+    MANIFEST_FILE = "manifest.json"
+    OBJECTS_DIR = "objects"
+
+    def __init__(self, backup_dir, known_targets=None):
+        """
+        Args:
+            backup_dir: 备份目录
+            known_targets: 迁移旧版备份时可以分配的目标路径，或返回路径列表的函数
+                （只在需要迁移时调用）
+        """
+        self.backup_dir = backup_dir
+        self.manifest_file = os.path.join(backup_dir, self.MANIFEST_FILE)
+        self._lock = threading.RLock()
+        self._known_targets = known_targets
+        self.data = self.load()
+
+    def load(self):
+        """加载索引，索引不存在或为旧版本时迁移旧版备份"""
+        data = None
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"加载备份索引失败: {e}")
+        if isinstance(data, dict) and data.get("version") == self.MANIFEST_VERSION:
+            data.setdefault("entries", {})
+            data.setdefault("legacy", {})
+            return data
+
+        if isinstance(data, dict) and data.get("version") == 1:
+            # 版本 1 在查询时按原文件名分配旧版备份，同名目标可能分到同一个文件：丢弃这些分配重新迁移
+            entries = {key: entry for key, entry in data.get("entries", {}).items() if not entry.get("legacy")}
+            legacy = data.get("legacy") or self._scan_legacy_backups()
+        else:
+            entries = {}
+            legacy = self._scan_legacy_backups()
+        self.data = {"version": self.MANIFEST_VERSION, "entries": entries, "legacy": legacy}
+        self._adopt_legacy()
+        self.save()
+        return self.data
+
+    @property
+    def lock(self):
+        """备份写入与清理共用的锁：写入对象文件并登记的过程中不会执行 gc"""
+        return self._lock
+
+    def save(self):
+        """保存索引（先写临时文件再替换，避免中途退出留下损坏的索引）"""
+        with self._lock:
+            try:
+                os.makedirs(self.backup_dir, exist_ok=True)
+                tmp_file = self.manifest_file + ".tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_file, self.manifest_file)
+                return True
+            except Exception as e:
+                print(f"保存备份索引失败: {e}")
+                return False
+
+    def _scan_legacy_backups(self):
+        """列举备份目录，按原文件名归类旧版备份（按时间从早到晚）"""
+        legacy = {}
+        try:
+            filenames = os.listdir(self.backup_dir)
+        except OSError:
+            return legacy
+        for filename in filenames:
+            match = LEGACY_BACKUP_PATTERN.match(filename)
+            if match:
+                legacy.setdefault(os.path.normcase(match.group("stem")), []).append(filename)
+        for stem in legacy:
+            legacy[stem].sort(key=lambda name: LEGACY_BACKUP_PATTERN.match(name).group("stamp"))
+        return legacy
+
+    def backup_path(self, entry):
+        """备份记录对应的备份文件路径"""
+        return os.path.join(self.backup_dir, entry["file"])
+
+    def lookup(self, target_path):
+        """查找目标文件的备份记录（只读取索引）
+
+        Returns:
+            dict | None: 备份记录，没有备份时返回 None
+        """
+        with self._lock:
+            return self.data["entries"].get(target_key(target_path))
+
+    def _adopt_legacy(self):
+        """迁移时把旧版备份分配给已知的目标（每个旧版备份至多分配给一个目标）
+
+        按原文件名分组：
+            - 只有一个已知目标使用该文件名时，分配最早的一代（原始文件）
+            - 多个目标同名（如 WPS 根目录与 hdpi、不同用户的 Banner.png）时，按 PNG 宽高匹配：
+              只有当某个尺寸恰好对应一个目标时，才把该尺寸最早的旧版备份分配给它
+        无法确定归属的目标不分配，替换时会备份它们自己的原始文件。
+        """
+        known = self._known_targets() if callable(self._known_targets) else self._known_targets
+        by_stem = {}
+        for target_path in known or ():
+            key = target_key(target_path)
+            if key in self.data["entries"] or not os.path.isfile(target_path):
+                continue
+            stem = os.path.normcase(os.path.splitext(os.path.basename(target_path))[0])
+            by_stem.setdefault(stem, {})[key] = target_path
+
+        for stem, targets in by_stem.items():
+            filenames = [
+                name for name in self.data["legacy"].get(stem, [])
+                if os.path.isfile(os.path.join(self.backup_dir, name))
+            ]
+            if not filenames:
+                continue
+            if len(targets) == 1:
+                self._adopt(next(iter(targets.values())), filenames[0])
+                continue
+            target_sizes = {}
+            for target_path in targets.values():
+                target_sizes.setdefault(read_png_size(target_path), []).append(target_path)
+            adopted = set()
+            for filename in filenames:
+                size = read_png_size(os.path.join(self.backup_dir, filename))
+                matches = target_sizes.get(size) if size is not None else None
+                if matches and len(matches) == 1 and size not in adopted:
+                    adopted.add(size)
+                    self._adopt(matches[0], filename)
+
+    def _adopt(self, target_path, filename):
+        """把一个旧版备份登记为目标的备份"""
+        path = os.path.join(self.backup_dir, filename)
+        try:
+            size = os.path.getsize(path)
+            sha256 = file_sha256(path)
+        except OSError:
+            return
+        self.data["entries"][target_key(target_path)] = {
+            "target": target_path,
+            "file": filename,
+            "sha256": sha256,
+            "size": size,
+            "created": os.path.getmtime(path),
+            "legacy": True,
+        }
+
+    def object_filename(self, sha256):
+        """内容哈希对应的对象文件名（相对备份目录）"""
+        return f"{self.OBJECTS_DIR}/{sha256}.png"
+
+    def object_path(self, sha256):
+        """内容哈希对应的对象文件路径"""
+        return os.path.join(self.backup_dir, self.OBJECTS_DIR, f"{sha256}.png")
+
+    def has_object(self, sha256):
+        """对象文件是否已存在"""
+        return os.path.isfile(self.object_path(sha256))
+
+    def record(self, target_path, filename, sha256, size):
+        """登记一个新备份并保存索引（已有记录的历史各代保留）"""
+        entry = {
+            "target": target_path,
+            "file": filename,
+            "sha256": sha256,
+            "size": size,
+            "created": time.time(),
+        }
+        with self._lock:
+            key = target_key(target_path)
+            previous = self.data["entries"].get(key)
+            if previous and previous.get("history"):
+                entry["history"] = previous["history"]
+            self.data["entries"][key] = entry
+            self.save()
+        return entry
+
+    def record_generation(self, target_path, filename, sha256, size):
+        """登记目标新一代的原始文件并保存索引，原来的一代移入 "history"，新的一代作为还原来源"""
+        with self._lock:
+            entry = self.data["entries"].get(target_key(target_path))
+            if entry is None:
+                return self.record(target_path, filename, sha256, size)
+            previous = {name: entry[name] for name in ("file", "sha256", "size", "created")}
+            entry.setdefault("history", []).append(previous)
+            entry.update(file=filename, sha256=sha256, size=size, created=time.time())
+            entry.pop("deployed", None)
+            self.save()
+        return entry
+
+    def mark_deployed(self, target_path, sha256):
+        """记录程序写入目标的内容哈希（目标没有备份记录时忽略）"""
+        with self._lock:
+            entry = self.data["entries"].get(target_key(target_path))
+            if entry is None or entry.get("deployed") == sha256:
+                return
+            entry["deployed"] = sha256
+            self.save()
+
+    def record_own(self, target_path, filename, sha256, size):
+        """为使用旧版备份的目标登记它自己的原始文件（旧版备份仍是还原来源）并保存索引"""
+        with self._lock:
+            entry = self.data["entries"].get(target_key(target_path))
+            if entry is None:
+                return self.record(target_path, filename, sha256, size)
+            entry["own"] = {"file": filename, "sha256": sha256, "size": size, "created": time.time()}
+            self.save()
+        return entry
+
+    @staticmethod
+    def needs_own_backup(entry, sha256):
+        """目标当前内容为 sha256 时，是否还需要备份它自己的原始文件
+
+        只有分配了旧版备份、当前内容与旧版备份不同、且尚未登记自己的原始文件时才需要。
+        """
+        return bool(entry.get("legacy")) and "own" not in entry and entry["sha256"] != sha256
+
+    @staticmethod
+    def needs_new_generation(entry, sha256):
+        """目标当前内容为 sha256 时，是否需要作为新一代原始文件备份
+
+        只有程序写入过目标（记录了 "deployed"），且当前内容既不是已备份的原始文件、
+        也不是程序写入的内容时才需要；旧版备份的记录由 needs_own_backup 处理。
+        """
+        return (
+            not entry.get("legacy")
+            and "deployed" in entry
+            and sha256 not in (entry["sha256"], entry["deployed"])
+        )
+
+    @staticmethod
+    def _normalize_file(filename):
+        return os.path.normcase(os.path.normpath(filename))
+
+    def _reference_counts(self):
+        """每个备份文件被记录引用的次数（相对备份目录，已规范化）"""
+        counts = {}
+        for entry in self.data["entries"].values():
+            generations = [entry, *entry.get("history", [])]
+            if "own" in entry:
+                generations.append(entry["own"])
+            for generation in generations:
+                filename = self._normalize_file(generation["file"])
+                counts[filename] = counts.get(filename, 0) + 1
+        return counts
+
+    def referenced_files(self):
+        """所有记录引用的备份文件（相对备份目录，已规范化）"""
+        with self._lock:
+            return set(self._reference_counts())
+
+    @staticmethod
+    def _legacy_created(path, filename):
+        """旧版备份的创建时间：优先取文件名中的时间戳，无法解析时取修改时间"""
+        match = LEGACY_BACKUP_PATTERN.match(filename)
+        if match:
+            try:
+                return time.mktime(time.strptime(match.group("stamp"), "%Y%m%d_%H%M%S"))
+            except ValueError:
+                pass
+        return os.path.getmtime(path)
+
+    def total_size(self):
+        """备份占用的总字节数（对象文件与旧版备份，不含索引与写入中的临时文件）"""
+        total = 0
+        with self._lock:
+            for directory in (self.backup_dir, os.path.join(self.backup_dir, self.OBJECTS_DIR)):
+                try:
+                    entries = list(os.scandir(directory))
+                except OSError:
+                    continue
+                for entry in entries:
+                    if entry.name == self.MANIFEST_FILE or entry.name.endswith(".tmp"):
+                        continue
+                    try:
+                        if entry.is_file():
+                            total += entry.stat().st_size
+                    except OSError:
+                        continue
+        return total
+
+    def compact(self, keep_generations=0, max_total_bytes=0, max_age=0, dry_run=False, now=None):
+        """按保留策略删除被取代的各代备份，并清理未引用的对象文件（gc）
+
+        旧版备份按原文件名分组，最早的一代（原始文件）与被记录引用的备份始终保留；
+        内容寻址的备份按目标分组，记录当前的一代（还原来源）始终保留，"history" 中
+        被取代的各代可以删除。其余为可删除的候选，按时间从早到晚排列：
+            - keep_generations: 每个目标最多保留的代数（含始终保留的一代），超出的从早到晚删除
+            - max_age: 早于该秒数的候选全部删除
+            - max_total_bytes: 总占用仍超出时，从最早的候选开始继续删除
+        参数为 0 时不启用对应的限制。删除历史一代后，不再被引用的对象文件随之清理。
+
+        Args:
+            dry_run: 只统计将要删除的文件，不实际删除
+
+        Returns:
+            dict: {"removed": [旧版备份文件名], "removed_generations", "removed_objects", "freed",
+                   "kept", "total_before", "total_after", "over_limit"}
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            total_before = self.total_size()
+            removed_objects, objects_freed = self.gc(dry_run=dry_run)
+            references = self._reference_counts()
+
+            # 每组的候选 [(创建时间, 标识, 大小, 对象文件)]，以及必须保留的备份数
+            groups = {}
+            kept = 0
+            for stem, filenames in self.data["legacy"].items():
+                candidates = []
+                for index, filename in enumerate(filenames):
+                    path = os.path.join(self.backup_dir, filename)
+                    try:
+                        size = os.path.getsize(path)
+                        created = self._legacy_created(path, filename)
+                    except OSError:
+                        continue
+                    if index == 0 or os.path.normcase(filename) in references:
+                        kept += 1
+                    else:
+                        candidates.append((created, ("legacy", filename), size, None))
+                groups[("legacy", stem)] = candidates
+            for key, entry in self.data["entries"].items():
+                history = entry.get("history", [])
+                if history:
+                    kept += 1
+                    groups[("target", key)] = [
+                        (generation["created"], ("history", key, index), generation["size"],
+                         self._normalize_file(generation["file"]))
+                        for index, generation in enumerate(history)
+                    ]
+
+            # 删除的候选 {标识: (创建时间, 释放的字节数)}；对象文件仍被其他记录引用时不释放空间
+            doomed = {}
+            pruned_objects = set()
+
+            def release(created, ident, size, filename):
+                if filename is not None:
+                    references[filename] -= 1
+                    if references[filename]:
+                        size = 0
+                    else:
+                        pruned_objects.add(filename)
+                doomed[ident] = (created, size)
+                return size
+
+            released = 0
+            for candidates in groups.values():
+                for position, (created, ident, size, filename) in enumerate(candidates):
+                    # 始终保留的一代占一代，候选从早到晚排列，只保留最新的 keep_generations - 1 代
+                    superseded = keep_generations and len(candidates) - position > keep_generations - 1
+                    expired = max_age and now - created > max_age
+                    if superseded or expired:
+                        released += release(created, ident, size, filename)
+
+            total_after = total_before - objects_freed - released
+            if max_total_bytes and total_after > max_total_bytes:
+                remaining = sorted(
+                    candidate
+                    for candidates in groups.values()
+                    for candidate in candidates
+                    if candidate[1] not in doomed
+                )
+                for candidate in remaining:
+                    if total_after <= max_total_bytes:
+                        break
+                    total_after -= release(*candidate)
+
+            removed = []
+            freed = objects_freed
+            legacy_doomed = [(ident[1], info) for ident, info in doomed.items() if ident[0] == "legacy"]
+            for filename, (_, size) in sorted(legacy_doomed, key=lambda item: item[1][0]):
+                if not dry_run:
+                    try:
+                        os.remove(os.path.join(self.backup_dir, filename))
+                    except OSError as e:
+                        print(f"删除旧版备份失败: {filename}: {e}")
+                        continue
+                removed.append(filename)
+                freed += size
+
+            removed_generations = sum(1 for ident in doomed if ident[0] == "history")
+            if dry_run:
+                removed_objects += len(pruned_objects)
+                freed += sum(size for ident, (_, size) in doomed.items() if ident[0] == "history")
+            elif removed or removed_generations:
+                gone = set(removed)
+                for stem in list(self.data["legacy"]):
+                    self.data["legacy"][stem] = [name for name in self.data["legacy"][stem] if name not in gone]
+                for key, entry in self.data["entries"].items():
+                    if "history" in entry:
+                        entry["history"] = [
+                            generation for index, generation in enumerate(entry["history"])
+                            if ("history", key, index) not in doomed
+                        ]
+                        if not entry["history"]:
+                            del entry["history"]
+                self.save()
+                if removed_generations:
+                    pruned_count, pruned_freed = self.gc()
+                    removed_objects += pruned_count
+                    freed += pruned_freed
+
+            total_after = total_before - freed
+            return {
+                "removed": removed,
+                "removed_generations": removed_generations,
+                "removed_objects": removed_objects,
+                "freed": freed,
+                "kept": kept + sum(len(candidates) for candidates in groups.values())
+                        - len(removed) - removed_generations,
+                "total_before": total_before,
+                "total_after": total_after,
+                "over_limit": bool(max_total_bytes) and total_after > max_total_bytes,
+            }
+
+    def gc(self, dry_run=False):
+        """清理 objects 目录中不再被任何记录引用的对象文件
+
+        旧版备份文件不在 objects 目录中，不会被清理；文件名不是 <sha256>.png 的文件
+        （如正在写入的临时文件）也不会被清理。
+
+        Args:
+            dry_run: 只统计将要删除的文件，不实际删除
+
+        Returns:
+            tuple: (删除的文件数, 释放的字节数)
+        """
+        objects_dir = os.path.join(self.backup_dir, self.OBJECTS_DIR)
+        removed = 0
+        freed = 0
+        with self._lock:
+            referenced = self.referenced_files()
+            try:
+                entries = list(os.scandir(objects_dir))
+            except OSError:
+                return 0, 0
+            for entry in entries:
+                if not OBJECT_FILE_PATTERN.match(entry.name):
+                    continue
+                relative = os.path.normcase(os.path.join(self.OBJECTS_DIR, entry.name))
+                if relative in referenced:
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    size = entry.stat().st_size
+                    if not dry_run:
+                        os.remove(entry.path)
+                except OSError as e:
+                    print(f"清理备份对象失败: {entry.name}: {e}")
+                    continue
+                removed += 1
+                freed += size
+        return removed, freed
@@ -0,0 +1,200 @@
+# file: core/bulk_import.py
+
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.hash_cache import hash_cache
+from core.png_header import read_png_header
+
+
+# 并行复制的线程数
+MAX_IMPORT_WORKERS = 4
+
+# 每个文件的导入状态
+STATUS_IMPORTED = "imported"    # 已复制到自定义目录，等待登记
+STATUS_DUPLICATE = "duplicate"  # 与已有图片内容相同，未复制（filename 为已有图片）
+STATUS_INVALID = "invalid"      # 不是有效的 PNG
+STATUS_FAILED = "failed"        # 复制失败
+STATUS_CANCELLED = "cancelled"  # 导入被取消，未复制
+
+
+def unique_filename(stem, taken):
+    """在内存中分配不重名的文件名：<stem>.png、<stem>_1.png、<stem>_2.png ……
+
+    Args:
+        stem: 原文件名（不含扩展名）
+        taken: 已占用的文件名（小写），分配的文件名会加入其中
+    """
+    filename = f"{stem}.png"
+    counter = 1
+    while filename.lower() in taken:
+        filename = f"{stem}_{counter}.png"
+        counter += 1
+    taken.add(filename.lower())
+    return filename
+
+
+class BulkImporter:
+    """批量导入 - 校验、分配文件名并并行复制到自定义目录
+
+    流程：
+        1. 按传入顺序在内存中为每个文件分配不重名的目标文件名（不再逐个检查磁盘）
+        2. 在线程池中逐个文件：只读取文件头校验 PNG 签名与 IHDR（不解码像素），
+           流式计算内容哈希，与已有图片（find_existing）或本批次中已复制成功的文件相同时不再复制
+           （相同内容正在复制时等待其结束）；否则复制到同目录的临时文件后原子重命名为目标文件
+        3. 返回逐个文件的结果，由调用方一次性登记到图片索引（见 ImageManager.commit_import）
+
+    progress(done, total, result) 在工作线程中被调用（按完成顺序递增），调用方需自行保证线程安全。
+    cancel_token 被取消后尚未开始的文件不再复制，结果状态为 STATUS_CANCELLED。
+    """
+
+    def __init__(self, custom_dir, taken_names, max_workers=MAX_IMPORT_WORKERS, progress=None, cancel_token=None,
+                 find_existing=None):
+        self.custom_dir = str(custom_dir)
+        # find_existing(sha256) -> 已有图片的文件名或 None
+        self.find_existing = find_existing
+        # 本批次中已复制成功的内容哈希 -> 文件名
+        self._seen = {}
+        # 本批次中正在复制的内容哈希 -> 复制结束时触发的事件
+        self._copying = {}
+        self.taken = {name.lower() for name in taken_names}
+        self.max_workers = max_workers
+        self.progress = progress
+        self.cancel_token = cancel_token
+        self._lock = threading.Lock()
+        self._done = 0
+        self._total = 0
+
+    @property
+    def cancelled(self):
+        return self.cancel_token is not None and self.cancel_token.cancelled
+
+    def run(self, source_paths):
+        """导入文件（plan + execute）
+
+        Returns:
+            list[dict]: 与 source_paths 顺序一致的结果
+                {"source", "filename", "display_name", "status", "message", "size", "mtime_ns", "header", "sha256"}
+        """
+        return self.execute(self.plan(source_paths))
+
+    def plan(self, source_paths):
+        """按传入顺序分配目标文件名，不访问磁盘"""
+        jobs = []
+        for source_path in source_paths:
+            stem, ext = os.path.splitext(os.path.basename(source_path))
+            job = {
+                "source": source_path,
+                "filename": None,
+                "display_name": stem,
+                "status": None,
+                "message": "",
+                "size": None,
+                "mtime_ns": None,
+                "header": None,
+                "sha256": None,
+                "reserved": None,
+            }
+            if ext.lower() != ".png":
+                job["status"] = STATUS_INVALID
+                job["message"] = "只支持PNG格式图片"
+            else:
+                job["filename"] = unique_filename(stem, self.taken)
+            # 分配给该文件的名称（内容重复时 filename 会改为已有图片，占用仍需释放）
+            job["reserved"] = job["filename"]
+            jobs.append(job)
+        return jobs
+
+    def execute(self, jobs):
+        """在线程池中校验并复制已分配文件名的文件"""
+        if not jobs:
+            return []
+        self._done = 0
+        self._total = len(jobs)
+        os.makedirs(self.custom_dir, exist_ok=True)
+        workers = max(1, min(self.max_workers, len(jobs)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self._import_one, jobs))
+
+    def _import_one(self, job):
+        try:
+            if job["status"] is None:
+                self._copy(job)
+        except Exception as e:
+            job["status"] = STATUS_FAILED
+            job["message"] = f"导入失败: {str(e)}"
+        with self._lock:
+            self._done += 1
+            if self.progress is not None:
+                self.progress(self._done, self._total, job)
+        return job
+
+    def _copy(self, job):
+        if self.cancelled:
+            job["status"] = STATUS_CANCELLED
+            job["message"] = "已取消"
+            return
+
+        if not os.path.isfile(job["source"]):
+            job["status"] = STATUS_FAILED
+            job["message"] = "源文件不存在"
+            return
+
+        header = read_png_header(job["source"])
+        if header is None:
+            job["status"] = STATUS_INVALID
+            job["message"] = "不是有效的PNG图片"
+            return
+        job["header"] = header
+
+        # 内容与已有图片或本批次中已复制的文件相同时，指向该图片，不再复制
+        sha256 = hash_cache.sha256(job["source"])
+        job["sha256"] = sha256
+        existing = self._claim(sha256)
+        if existing is not None:
+            job["status"] = STATUS_DUPLICATE
+            job["filename"] = existing
+            job["message"] = f"与已有图片相同: {existing}"
+            return
+
+        dest_path = os.path.join(self.custom_dir, job["filename"])
+        tmp_path = os.path.join(self.custom_dir, f".{job['filename']}.{threading.get_ident()}.tmp")
+        try:
+            shutil.copy2(job["source"], tmp_path)
+            os.replace(tmp_path, dest_path)
+            # 复制成功后才登记，之后相同内容的文件指向该文件
+            with self._lock:
+                self._seen[sha256] = job["filename"]
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            with self._lock:
+                self._copying.pop(sha256).set()
+
+        st = os.stat(dest_path)
+        job["size"] = st.st_size
+        job["mtime_ns"] = st.st_mtime_ns
+        job["status"] = STATUS_IMPORTED
+        job["message"] = dest_path
+
+    def _claim(self, sha256):
+        """认领内容哈希的复制
+
+        Returns:
+            str | None: 已有图片或本批次已复制成功的文件名；返回 None 时由调用方复制
+                （复制结束后必须从 _copying 中移除并触发事件）
+        """
+        while True:
+            with self._lock:
+                existing = self._seen.get(sha256)
+                if existing is None and self.find_existing is not None:
+                    existing = self.find_existing(sha256)
+                if existing is not None:
+                    return existing
+                copying = self._copying.get(sha256)
+                if copying is None:
+                    self._copying[sha256] = threading.Event()
+                    return None
+            # 相同内容正在由本批次的其他文件复制：等待结束后重新检查，复制失败时由当前文件复制
+            copying.wait()
@@ -45,14 +45,23 @@ class ConfigManager:
             "wps_target_path_history": [],
             "last_selected_image": "",
             "wps_last_selected_image": "",
-            "custom_images": [],
             "auto_detect_on_startup": True,
             "theme_mode": "auto",  # 主题模式: light, dark, auto
             "theme_color": "#009FAA",  # 默认主题色（QFluentWidgets 蓝色）
             "use_custom_theme_color": False,  # 是否使用自定义主题色（False表示使用默认颜色）
             "mica_effect": True,  # 云母效果（默认开启）
             "file_protection_enabled": False,
-            "protected_files": []
+            "protected_files": [],
+            "write_mode": "copy",  # 写入方式: copy, kernel, reflink, hardlink
+            "render_mode": "off",  # 按目标尺寸缩放: off, cover, contain, stretch
+            "png_optimize": True,  # 部署前无损优化 PNG
+            "import_duplicate_alias": True,  # 导入重复图片时把新文件名记为已有图片的别名
+            "custom_images_deduplicated": False,  # 是否已对自定义图片做过一次去重
+            "backup_retention": {  # 备份保留策略，0 表示不限制
+                "keep_generations": 3,  # 每个目标保留的代数（含原始文件）
+                "max_total_mb": 0,  # 备份总占用上限
+                "max_age_days": 0  # 被取代的备份保留天数
+            }
         }
     
     def get_target_path(self, page="home"):
@@ -237,36 +246,6 @@ class ConfigManager:
             self.config["last_selected_image"] = image_name
         self.save()
     
-    def get_custom_images(self):
-        """获取自定义图片列表"""
-        return self.config.get("custom_images", [])
-    
-    def add_custom_image(self, image_info):
-        """添加自定义图片"""
-        if "custom_images" not in self.config:
-            self.config["custom_images"] = []
-        self.config["custom_images"].append(image_info)
-        self.save()
-    
-    def remove_custom_image(self, filename):
-        """移除自定义图片"""
-        if "custom_images" in self.config:
-            self.config["custom_images"] = [
-                img for img in self.config["custom_images"] 
-                if img.get("filename") != filename
-            ]
-            self.save()
-    
-    def update_custom_image_name(self, old_filename, new_display_name, new_filename):
-        """更新自定义图片信息"""
-        if "custom_images" in self.config:
-            for img in self.config["custom_images"]:
-                if img.get("filename") == old_filename:
-                    img["display_name"] = new_display_name
-                    img["filename"] = new_filename
-                    break
-            self.save()
-
     def get_file_protection_enabled(self):
         """获取文件保护功能是否启用
         
@@ -290,6 +269,140 @@ class ConfigManager:
         else:
             print(f"文件保护设置必须为布尔值，收到: {type(enabled)}")
     
+    def get_write_mode(self):
+        """获取替换 / 还原时的写入方式
+        
+        Returns:
+            str: copy、kernel、reflink 或 hardlink
+        """
+        return self.config.get("write_mode", "copy")
+
+    def set_write_mode(self, mode):
+        """设置替换 / 还原时的写入方式
+        
+        Args:
+            mode (str): copy、kernel、reflink 或 hardlink
+        """
+        if mode in ("copy", "kernel", "reflink", "hardlink"):
+            self.config["write_mode"] = mode
+            self.save()
+        else:
+            print(f"无效的写入方式: {mode}")
+    
+    def get_render_mode(self):
+        """获取按目标原生尺寸生成启动图时的缩放方式
+        
+        Returns:
+            str: off、cover、contain 或 stretch
+        """
+        return self.config.get("render_mode", "off")
+
+    def set_render_mode(self, mode):
+        """设置按目标原生尺寸生成启动图时的缩放方式
+        
+        Args:
+            mode (str): off、cover、contain 或 stretch
+        """
+        if mode in ("off", "cover", "contain", "stretch"):
+            self.config["render_mode"] = mode
+            self.save()
+        else:
+            print(f"无效的缩放方式: {mode}")
+    
+    def get_png_optimize(self):
+        """获取部署前是否无损优化 PNG
+        
+        Returns:
+            bool: 是否启用
+        """
+        return self.config.get("png_optimize", True)
+
+    def set_png_optimize(self, enabled):
+        """设置部署前是否无损优化 PNG
+        
+        Args:
+            enabled (bool): 是否启用
+        """
+        if isinstance(enabled, bool):
+            self.config["png_optimize"] = enabled
+            self.save()
+        else:
+            print(f"PNG 优化设置必须为布尔值，收到: {type(enabled)}")
+    
+    def get_import_duplicate_alias(self):
+        """获取导入重复图片时是否记录别名
+        
+        Returns:
+            bool: 是否启用
+        """
+        return self.config.get("import_duplicate_alias", True)
+
+    def set_import_duplicate_alias(self, enabled):
+        """设置导入重复图片时是否记录别名
+        
+        Args:
+            enabled (bool): 是否启用
+        """
+        if isinstance(enabled, bool):
+            self.config["import_duplicate_alias"] = enabled
+            self.save()
+        else:
+            print(f"别名设置必须为布尔值，收到: {type(enabled)}")
+
+    def get_custom_images_deduplicated(self):
+        """获取是否已对自定义图片做过一次去重
+        
+        Returns:
+            bool: 已合并过重复图片（或用户选择不合并）时为 True
+        """
+        return self.config.get("custom_images_deduplicated", False)
+
+    def set_custom_images_deduplicated(self, done):
+        """设置是否已对自定义图片做过一次去重
+        
+        Args:
+            done (bool): 是否已完成
+        """
+        if isinstance(done, bool):
+            self.config["custom_images_deduplicated"] = done
+            self.save()
+        else:
+            print(f"去重标记必须为布尔值，收到: {type(done)}")
+
+    def get_backup_retention(self):
+        """获取备份保留策略
+        
+        Returns:
+            dict: {"keep_generations", "max_total_mb", "max_age_days"}，0 表示不限制
+        """
+        retention = dict(self.default_config()["backup_retention"])
+        retention.update(self.config.get("backup_retention", {}))
+        return retention
+
+    def set_backup_retention(self, keep_generations=None, max_total_mb=None, max_age_days=None):
+        """设置备份保留策略（只修改传入的项）
+        
+        Args:
+            keep_generations (int): 每个目标保留的代数（含原始文件）
+            max_total_mb (int): 备份总占用上限（MB）
+            max_age_days (int): 被取代的备份保留天数
+        """
+        retention = self.get_backup_retention()
+        values = {
+            "keep_generations": keep_generations,
+            "max_total_mb": max_total_mb,
+            "max_age_days": max_age_days,
+        }
+        for key, value in values.items():
+            if value is None:
+                continue
+            if isinstance(value, int) and not isinstance(value, bool) and value >= 0:
+                retention[key] = value
+            else:
+                print(f"备份保留策略 {key} 必须为非负整数，收到: {value}")
+        self.config["backup_retention"] = retention
+        self.save()
+    
     def reset_appearance_settings(self):
         """重置外观设置到默认值"""
         default = self.default_config()
@@ -0,0 +1,72 @@
+# file: core/hash_cache.py
+
+import os
+import threading
+from collections import OrderedDict
+from core.backup_manifest import file_sha256
+from core.op_stats import count
+
+
+class HashCache:
+    """文件哈希缓存 - 以 (规范化路径, 大小, 修改时间) 为键缓存 SHA-256
+
+    文件内容变化时大小或修改时间随之变化，键自然失效，不需要主动清理；
+    同一文件在一次会话中反复比较（如重复应用同一张启动图）时只计算一次哈希。
+    """
+
+    MAX_ENTRIES = 1024
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(path, st):
+        """由路径与 stat 结果生成缓存键"""
+        return (os.path.normcase(os.path.abspath(path)), st.st_size, st.st_mtime_ns)
+
+    def sha256(self, path, st=None):
+        """获取文件的 SHA-256，缓存未命中时流式计算
+
+        Args:
+            path: 文件路径
+            st: 已有的 stat 结果（可选，避免重复 stat）
+        """
+        if st is None:
+            count("stat")
+            st = os.stat(path)
+        key = self.make_key(path, st)
+        with self._lock:
+            digest = self._entries.get(key)
+            if digest is not None:
+                self._entries.move_to_end(key)
+                return digest
+
+        count("hash_read")
+        digest = file_sha256(path)
+        self.remember(path, st, digest)
+        return digest
+
+    def peek(self, path, st):
+        """只查询缓存，未命中时返回 None（不读取文件，可在界面线程中调用）"""
+        with self._lock:
+            return self._entries.get(self.make_key(path, st))
+
+    def remember(self, path, st, digest):
+        """登记已知内容的文件哈希（如刚写入的文件），之后比较时不必重新读取"""
+        key = self.make_key(path, st)
+        with self._lock:
+            self._entries[key] = digest
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+
+
+# 全局哈希缓存
+hash_cache = HashCache()
@@ -0,0 +1,148 @@
+# file: core/image_catalog.py
+
+import bisect
+import threading
+
+
+# 变更事件
+EVENT_ADDED = "added"      # 新增图片
+EVENT_UPDATED = "updated"  # 图片信息变化（如重命名），可能改变排序位置
+EVENT_REMOVED = "removed"  # 删除图片
+
+
+class ImageCatalog:
+    """图片目录 - 在内存中维护预设与自定义图片列表
+
+    首次访问时加载一次（列举预设目录与自定义目录），之后的导入、重命名、删除
+    都以差量方式应用到内存中的列表，不再重新列举目录，并通知监听者：
+        listener(event, img_info, index, old_filename)
+    event 为 EVENT_*；index 为图片在自定义列表中的位置（删除时为删除前的位置）；
+    old_filename 仅在 EVENT_UPDATED 时提供，为变化前的文件名。
+
+    自定义图片按文件名排序，与 ImageManager.get_custom_images 的顺序一致。
+    监听者在调用变更方法的线程中被调用，界面监听者应在界面线程中变更目录。
+    """
+
+    def __init__(self, image_manager):
+        self.image_manager = image_manager
+        self._presets = {}
+        self._custom = None
+        self._keys = []
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    # --- 查询 ---
+
+    def _ensure_loaded(self):
+        if self._custom is None:
+            self._custom = list(self.image_manager.get_custom_images())
+            self._keys = [img["filename"] for img in self._custom]
+
+    @property
+    def loaded(self):
+        """自定义图片列表是否已加载"""
+        return self._custom is not None
+
+    def reload(self):
+        """丢弃内存中的列表，下次访问时重新加载"""
+        with self._lock:
+            self._presets.clear()
+            self._custom = None
+            self._keys = []
+
+    def preset_images(self, page="home"):
+        """预设图片列表（每个页面只列举一次）"""
+        with self._lock:
+            if page not in self._presets:
+                self._presets[page] = list(self.image_manager.get_preset_images(page))
+            return list(self._presets[page])
+
+    def custom_images(self):
+        """自定义图片列表（按文件名排序）"""
+        with self._lock:
+            self._ensure_loaded()
+            return list(self._custom)
+
+    def images(self, page="home"):
+        """页面显示的全部图片：预设图片在前，自定义图片在后"""
+        return self.preset_images(page) + self.custom_images()
+
+    def get(self, filename):
+        """按文件名查找自定义图片，不存在时返回 None"""
+        with self._lock:
+            self._ensure_loaded()
+            index = self._find(filename)
+            return self._custom[index] if index is not None else None
+
+    def _find(self, filename):
+        index = bisect.bisect_left(self._keys, filename)
+        if index < len(self._keys) and self._keys[index] == filename:
+            return index
+        return None
+
+    # --- 监听 ---
+
+    def add_listener(self, listener):
+        """注册变更监听者"""
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """移除变更监听者"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _emit(self, event, img_info, index, old_filename=None):
+        for listener in list(self._listeners):
+            try:
+                listener(event, img_info, index, old_filename)
+            except Exception as e:
+                print(f"图片目录监听者出错: {e}")
+
+    # --- 变更 ---
+
+    def _insert(self, img_info):
+        index = bisect.bisect_left(self._keys, img_info["filename"])
+        self._keys.insert(index, img_info["filename"])
+        self._custom.insert(index, img_info)
+        return index
+
+    def add(self, img_info):
+        """添加一张自定义图片（文件名已存在时按更新处理）"""
+        with self._lock:
+            self._ensure_loaded()
+            exists = self._find(img_info["filename"]) is not None
+            if not exists:
+                index = self._insert(img_info)
+        if exists:
+            return self.update(img_info["filename"], img_info)
+        self._emit(EVENT_ADDED, img_info, index)
+        return index
+
+    def update(self, old_filename, img_info):
+        """更新一张自定义图片的信息（文件名可以变化）"""
+        with self._lock:
+            self._ensure_loaded()
+            old_index = self._find(old_filename)
+            if old_index is not None:
+                del self._keys[old_index]
+                del self._custom[old_index]
+                index = self._insert(img_info)
+        if old_index is None:
+            return self.add(img_info)
+        self._emit(EVENT_UPDATED, img_info, index, old_filename)
+        return index
+
+    def remove(self, filename):
+        """移除一张自定义图片，不存在时返回 None"""
+        with self._lock:
+            self._ensure_loaded()
+            index = self._find(filename)
+            if index is None:
+                return None
+            del self._keys[index]
+            img_info = self._custom.pop(index)
+        self._emit(EVENT_REMOVED, img_info, index)
+        return index
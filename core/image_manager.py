@@ -1,12 +1,18 @@
-import shutil
+import os
+import threading
 from pathlib import Path
+from core.bulk_import import BulkImporter, MAX_IMPORT_WORKERS, STATUS_IMPORTED, STATUS_DUPLICATE
+from core.hash_cache import hash_cache
+from core.image_catalog import ImageCatalog
+from core.png_header import read_png_header
+from core.image_store import ImageStore
 from utils.resource_path import get_resource_path, get_app_data_path, ensure_dir
 
 
 class ImageManager:
     """图片管理器"""
     
-    def __init__(self):
+    def __init__(self, config_manager=None, store=None):
         # 预设图片目录（打包后在 _internal/assets/presets 中）
         self.preset_dir = Path(get_resource_path("assets/presets"))
         
@@ -19,9 +25,24 @@ class ImageManager:
         # 确保自定义目录存在
         ensure_dir(self.custom_dir)
         
-        # 从配置加载自定义图片信息
-        from core.config_manager import ConfigManager
-        self.config_manager = ConfigManager()
+        # 从配置加载自定义图片信息（与界面共用同一个配置管理器，避免互相覆盖）
+        if config_manager is None:
+            from core.config_manager import ConfigManager
+            config_manager = ConfigManager()
+        self.config_manager = config_manager
+        
+        # 自定义图片索引（SQLite），首次打开时迁移 splash.json 中的 custom_images 列表
+        self.store = store or ImageStore(get_app_data_path("config/images.db"))
+        migrated = self.store.migrate_from_config(self.config_manager)
+        if migrated:
+            print(f"已迁移 {migrated} 条自定义图片记录到图片索引")
+        self._synced = False
+        # 未完成的批量导入已占用的文件名（小写）
+        self._pending_names = set()
+        self._import_lock = threading.Lock()
+        
+        # 内存中的图片目录：只加载一次，之后的导入、重命名、删除以差量方式应用
+        self.catalog = ImageCatalog(self)
     
     def get_preset_images(self, page="home"):
         """获取预设图片列表
@@ -68,27 +89,157 @@ class ImageManager:
         
         return sorted(preset_images, key=lambda x: x["filename"])
     
-    def get_custom_images(self):
-        """获取自定义图片列表"""
-        custom_images = []
+    def get_custom_images(self, offset=0, limit=None):
+        """获取自定义图片列表（按文件名排序）
         
+        Args:
+            offset: 跳过的图片数
+            limit: 最多返回的图片数，为 None 时返回其余全部
+        """
         if not self.custom_dir.exists():
-            return custom_images
+            return []
         
-        # 从配置读取自定义图片的显示名称
-        config_custom_images = self.config_manager.get_custom_images()
-        name_map = {img["filename"]: img["display_name"] for img in config_custom_images}
+        self.sync_custom_images()
+        return [self._record_info(row) for row in self.store.page(offset, limit)]
+    
+    def sync_custom_images(self, force=False):
+        """使图片索引与自定义目录一致（每次运行只列举一次目录）
         
-        for img_file in self.custom_dir.glob("*.png"):
-            display_name = name_map.get(img_file.name, img_file.stem)
-            custom_images.append({
-                "filename": img_file.name,
-                "display_name": display_name,
-                "path": str(img_file),
-                "type": "custom"
-            })
+        目录中新出现的 PNG 以文件名作为显示名称加入索引，已不存在的文件从索引中移除。
         
-        return sorted(custom_images, key=lambda x: x["filename"])
+        Returns:
+            tuple: (新增数量, 移除数量)
+        """
+        if self._synced and not force:
+            return 0, 0
+        self._synced = True
+        
+        on_disk = {}
+        try:
+            for entry in os.scandir(self.custom_dir):
+                if entry.name.lower().endswith(".png") and entry.is_file():
+                    on_disk[os.path.normcase(entry.name)] = entry
+        except OSError as e:
+            print(f"列举自定义图片目录失败: {e}")
+            return 0, 0
+        
+        indexed = {os.path.normcase(name): name for name in self.store.filenames()}
+        added = []
+        for key, entry in on_disk.items():
+            if key not in indexed:
+                st = entry.stat()
+                added.append((entry.name, os.path.splitext(entry.name)[0], None, st.st_size, st.st_mtime_ns))
+        removed = [name for key, name in indexed.items() if key not in on_disk]
+        
+        if added:
+            self.store.add_many(added)
+        if removed:
+            self.store.remove_many(removed)
+            self.store.remove_metadata([self._metadata_key(self.custom_dir / name) for name in removed])
+        return len(added), len(removed)
+    
+    def _fill_missing_hashes(self):
+        """补全图片索引中缺少内容哈希的记录（需要读取文件）"""
+        updates = []
+        for filename in self.store.missing_hashes():
+            path = self.custom_dir / filename
+            try:
+                st = os.stat(path)
+                updates.append((filename, hash_cache.sha256(str(path), st), st.st_size, st.st_mtime_ns))
+            except OSError:
+                continue
+        if updates:
+            self.store.update_file_info(updates)
+    
+    def pending_duplicates(self):
+        """尚未合并的重复自定义图片数，已做过一次合并时返回 0
+        
+        会补全缺少内容哈希的记录，不修改文件，可在后台线程中调用。
+        """
+        if self.config_manager.get_custom_images_deduplicated():
+            return 0
+        self._fill_missing_hashes()
+        return sum(len(group) - 1 for group in self.store.duplicate_groups())
+    
+    def dedup_custom_images(self):
+        """合并自定义目录中内容相同的图片
+        
+        补全缺少内容哈希的记录后按哈希分组，每组保留最早加入的一张，删除其余文件，
+        并把被删除图片的显示名称记为保留图片的别名；最后选中的图片被删除时改为保留的图片。
+        全部删除成功后才记录已完成去重，否则下次启动时会再次提示。
+        
+        会删除文件并发出图片目录的变更事件，应在界面线程中调用。
+        
+        Returns:
+            tuple: (删除的图片数, 释放的字节数)
+        """
+        self._fill_missing_hashes()
+        
+        removed = []
+        aliases = []
+        freed = 0
+        failed = 0
+        # 被删除的文件名（小写）-> 保留的文件名
+        keepers = {}
+        for group in self.store.duplicate_groups():
+            keeper = group[0]
+            for duplicate in group[1:]:
+                path = self.custom_dir / duplicate["filename"]
+                try:
+                    size = os.path.getsize(path)
+                    path.unlink()
+                except FileNotFoundError:
+                    size = 0
+                except OSError as e:
+                    print(f"删除重复图片失败: {duplicate['filename']}: {e}")
+                    failed += 1
+                    continue
+                removed.append(duplicate["filename"])
+                freed += size
+                keepers[duplicate["filename"].lower()] = keeper["filename"]
+                aliases.append((keeper["filename"], duplicate["display_name"]))
+                aliases.extend((keeper["filename"], alias) for alias in duplicate["aliases"])
+        
+        if aliases:
+            self.store.add_aliases(aliases)
+        if removed:
+            self.store.remove_many(removed)
+            self.store.remove_metadata([self._metadata_key(self.custom_dir / name) for name in removed])
+        
+        # 图片目录已加载时以差量事件通知
+        if self.catalog.loaded:
+            for filename in removed:
+                self.catalog.remove(filename)
+            for filename in {keeper for keeper, _ in aliases}:
+                self._refresh_catalog_entry(filename)
+        
+        for page in ("home", "wps"):
+            keeper = keepers.get(self.config_manager.get_last_selected_image(page).lower())
+            if keeper is not None:
+                self.config_manager.set_last_selected_image(keeper, page)
+        if not failed:
+            self.config_manager.set_custom_images_deduplicated(True)
+        return len(removed), freed
+    
+    def _custom_info(self, filename, display_name, aliases=()):
+        """自定义图片的信息字典"""
+        return {
+            "filename": filename,
+            "display_name": display_name,
+            "aliases": list(aliases),
+            "path": str(self.custom_dir / filename),
+            "type": "custom"
+        }
+    
+    def _record_info(self, record):
+        """由图片索引中的记录生成信息字典"""
+        return self._custom_info(record["filename"], record["display_name"], record["aliases"])
+    
+    def _refresh_catalog_entry(self, filename):
+        """按图片索引中的最新记录更新图片目录中的一项"""
+        record = self.store.get(filename)
+        if record is not None:
+            self.catalog.update(filename, self._record_info(record))
     
     def import_image(self, source_path):
         """
@@ -100,45 +251,163 @@ class ImageManager:
         Returns:
             (success, message)
         """
+        result = self.import_images([source_path])[0]
+        return result["status"] in (STATUS_IMPORTED, STATUS_DUPLICATE), result["message"]
+    
+    def import_images(self, source_paths, progress=None, cancel_token=None):
+        """批量导入图片（复制与登记在同一线程中完成）
+        
+        Returns:
+            list[dict]: 逐个文件的结果，见 BulkImporter.run
+        """
+        results = self.prepare_import(source_paths, progress, cancel_token)
+        self.commit_import(results)
+        return results
+    
+    def prepare_import(self, source_paths, progress=None, cancel_token=None, max_workers=MAX_IMPORT_WORKERS):
+        """校验并并行复制待导入的图片，尚不登记到图片索引（可在后台线程中调用）
+        
+        文件名在内存中分配：与图片索引、自定义目录以及其他未完成的导入都不重名。
+        
+        Args:
+            source_paths: 源图片路径列表
+            progress: 进度回调 progress(已完成数, 总数, 单个结果)，在工作线程中调用
+            cancel_token: 取消令牌（utils.scan_engine.CancelToken）
+            max_workers: 并行复制的线程数
+        
+        Returns:
+            list[dict]: 逐个文件的结果，需交给 commit_import 登记
+        """
+        ensure_dir(self.custom_dir)
+        with self._import_lock:
+            taken = set(self.store.filenames())
+            taken.update(os.listdir(self.custom_dir))
+            taken.update(self._pending_names)
+            importer = BulkImporter(
+                self.custom_dir, taken, max_workers, progress, cancel_token,
+                find_existing=self._find_by_hash
+            )
+            # 先在内存中分配好文件名并占用，复制在锁外并行进行
+            jobs = importer.plan(source_paths)
+            self._pending_names.update(job["reserved"].lower() for job in jobs if job["reserved"])
         try:
-            source_path = Path(source_path)
-            
-            # 验证文件
-            if not source_path.exists():
-                return False, "源文件不存在"
-            
-            if source_path.suffix.lower() != ".png":
-                return False, "只支持PNG格式图片"
-            
-            # 确保自定义目录存在
-            ensure_dir(self.custom_dir)
-            
-            # 生成目标文件名
-            dest_filename = source_path.name
-            dest_path = self.custom_dir / dest_filename
-            
-            # 如果文件已存在，添加序号
-            counter = 1
-            while dest_path.exists():
-                stem = source_path.stem
-                dest_filename = f"{stem}_{counter}.png"
-                dest_path = self.custom_dir / dest_filename
-                counter += 1
-            
-            # 复制文件
-            shutil.copy2(source_path, dest_path)
-            
-            # 添加到配置
-            display_name = source_path.stem
-            self.config_manager.add_custom_image({
-                "filename": dest_filename,
-                "display_name": display_name
-            })
-            
-            return True, str(dest_path)
-            
-        except Exception as e:
-            return False, f"导入失败: {str(e)}"
+            return importer.execute(jobs)
+        except Exception:
+            self._release_names(jobs)
+            raise
+    
+    def commit_import(self, results):
+        """把已复制的图片一次性登记到图片索引（一个事务），并通知图片目录
+        
+        图片目录的变更事件在调用线程中发出，界面中应在界面线程调用。
+        
+        Returns:
+            int: 登记的图片数量
+        """
+        imported = [r for r in results if r["status"] == STATUS_IMPORTED]
+        duplicates = [r for r in results if r["status"] == STATUS_DUPLICATE]
+        try:
+            if imported:
+                self.store.add_many([
+                    (r["filename"], r["display_name"], r["sha256"], r["size"], r["mtime_ns"])
+                    for r in imported
+                ])
+                # 导入时已读取的文件头与哈希直接记入 PNG 元数据，不必再次读取
+                self.store.put_metadata([
+                    dict(r["header"], path=self._metadata_key(self.custom_dir / r["filename"]),
+                         size=r["size"], mtime_ns=r["mtime_ns"], sha256=r["sha256"])
+                    for r in imported
+                ])
+            # 重复的图片指向已有图片，可选地把新文件名记为别名
+            if duplicates and self.config_manager.get_import_duplicate_alias():
+                self.store.add_aliases([(r["filename"], r["display_name"]) for r in duplicates])
+        finally:
+            self._release_names(results)
+        for r in imported:
+            self.catalog.add(self._custom_info(r["filename"], r["display_name"]))
+        if duplicates and self.config_manager.get_import_duplicate_alias():
+            for filename in {r["filename"] for r in duplicates}:
+                self._refresh_catalog_entry(filename)
+        return len(imported)
+    
+    def _find_by_hash(self, sha256):
+        record = self.store.find_by_hash(sha256)
+        return record["filename"] if record is not None else None
+    
+    def _release_names(self, results):
+        with self._import_lock:
+            for r in results:
+                if r["reserved"]:
+                    self._pending_names.discard(r["reserved"].lower())
+    
+    # --- PNG 元数据 ---
+    
+    @staticmethod
+    def _metadata_key(path):
+        """PNG 元数据的键：规范化的完整路径"""
+        return os.path.normcase(os.path.abspath(str(path)))
+    
+    def get_image_metadata(self, path):
+        """获取一张图片的 PNG 元数据（见 get_images_metadata），不是有效的 PNG 时返回 None
+        
+        供界面线程调用（卡片悬停提示、替换前的尺寸检查）：索引未命中时只读取 IHDR 与 stat，
+        不计算哈希；"sha256" 只在索引或哈希缓存中已有时提供，否则为 None，
+        由后台的 refresh_metadata 补全。
+        """
+        return self.get_images_metadata([path], hash_files=False).get(str(path))
+    
+    def get_images_metadata(self, paths, cancel_token=None, hash_files=True):
+        """批量获取图片的 PNG 元数据
+        
+        一次查询取出已有记录，只有文件大小或修改时间与记录不同（或没有记录）的文件
+        才重新读取 IHDR（不解码像素）并计算哈希，更新的记录在一个事务中写回。
+        
+        Args:
+            paths: 图片路径列表
+            cancel_token: 取消令牌（可选），取消后不再读取其余文件
+            hash_files: 是否为缺少哈希的文件计算哈希；为 False 时只使用哈希缓存中已有的值
+        
+        Returns:
+            dict: {路径: {"width", "height", "bit_depth", "color_type", "interlace", "size", "mtime_ns", "sha256"}}，
+                不存在或不是有效 PNG 的文件不在其中
+        """
+        keys = {str(path): self._metadata_key(path) for path in paths}
+        records = self.store.get_metadata_many(set(keys.values()))
+        result = {}
+        updates = []
+        for path, key in keys.items():
+            if cancel_token is not None and cancel_token.cancelled:
+                break
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            record = records.get(key)
+            stale = record is None or record["size"] != st.st_size or record["mtime_ns"] != st.st_mtime_ns
+            if stale or (hash_files and record["sha256"] is None):
+                header = read_png_header(path)
+                if header is None:
+                    continue
+                sha256 = hash_cache.sha256(path, st) if hash_files else hash_cache.peek(path, st)
+                record = dict(header, path=key, size=st.st_size, mtime_ns=st.st_mtime_ns, sha256=sha256)
+                records[key] = record
+                updates.append(record)
+            result[path] = record
+        if updates:
+            self.store.put_metadata(updates)
+        return result
+    
+    def refresh_metadata(self, pages=("home", "wps"), cancel_token=None):
+        """为各页面的预设图片与全部自定义图片建立 / 更新 PNG 元数据（可在后台线程中调用）
+        
+        Returns:
+            int: 索引中的图片数量
+        """
+        paths = []
+        for page in pages:
+            paths.extend(img["path"] for img in self.catalog.preset_images(page))
+        paths.extend(img["path"] for img in self.catalog.custom_images())
+        return len(self.get_images_metadata(paths, cancel_token))
     
     def delete_custom_image(self, filename):
         """
@@ -155,8 +424,10 @@ class ImageManager:
             if file_path.exists():
                 file_path.unlink()
             
-            # 从配置中移除
-            self.config_manager.remove_custom_image(filename)
+            # 从图片索引中移除
+            self.store.remove(filename)
+            self.store.remove_metadata([self._metadata_key(file_path)])
+            self.catalog.remove(filename)
             return True
         except Exception as e:
             print(f"删除图片失败: {e}")
@@ -185,13 +456,25 @@ class ImageManager:
             new_filename = new_display_name + old_extension
             new_file_path = self.custom_dir / new_filename
             
-            # 检查文件名冲突
-            if new_file_path.exists() and new_filename != old_filename:
+            # 检查文件名冲突（只改大小写时，不区分大小写的文件系统上新旧路径是同一个文件）
+            if (new_filename != old_filename and new_file_path.exists()
+                    and not new_file_path.samefile(old_file_path)):
                 return False, f"文件名已存在: {new_filename}", old_filename
             
-            # 重命名文件
+            # 先在事务中修改图片索引（文件名冲突时不会改动磁盘），再重命名文件，
+            # 重命名失败时回滚索引
+            def rename_file():
+                if new_filename != old_filename:
+                    old_file_path.rename(new_file_path)
+            
+            self.store.rename(old_filename, new_filename, new_display_name, apply=rename_file)
             if new_filename != old_filename:
-                old_file_path.rename(new_file_path)
+                self.store.rename_metadata(self._metadata_key(old_file_path), self._metadata_key(new_file_path))
+            
+            # 更新图片目录
+            record = self.store.get(new_filename)
+            aliases = record["aliases"] if record is not None else ()
+            self.catalog.update(old_filename, self._custom_info(new_filename, new_display_name, aliases))
             
             return True, "重命名成功", new_filename
             
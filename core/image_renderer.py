@@ -0,0 +1,112 @@
+# file: core/image_renderer.py
+
+import os
+import threading
+from core.op_stats import count
+
+
+# 缩放方式
+RENDER_OFF = "off"          # 不缩放，直接使用源图片
+RENDER_COVER = "cover"      # 等比缩放填满目标尺寸，居中裁掉多余部分
+RENDER_CONTAIN = "contain"  # 等比缩放完整显示，空白处透明
+RENDER_STRETCH = "stretch"  # 拉伸到目标尺寸
+
+RENDER_MODES = (RENDER_OFF, RENDER_COVER, RENDER_CONTAIN, RENDER_STRETCH)
+
+
+class ImageRenderer:
+    """启动图渲染器 - 按目标的原生尺寸生成缩放并优化后的 PNG 变体
+
+    变体缓存在 cache_dir 中，以 (源图片哈希, 宽, 高, 缩放方式) 命名：
+        <sha256>_<宽>x<高>_<缩放方式>.png
+    再次应用同一张图片时直接命中缓存，不再解码与缩放。
+
+    Pillow 不可用时 available 为 False，调用方应直接使用源图片。
+    """
+
+    def __init__(self, cache_dir, mode=RENDER_OFF):
+        self.cache_dir = cache_dir
+        self.mode = mode if mode in RENDER_MODES else RENDER_OFF
+        self._lock = threading.Lock()
+        self._rendering = {}
+        try:
+            from PIL import Image  # noqa: F401
+            self.available = True
+        except ImportError:
+            self.available = False
+
+    @property
+    def enabled(self):
+        return self.available and self.mode != RENDER_OFF
+
+    def variant_path(self, sha256, width, height):
+        """变体在缓存中的路径"""
+        return os.path.join(self.cache_dir, f"{sha256}_{width}x{height}_{self.mode}.png")
+
+    def render(self, source_path, sha256, width, height):
+        """获取源图片在指定尺寸下的变体（缓存未命中时渲染）
+
+        Args:
+            source_path: 源图片路径
+            sha256: 源图片内容哈希
+            width / height: 目标尺寸
+
+        Returns:
+            str: 变体文件路径
+        """
+        path = self.variant_path(sha256, width, height)
+        count("stat")
+        if os.path.isfile(path):
+            return path
+
+        # 同一变体只渲染一次，并行的其他目标等待该次渲染完成
+        with self._lock:
+            event = self._rendering.get(path)
+            owner = event is None
+            if owner:
+                event = self._rendering[path] = threading.Event()
+        if not owner:
+            event.wait()
+            if os.path.isfile(path):
+                return path
+            raise OSError(f"渲染失败: {os.path.basename(path)}")
+
+        try:
+            self._render_to(source_path, path, width, height)
+            return path
+        finally:
+            with self._lock:
+                self._rendering.pop(path, None)
+            event.set()
+
+    def _render_to(self, source_path, path, width, height):
+        from PIL import Image
+
+        count("render")
+        with Image.open(source_path) as image:
+            image.load()
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            result = self._resize(image, width, height)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            result.save(tmp_path, format="PNG", optimize=True)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _resize(self, image, width, height):
+        from PIL import Image, ImageOps
+
+        resample = Image.Resampling.LANCZOS
+        if self.mode == RENDER_STRETCH:
+            return image.resize((width, height), resample)
+        if self.mode == RENDER_CONTAIN:
+            fitted = ImageOps.contain(image, (width, height), resample)
+            canvas = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+            canvas.paste(fitted, ((width - fitted.width) // 2, (height - fitted.height) // 2))
+            return canvas
+        return ImageOps.fit(image, (width, height), resample)
@@ -0,0 +1,341 @@
+# file: core/image_store.py
+
+import os
+import sqlite3
+import threading
+import time
+
+
+class ImageStore:
+    """自定义图片索引 - 使用 SQLite 保存自定义图片的元数据
+
+    以文件名为主键（B 树索引，增删改查均为 O(log n)），另外按内容哈希与显示名称建立索引。
+    增删改只修改对应的行，不再重写整个 splash.json；列表查询支持分页。
+
+    表结构（images）：
+        filename      文件名（主键，忽略大小写）
+        display_name  显示名称
+        sha256        文件内容哈希（未知时为 NULL）
+        size          文件大小
+        mtime_ns      文件修改时间
+        added         加入图片库的时间
+
+    别名表（image_aliases）：导入与已有图片内容相同的文件时，以新文件名作为已有图片的别名
+        filename      图片文件名
+        alias         别名
+
+    PNG 元数据表（image_metadata）：预设与自定义图片的 IHDR 信息，以规范化的完整路径为键
+        path          文件路径（os.path.normcase + abspath）
+        size          文件大小
+        mtime_ns      文件修改时间（与 size 一起判断记录是否过期）
+        sha256        文件内容哈希
+        width / height / bit_depth / color_type / interlace   IHDR 字段
+
+    首次打开时把 splash.json 中旧的 custom_images 列表迁移进来（见 migrate_from_config）。
+    """
+
+    SCHEMA_VERSION = 3
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # 导入与界面可能在不同线程访问，同一连接由锁串行化
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock, self._conn:
+            if self.db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < self.SCHEMA_VERSION:
+                self._conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS images (
+                        filename TEXT PRIMARY KEY COLLATE NOCASE,
+                        display_name TEXT NOT NULL,
+                        sha256 TEXT,
+                        size INTEGER,
+                        mtime_ns INTEGER,
+                        added REAL NOT NULL
+                    )
+                    """
+                )
+                # 列表按文件名区分大小写排序（与 Python 的字符串排序一致），单独建立索引
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_images_order ON images (filename COLLATE BINARY)")
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_images_sha256 ON images (sha256)")
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_images_display_name ON images (display_name)")
+                self._conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS image_aliases (
+                        filename TEXT NOT NULL COLLATE NOCASE,
+                        alias TEXT NOT NULL,
+                        PRIMARY KEY (filename, alias)
+                    )
+                    """
+                )
+                self._conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS image_metadata (
+                        path TEXT PRIMARY KEY,
+                        size INTEGER NOT NULL,
+                        mtime_ns INTEGER NOT NULL,
+                        sha256 TEXT,
+                        width INTEGER NOT NULL,
+                        height INTEGER NOT NULL,
+                        bit_depth INTEGER NOT NULL,
+                        color_type INTEGER NOT NULL,
+                        interlace INTEGER NOT NULL
+                    )
+                    """
+                )
+                self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # 查询结果附带以“、”连接的别名
+    _SELECT = (
+        "SELECT images.*, (SELECT group_concat(alias, '、') FROM image_aliases"
+        " WHERE image_aliases.filename = images.filename) AS aliases FROM images"
+    )
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        record = dict(row)
+        record["aliases"] = record["aliases"].split("、") if record.get("aliases") else []
+        return record
+
+    # --- 查询 ---
+
+    def count(self):
+        """图片数量"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def get(self, filename):
+        """按文件名查找，不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(f"{self._SELECT} WHERE filename = ?", (filename,)).fetchone()
+        return self._to_dict(row)
+
+    def find_by_hash(self, sha256):
+        """按内容哈希查找（同一内容有多条记录时返回最早加入的一条），不存在时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                f"{self._SELECT} WHERE sha256 = ? ORDER BY added, filename LIMIT 1", (sha256,)
+            ).fetchone()
+        return self._to_dict(row)
+
+    def page(self, offset=0, limit=None):
+        """按文件名排序分页查询
+
+        Args:
+            offset: 跳过的记录数
+            limit: 最多返回的记录数，为 None 时返回其余全部
+
+        Returns:
+            list[dict]: 图片记录
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"{self._SELECT} ORDER BY filename COLLATE BINARY LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset),
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def filenames(self):
+        """全部文件名"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT filename FROM images")]
+
+    def duplicate_groups(self):
+        """内容相同的图片分组（每组按加入时间从早到晚）
+
+        Returns:
+            list[list[dict]]: 只包含多于一张图片的分组
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"{self._SELECT} WHERE sha256 IN"
+                " (SELECT sha256 FROM images WHERE sha256 IS NOT NULL GROUP BY sha256 HAVING COUNT(*) > 1)"
+                " ORDER BY sha256, added, filename"
+            ).fetchall()
+        groups = {}
+        for row in rows:
+            record = self._to_dict(row)
+            groups.setdefault(record["sha256"], []).append(record)
+        return list(groups.values())
+
+    def missing_hashes(self):
+        """尚未记录内容哈希的文件名"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT filename FROM images WHERE sha256 IS NULL")]
+
+    # --- 变更 ---
+
+    def add(self, filename, display_name, sha256=None, size=None, mtime_ns=None):
+        """添加或覆盖一条记录"""
+        self.add_many([(filename, display_name, sha256, size, mtime_ns)])
+
+    def add_many(self, records):
+        """在一个事务中添加或覆盖多条记录
+
+        Args:
+            records: [(filename, display_name, sha256, size, mtime_ns), ...]
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT INTO images (filename, display_name, sha256, size, mtime_ns, added)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (filename) DO UPDATE SET
+                    display_name = excluded.display_name,
+                    sha256 = excluded.sha256,
+                    size = excluded.size,
+                    mtime_ns = excluded.mtime_ns
+                """,
+                [tuple(record) + (now,) for record in records],
+            )
+
+    def remove(self, filename):
+        """删除一条记录
+
+        Returns:
+            bool: 是否存在并已删除
+        """
+        return self.remove_many([filename]) > 0
+
+    def remove_many(self, filenames):
+        """在一个事务中删除多条记录，返回删除的数量"""
+        params = [(f,) for f in filenames]
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM image_aliases WHERE filename = ?", params)
+            cursor = self._conn.executemany("DELETE FROM images WHERE filename = ?", params)
+            return cursor.rowcount
+
+    def rename(self, old_filename, new_filename, display_name, apply=None):
+        """修改文件名与显示名称
+
+        Args:
+            apply: 修改记录后、提交事务前调用的函数（如重命名磁盘上的文件）；
+                修改记录失败时不会调用，apply 抛出异常时回滚修改并重新抛出
+
+        Returns:
+            bool: 原记录是否存在
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE images SET filename = ?, display_name = ? WHERE filename = ?",
+                (new_filename, display_name, old_filename),
+            )
+            self._conn.execute(
+                "UPDATE image_aliases SET filename = ? WHERE filename = ?", (new_filename, old_filename)
+            )
+            if apply is not None:
+                apply()
+            return cursor.rowcount > 0
+
+    def add_aliases(self, aliases):
+        """在一个事务中添加别名（已存在的别名、与显示名称相同的别名会被忽略）
+
+        Args:
+            aliases: [(filename, alias), ...]
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """
+                INSERT OR IGNORE INTO image_aliases (filename, alias)
+                SELECT filename, ? FROM images WHERE filename = ? AND display_name != ?
+                """,
+                [(alias, filename, alias) for filename, alias in aliases],
+            )
+
+    def update_file_info(self, records):
+        """在一个事务中更新文件的哈希、大小与修改时间
+
+        Args:
+            records: [(filename, sha256, size, mtime_ns), ...]
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE images SET sha256 = ?, size = ?, mtime_ns = ? WHERE filename = ?",
+                [(sha256, size, mtime_ns, filename) for filename, sha256, size, mtime_ns in records],
+            )
+
+    # --- PNG 元数据 ---
+
+    _METADATA_COLUMNS = ("path", "size", "mtime_ns", "sha256", "width", "height", "bit_depth", "color_type", "interlace")
+
+    def get_metadata_many(self, paths):
+        """按路径批量查询 PNG 元数据
+
+        Args:
+            paths: 规范化的文件路径
+
+        Returns:
+            dict: {路径: 记录}，没有记录的路径不在其中
+        """
+        paths = list(paths)
+        result = {}
+        with self._lock:
+            # 分批查询，避免超过 SQLite 的参数数量上限
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT * FROM image_metadata WHERE path IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                result.update((row["path"], dict(row)) for row in rows)
+        return result
+
+    def put_metadata(self, records):
+        """在一个事务中添加或覆盖多条 PNG 元数据
+
+        Args:
+            records: 包含 _METADATA_COLUMNS 各字段的字典列表
+        """
+        columns = ", ".join(self._METADATA_COLUMNS)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO image_metadata ({columns}) VALUES ({', '.join('?' * len(self._METADATA_COLUMNS))})",
+                [tuple(record[c] for c in self._METADATA_COLUMNS) for record in records],
+            )
+
+    def remove_metadata(self, paths):
+        """在一个事务中删除多条 PNG 元数据"""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM image_metadata WHERE path = ?", [(p,) for p in paths])
+
+    def rename_metadata(self, old_path, new_path):
+        """文件重命名后修改 PNG 元数据的路径（内容不变，不需要重新读取）"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM image_metadata WHERE path = ?", (new_path,))
+            self._conn.execute("UPDATE image_metadata SET path = ? WHERE path = ?", (new_path, old_path))
+
+    # --- 迁移 ---
+
+    def migrate_from_config(self, config_manager):
+        """把 splash.json 中的 custom_images 列表迁移到索引中，迁移后从配置中移除该列表
+
+        Returns:
+            int: 迁移的记录数
+        """
+        entries = config_manager.config.get("custom_images")
+        if not entries:
+            return 0
+        records = [
+            (entry["filename"], entry.get("display_name") or os.path.splitext(entry["filename"])[0], None, None, None)
+            for entry in entries
+            if entry.get("filename")
+        ]
+        self.add_many(records)
+        config_manager.config.pop("custom_images", None)
+        config_manager.save()
+        return len(records)
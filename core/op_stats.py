@@ -0,0 +1,103 @@
+# file: core/op_stats.py
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+_local = threading.local()
+
+
+class CallStats:
+    """单次调用的系统调用计数与耗时
+
+    counts: {调用名称: 次数}，如 stat、chmod、set_attributes、open、replace
+    duration: 调用耗时（秒）
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.counts = {}
+        self.duration = 0.0
+
+    def add(self, name, count=1):
+        """累加指定计数"""
+        self.counts[name] = self.counts.get(name, 0) + count
+
+    @property
+    def total(self):
+        """系统调用总数"""
+        return sum(self.counts.values())
+
+    def as_dict(self):
+        return {"call": self.name, "duration": self.duration, "syscalls": dict(self.counts), "total": self.total}
+
+
+class OperationStats:
+    """按调用名称汇总的系统调用计数与耗时（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+        self.last_call = None
+
+    def reset(self):
+        """清零所有计数"""
+        with self._lock:
+            self._totals.clear()
+            self.last_call = None
+
+    def record(self, call):
+        """登记一次完成的调用"""
+        with self._lock:
+            totals = self._totals.setdefault(call.name, {"calls": 0, "duration": 0.0, "syscalls": {}})
+            totals["calls"] += 1
+            totals["duration"] += call.duration
+            for name, count in call.counts.items():
+                totals["syscalls"][name] = totals["syscalls"].get(name, 0) + count
+            self.last_call = call
+
+    def snapshot(self):
+        """返回汇总的副本 {调用名称: {"calls", "duration", "syscalls"}}"""
+        with self._lock:
+            return {
+                name: {"calls": t["calls"], "duration": t["duration"], "syscalls": dict(t["syscalls"])}
+                for name, t in self._totals.items()
+            }
+
+
+def count(name, n=1):
+    """为当前线程正在进行的调用累加一次系统调用计数（没有进行中的调用时忽略）"""
+    call = getattr(_local, "call", None)
+    if call is not None:
+        call.add(name, n)
+
+
+@contextmanager
+def track(name, stats=None):
+    """统计一次调用的系统调用次数与耗时
+
+    嵌套使用时只有最外层生效，内层的计数计入外层调用。
+
+    Args:
+        name: 调用名称
+        stats: 调用结束后登记到的 OperationStats（可选）
+
+    Yields:
+        CallStats: 本次调用的计数
+    """
+    outer = getattr(_local, "call", None)
+    if outer is not None:
+        yield outer
+        return
+
+    call = CallStats(name)
+    _local.call = call
+    start = time.perf_counter()
+    try:
+        yield call
+    finally:
+        call.duration = time.perf_counter() - start
+        _local.call = None
+        if stats is not None:
+            stats.record(call)
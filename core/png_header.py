@@ -0,0 +1,90 @@
+# file: core/png_header.py
+
+import struct
+import zlib
+from core.op_stats import count
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# 签名 + IHDR 块（长度、类型、13 字节数据、CRC）
+PNG_HEADER_SIZE = 33
+
+# 每种颜色类型允许的位深
+_VALID_BIT_DEPTHS = {
+    0: (1, 2, 4, 8, 16),  # 灰度
+    2: (8, 16),           # RGB
+    3: (1, 2, 4, 8),      # 调色板
+    4: (8, 16),           # 灰度 + 透明
+    6: (8, 16),           # RGBA
+}
+
+# 颜色类型的显示名称
+COLOR_TYPE_NAMES = {0: "灰度", 2: "RGB", 3: "调色板", 4: "灰度+透明", 6: "RGBA"}
+
+def parse_png_size(header):
+    """从 PNG 文件开头的字节（至少 24 字节）解析宽高，不是 PNG 时返回 None"""
+    if len(header) < 24 or header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        return None
+    width, height = struct.unpack(">II", header[16:24])
+    return width, height
+
+
+def parse_png_header(header):
+    """校验并解析 PNG 文件开头的 IHDR 块（至少 PNG_HEADER_SIZE 字节），不解码像素
+
+    Returns:
+        dict | None: {"width", "height", "bit_depth", "color_type", "interlace"}，
+            不是有效的 PNG 头（签名、长度、CRC、取值范围任一不符）时返回 None
+    """
+    if len(header) < PNG_HEADER_SIZE or header[:8] != PNG_SIGNATURE:
+        return None
+    length, chunk_type = struct.unpack(">I4s", header[8:16])
+    if length != 13 or chunk_type != b"IHDR":
+        return None
+    data = header[16:29]
+    (crc,) = struct.unpack(">I", header[29:33])
+    if zlib.crc32(chunk_type + data) & 0xFFFFFFFF != crc:
+        return None
+    width, height, bit_depth, color_type, compression, filter_method, interlace = struct.unpack(">IIBBBBB", data)
+    if not (0 < width < 2 ** 31 and 0 < height < 2 ** 31):
+        return None
+    if bit_depth not in _VALID_BIT_DEPTHS.get(color_type, ()):
+        return None
+    if compression != 0 or filter_method != 0 or interlace not in (0, 1):
+        return None
+    return {
+        "width": width,
+        "height": height,
+        "bit_depth": bit_depth,
+        "color_type": color_type,
+        "interlace": interlace,
+    }
+
+
+def read_png_header(path):
+    """只读取 PNG 文件头并校验 IHDR
+
+    Returns:
+        dict | None: 见 parse_png_header，文件无法读取或不是有效的 PNG 时返回 None
+    """
+    count("open")
+    try:
+        with open(path, "rb") as f:
+            return parse_png_header(f.read(PNG_HEADER_SIZE))
+    except OSError:
+        return None
+
+
+def read_png_size(path):
+    """只读取 PNG 文件头（IHDR）获取宽高，不解码图片
+
+    Returns:
+        tuple | None: (宽, 高)，文件不存在或不是 PNG 时返回 None
+    """
+    count("open")
+    try:
+        with open(path, "rb") as f:
+            return parse_png_size(f.read(24))
+    except OSError:
+        return None
@@ -0,0 +1,276 @@
+# file: core/png_optimizer.py
+
+import io
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from core.backup_manifest import file_sha256
+from core.png_header import PNG_HEADER_SIZE, parse_png_header
+from core.op_stats import count
+
+
+# 自行编码时尝试的 zlib 策略
+_ZLIB_STRATEGIES = (
+    ("default", zlib.Z_DEFAULT_STRATEGY),
+    ("filtered", zlib.Z_FILTERED),
+    ("rle", getattr(zlib, "Z_RLE", zlib.Z_DEFAULT_STRATEGY)),
+)
+
+# PNG 颜色类型
+_COLOR_TYPES = {"L": 0, "RGB": 2, "P": 3, "RGBA": 6}
+
+
+def _chunk(chunk_type, data):
+    return (
+        struct.pack(">I", len(data)) + chunk_type + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF)
+    )
+
+
+def _encode_png(image, level, strategy):
+    """自行编码 PNG：每行使用 None 滤波，指定 zlib 压缩级别与策略，只写关键块（调色板透明度除外）"""
+    width, height = image.size
+    stride = width * len(image.mode) if image.mode != "P" else width
+    raw = image.tobytes()
+    rows = b"".join(b"\x00" + raw[y * stride:(y + 1) * stride] for y in range(height))
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 15, 9, strategy)
+    idat = compressor.compress(rows) + compressor.flush()
+
+    chunks = [_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, _COLOR_TYPES[image.mode], 0, 0, 0))]
+    if image.mode == "P":
+        palette = image.getpalette("RGBA")
+        colors = image.getextrema()[1] + 1
+        rgba = palette[:colors * 4]
+        chunks.append(_chunk(b"PLTE", bytes(v for i, v in enumerate(rgba) if i % 4 != 3)))
+        alpha = bytes(rgba[3::4])
+        # 读取的调色板图片透明度保存在 info 中（tRNS 原样）
+        transparency = image.info.get("transparency")
+        if isinstance(transparency, bytes):
+            alpha = transparency[:colors]
+        alpha = alpha.rstrip(b"\xff")
+        if alpha:
+            chunks.append(_chunk(b"tRNS", alpha))
+    chunks.append(_chunk(b"IDAT", idat))
+    chunks.append(_chunk(b"IEND", b""))
+    return b"\x89PNG\r\n\x1a\n" + b"".join(chunks)
+
+
+def _decode_time(data, repeat=3):
+    """解码 PNG 数据的耗时（取多次中的最短值，秒）"""
+    from PIL import Image
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _pixels(image):
+    """用于比较是否无损的像素数据（统一转换为 RGBA）"""
+    return image.convert("RGBA").tobytes()
+
+
+class PngOptimizer:
+    """PNG 无损优化 - 部署启动图前去除附加块、选择最优的滤波方式与 zlib 参数
+
+    候选编码：
+        - Pillow 自适应滤波，压缩级别 9（optimize=True）
+        - 每行 None 滤波，zlib 级别 9，分别使用 default / filtered / rle 策略
+    图片颜色不超过 256 种且转换为调色板后像素完全一致时，同样尝试调色板编码；
+    完全不透明的 RGBA 图片会先无损转换为 RGB。候选从小到大与原图逐像素比较，取第一个确认无损的结果。
+    16 位深、灰度 + 透明等 Pillow 解码时会截断或转换的图片原样使用，不做优化。
+
+    结果以源文件哈希为键缓存在 cache_dir 中（<sha256>.png 与报告 <sha256>.json），
+    优化后没有变小时只缓存报告，继续使用原图。
+    """
+
+    def __init__(self, cache_dir, enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        try:
+            from PIL import Image  # noqa: F401
+            self.available = True
+        except ImportError:
+            self.available = False
+
+    def _paths(self, sha256):
+        base = os.path.join(self.cache_dir, sha256)
+        return base + ".png", base + ".json"
+
+    def optimize(self, source_path, sha256=None):
+        """获取源图片的优化版本
+
+        Args:
+            source_path: 源图片路径
+            sha256: 源文件哈希（可选，已知时不再计算）
+
+        Returns:
+            dict | None: 优化报告，未启用或 Pillow 不可用时返回 None
+                {"source", "path", "optimized", "original_bytes", "optimized_bytes", "saved_bytes",
+                 "decode_before_ms", "decode_after_ms", "method", "palette", "cached"}
+                其中 path 为应使用的文件（没有变小时为源文件本身）
+        """
+        if not self.enabled or not self.available:
+            return None
+        if sha256 is None:
+            sha256 = file_sha256(source_path)
+        png_path, report_path = self._paths(sha256)
+
+        # 同一来源的优化串行执行，避免并行目标重复编码
+        with self._lock:
+            report = self._load_report(report_path, png_path)
+            if report is None:
+                report = self._optimize(source_path, png_path, report_path)
+                report["cached"] = False
+            else:
+                report["cached"] = True
+        report["source"] = source_path
+        report["path"] = png_path if report["optimized"] else source_path
+        return report
+
+    @staticmethod
+    def _load_report(report_path, png_path):
+        count("stat")
+        if not os.path.isfile(report_path):
+            return None
+        try:
+            with open(report_path, "r", encoding="utf-8") as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if report.get("optimized") and not os.path.isfile(png_path):
+            return None
+        return report
+
+    def _optimize(self, source_path, png_path, report_path):
+        count("optimize")
+        with open(source_path, "rb") as f:
+            original = f.read()
+        best_data, best_method = original, "original"
+        image = self._load_supported(original)
+        if image is not None:
+            best_data, best_method = self._best_candidate(image, original)
+
+        optimized = best_data is not original
+        report = {
+            "optimized": optimized,
+            "original_bytes": len(original),
+            "optimized_bytes": len(best_data),
+            "saved_bytes": len(original) - len(best_data),
+            "decode_before_ms": round(_decode_time(original) * 1000, 2),
+            "decode_after_ms": round(_decode_time(best_data) * 1000, 2) if optimized else None,
+            "method": best_method,
+            "palette": optimized and best_method.startswith("palette"),
+        }
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if optimized:
+            self._atomic_write(png_path, best_data)
+        self._atomic_write(report_path, json.dumps(report, ensure_ascii=False, indent=2).encode("utf-8"))
+        return report
+
+    @staticmethod
+    def _load_supported(data):
+        """解码可以无损重新编码的图片，其他图片返回 None（原样使用）
+
+        先读取 IHDR：16 位深与灰度 + 透明的图片解码时会被截断或转换，不做优化；
+        解码后的模式不是 L、RGB、RGBA、P 时同样不做优化。
+        """
+        from PIL import Image
+
+        header = parse_png_header(data[:PNG_HEADER_SIZE])
+        if header is None or header["bit_depth"] == 16 or header["color_type"] == 4:
+            return None
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+        return image if image.mode in _COLOR_TYPES else None
+
+    def _best_candidate(self, image, original):
+        """体积最小且逐像素确认无损的候选编码，都不满足时返回原图
+
+        Returns:
+            tuple: (PNG 数据, 方式)
+        """
+        from PIL import Image
+
+        reference = _pixels(image)
+
+        # 去除附加块（文本、时间、ICC 等），只保留透明色
+        image.info = {key: value for key, value in image.info.items() if key == "transparency"}
+        bases = [image]
+        # 完全不透明的 RGBA 无损转换为 RGB
+        if image.mode == "RGBA" and image.getchannel("A").getextrema() == (255, 255):
+            bases = [image.convert("RGB")]
+        if bases[0].mode != "P":
+            palette = self._to_palette(bases[0], reference)
+            if palette is not None:
+                bases.append(palette)
+
+        candidates = sorted(
+            (len(data), index, method, data)
+            for index, (method, data) in enumerate(
+                candidate for base in bases for candidate in self._candidates(base)
+            )
+            if len(data) < len(original)
+        )
+        # 从小到大逐个确认无损，某个候选不一致时尝试下一个
+        for _, _, method, data in candidates:
+            with Image.open(io.BytesIO(data)) as check:
+                check.load()
+                if _pixels(check) == reference:
+                    return data, method
+        return original, "original"
+
+    @staticmethod
+    def _to_palette(image, reference):
+        """颜色不超过 256 种时转换为调色板图片，像素不完全一致时返回 None"""
+        if image.getcolors(256) is None:
+            return None
+        try:
+            if image.mode == "RGBA":
+                palette = image.quantize(colors=256, method=2)  # FASTOCTREE（支持透明度）
+            else:
+                palette = image.convert("RGB").quantize(colors=256, method=0)  # MEDIANCUT
+        except Exception:
+            return None
+        return palette if _pixels(palette) == reference else None
+
+    @staticmethod
+    def _candidates(image):
+        """生成候选编码 [(方式, PNG 数据)]"""
+        prefix = "palette_" if image.mode == "P" else ""
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+        yield f"{prefix}pillow_adaptive", buffer.getvalue()
+        for name, strategy in _ZLIB_STRATEGIES:
+            yield f"{prefix}none_{name}", _encode_png(image, 9, strategy)
+
+    @staticmethod
+    def _atomic_write(path, data):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def describe_optimization(report):
+    """优化报告的简短说明，没有优化时返回空字符串"""
+    if not report or not report.get("optimized"):
+        return ""
+    return (
+        f"PNG 优化节省 {report['saved_bytes'] / 1024:.1f} KB，"
+        f"解码 {report['decode_before_ms']:.1f} → {report['decode_after_ms']:.1f} ms"
+    )
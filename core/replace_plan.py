@@ -0,0 +1,125 @@
+# file: core/replace_plan.py
+
+
+# 目标的计划动作
+ACTION_REPLACE = "replace"        # 需要写入
+ACTION_UP_TO_DATE = "up_to_date"  # 已是所选图片，不会改动
+ACTION_MISSING = "missing"        # 目标不存在
+
+# 备份情况
+BACKUP_PRESENT = "present"        # 已有备份
+BACKUP_REFERENCE = "reference"    # 备份库中已有相同内容，只需登记引用
+BACKUP_NEEDED = "needed"          # 需要写入新的备份
+
+
+class TargetPlan:
+    """单个目标的替换计划
+
+    属性:
+        path: 目标路径
+        state: 规划时探测的 TargetState（执行计划时直接使用，不再重新探测）
+        action: 计划动作（ACTION_*）
+        bytes_to_write: 预计写入目标的字节数
+        backup: 备份情况（BACKUP_*），不需要写入时为 None
+        backup_bytes: 预计写入备份库的字节数
+        strip_protection: 是否需要先移除保护
+        reapply_protection: 写入后是否重新设置保护
+        permission_problem: 预计的权限问题说明，没有时为 None
+        source: 写入该目标的图片（按目标尺寸渲染的变体），为 None 时使用计划的源图片
+    """
+
+    def __init__(self, path, state, action, bytes_to_write=0, backup=None, backup_bytes=0,
+                 strip_protection=False, reapply_protection=False, permission_problem=None, source=None):
+        self.path = path
+        self.state = state
+        self.source = source
+        self.action = action
+        self.bytes_to_write = bytes_to_write
+        self.backup = backup
+        self.backup_bytes = backup_bytes
+        self.strip_protection = strip_protection
+        self.reapply_protection = reapply_protection
+        self.permission_problem = permission_problem
+
+    @property
+    def will_change(self):
+        """执行时是否会改动目标"""
+        return self.action == ACTION_REPLACE
+
+    def as_dict(self):
+        return {
+            "path": self.path,
+            "action": self.action,
+            "will_change": self.will_change,
+            "bytes_to_write": self.bytes_to_write,
+            "backup": self.backup,
+            "backup_bytes": self.backup_bytes,
+            "strip_protection": self.strip_protection,
+            "reapply_protection": self.reapply_protection,
+            "permission_problem": self.permission_problem,
+            "source": self.source.path if self.source is not None else None,
+        }
+
+
+class ReplacePlan:
+    """批量替换计划 - 由 ImageReplacer.plan_replace 只读地生成，可交给 replace_multiple_images 执行
+
+    属性:
+        source: 已读取的源图片（SourceImage，可能是无损优化后的版本），执行时直接使用
+        targets: TargetPlan 列表，顺序与传入的目标路径一致
+        write_mode: 规划时的写入方式
+        protect_enabled: 规划时是否启用文件保护
+    """
+
+    def __init__(self, source, targets, write_mode, protect_enabled):
+        self.source = source
+        self.targets = targets
+        self.write_mode = write_mode
+        self.protect_enabled = protect_enabled
+
+    @property
+    def paths(self):
+        return [target.path for target in self.targets]
+
+    @property
+    def changes(self):
+        """会被改动的目标"""
+        return [target for target in self.targets if target.will_change]
+
+    @property
+    def problems(self):
+        """预计有权限问题或不存在的目标"""
+        return [
+            target for target in self.targets
+            if target.permission_problem or target.action == ACTION_MISSING
+        ]
+
+    @property
+    def bytes_to_write(self):
+        """预计写入目标的总字节数"""
+        return sum(target.bytes_to_write for target in self.targets)
+
+    @property
+    def backup_bytes(self):
+        """预计写入备份库的总字节数"""
+        return sum(target.backup_bytes for target in self.targets)
+
+    def summary(self):
+        """计划摘要"""
+        up_to_date = sum(1 for target in self.targets if target.action == ACTION_UP_TO_DATE)
+        msg = f"共 {len(self.targets)} 个目标：{len(self.changes)} 个将被替换，{up_to_date} 个已是最新"
+        if self.problems:
+            msg += f"，{len(self.problems)} 个预计失败"
+        msg += f"；写入 {self.bytes_to_write / 1024:.1f} KB，备份 {self.backup_bytes / 1024:.1f} KB"
+        return msg
+
+    def as_dict(self):
+        return {
+            "source": self.source.origin_path,
+            "deployed": self.source.path,
+            "optimization": self.source.optimization,
+            "write_mode": self.write_mode,
+            "protect_enabled": self.protect_enabled,
+            "summary": self.summary(),
+            "targets": [target.as_dict() for target in self.targets],
+        }
@@ -1,57 +1,400 @@
 # file: core/replacer.py
 
 import os
-import shutil
 import stat
 import ctypes
-from datetime import datetime
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.backup_manifest import BackupManifest
+from core.hash_cache import hash_cache
+from core.image_renderer import ImageRenderer, RENDER_OFF
+from core.png_header import parse_png_size, read_png_size
+from core.png_optimizer import PngOptimizer, describe_optimization
+from core.op_stats import OperationStats, count, track
+from core.replace_plan import (
+    ReplacePlan, TargetPlan, ACTION_REPLACE, ACTION_UP_TO_DATE, ACTION_MISSING,
+    BACKUP_PRESENT, BACKUP_REFERENCE, BACKUP_NEEDED,
+)
+from core.target_state import TargetState, PROTECTION_ATTRIBUTES
+from core.write_strategies import WRITE_COPY, WRITE_MODES, atomic_write
+from utils.resource_path import get_app_data_path
+from utils.splash_snapshot import SplashDirSnapshot
+
+
+# 批量替换 / 还原的最大并行数
+MAX_WRITE_WORKERS = 4
+
+
+class SourceImage:
+    """源图片数据 - 只读取一次源文件，批量替换的所有目标共用这份只读数据"""
+    
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = f.read()
+        self.size = len(self.data)
+        self.sha256 = hashlib.sha256(self.data).hexdigest()
+        # PNG 宽高（不是 PNG 时为 None）
+        self.dimensions = parse_png_size(self.data[:24])
+        # 用户选择的原始图片路径（使用优化版本时与 path 不同）
+        self.origin_path = path
+        # PNG 优化报告（见 core.png_optimizer），未优化时为 None
+        self.optimization = None
+        self._variants = {}
+        self._lock = threading.Lock()
+    
+    def variant(self, renderer, width, height, prepare=None):
+        """源图片在指定尺寸下的变体（同一批次内每个尺寸只加载一次）
+        
+        Args:
+            renderer: ImageRenderer
+            width / height: 目标尺寸
+            prepare: 加载变体后的处理（如 PNG 优化），返回处理后的 SourceImage
+        """
+        key = (width, height)
+        with self._lock:
+            variant = self._variants.get(key)
+        if variant is None:
+            variant = SourceImage(renderer.render(self.path, self.sha256, width, height))
+            if prepare is not None:
+                variant = prepare(variant)
+            with self._lock:
+                variant = self._variants.setdefault(key, variant)
+        return variant
 
 
 class ImageReplacer:
     """图片替换器 - 增强版文件保护"""
     
-    def __init__(self, config_manager=None, backup_dir="backups"):
+    # 目标已是所选图片时的结果消息
+    UP_TO_DATE_MSG = "已是最新，无需替换"
+    
+    # 批量结果中每个目标的状态
+    STATUS_REPLACED = "replaced"
+    STATUS_RESTORED = "restored"
+    STATUS_UP_TO_DATE = "up_to_date"
+    STATUS_MISSING = "missing"
+    STATUS_FAILED = "failed"
+    FAILED_STATUSES = (STATUS_MISSING, STATUS_FAILED)
+    
+    def __init__(self, config_manager=None, backup_dir="backups", max_workers=MAX_WRITE_WORKERS, write_mode=None,
+                 render_mode=None, render_cache_dir=None, optimize=None, optimize_cache_dir=None, metadata_lookup=None):
         self.config_manager = config_manager
         self.backup_dir = backup_dir
+        self.max_workers = max_workers
+        # 写入方式（见 core.write_strategies），未指定时读取配置
+        if write_mode is None:
+            write_mode = config_manager.get_write_mode() if config_manager else WRITE_COPY
+        self.write_mode = write_mode if write_mode in WRITE_MODES else WRITE_COPY
+        # 按目标原生尺寸渲染启动图变体（见 core.image_renderer），未指定时读取配置
+        if render_mode is None:
+            render_mode = config_manager.get_render_mode() if config_manager else RENDER_OFF
+        self.renderer = ImageRenderer(render_cache_dir or get_app_data_path("cache/renders"), render_mode)
+        # 部署前无损优化 PNG（见 core.png_optimizer），未指定时读取配置
+        if optimize is None:
+            optimize = config_manager.get_png_optimize() if config_manager else True
+        self.optimizer = PngOptimizer(optimize_cache_dir or get_app_data_path("cache/optimized"), optimize)
+        # 图片库的 PNG 元数据查询 metadata_lookup(path) -> dict | None（见 ImageManager.get_image_metadata），
+        # 未提供时直接读取 PNG 头
+        self.metadata_lookup = metadata_lookup
+        # 并行处理时保护配置的写入需要串行
+        self._config_lock = threading.Lock()
+        # 每次替换 / 还原调用的系统调用计数与耗时
+        self.call_stats = OperationStats()
         os.makedirs(backup_dir, exist_ok=True)
+        # 备份索引：以完整目标路径为键，首次运行时把旧版备份分配给配置中记录的目标
+        self.manifest = BackupManifest(backup_dir, known_targets=self._known_targets)
+    
+    def _known_targets(self):
+        """配置中记录的目标文件（当前路径与历史路径；WPS 为 splash 目录中的启动图）"""
+        if self.config_manager is None:
+            return []
+        targets = []
+        for page in ("home", "wps"):
+            paths = [self.config_manager.get_target_path(page)] + list(self.config_manager.get_path_history(page))
+            for path in paths:
+                if not path:
+                    continue
+                if page == "wps":
+                    targets.extend(SplashDirSnapshot.capture(path, with_stats=False).paths)
+                else:
+                    targets.append(path)
+        return targets
     
     def has_backup(self, target_path):
         """检查是否已存在备份"""
         if not target_path or not os.path.exists(target_path):
             return False
-        
-        base_name = os.path.basename(target_path)
-        # 检查backups目录下是否有以该文件名开头的备份
-        for filename in os.listdir(self.backup_dir):
-            if filename.startswith(os.path.splitext(base_name)[0] + "_"):
-                return True
-        return False
+        return self._find_backup(target_path) is not None
+    
+    def _find_backup(self, target_path):
+        """查找目标文件的备份文件路径（索引中有记录且文件仍存在），没有时返回 None"""
+        entry = self.manifest.lookup(target_path)
+        if entry is None:
+            return None
+        backup_path = self.manifest.backup_path(entry)
+        count("stat")
+        return backup_path if os.path.exists(backup_path) else None
     
-    def backup_original(self, target_path):
-        """备份原始文件"""
-        if not os.path.exists(target_path):
+    def backup_original(self, target_path, state=None):
+        """备份原始文件
+        
+        备份按内容去重：先流式计算原始文件的哈希，备份库中已有相同内容时只登记引用，
+        不再复制文件；否则写入 objects/<sha256>.png（先写临时文件再替换）。
+        已有备份的目标被换成了新的原始文件（如希沃更新）时，新的原始文件作为新一代备份。
+        
+        Args:
+            target_path: 目标路径
+            state: 已探测的 TargetState（可选，避免重复 stat）
+        """
+        if state is None:
+            state = TargetState.probe(target_path)
+        if not state.exists:
             return False, "目标文件不存在", False
         
-        # 检查是否已有备份
-        if self.has_backup(target_path):
+        # 检查是否已有备份（迁移时分配的旧版备份不代替目标自己的原始文件，见下）
+        entry = self.manifest.lookup(target_path)
+        has_backup = self._find_backup(target_path) is not None
+        if not self._may_need_backup(entry, has_backup):
             return True, "检测到已有备份，跳过备份步骤", False
         
         try:
-            # 生成备份文件名
-            base_name = os.path.basename(target_path)
-            name_without_ext = os.path.splitext(base_name)[0]
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"{name_without_ext}_{timestamp}.png"
-            backup_path = os.path.join(self.backup_dir, backup_filename)
+            sha256 = hash_cache.sha256(target_path, state.stat)
+            record = self._backup_recorder(entry, has_backup, sha256)
+            if record is None:
+                return True, "检测到已有备份，跳过备份步骤", False
+            object_filename = self.manifest.object_filename(sha256)
             
-            # 执行备份
-            shutil.copy2(target_path, backup_path)
-            return True, f"已备份原始文件: {backup_filename}", False
+            # 持有备份索引的锁直到登记完成，避免 gc 删除尚未登记的对象文件
+            with self.manifest.lock:
+                count("stat")
+                if self.manifest.has_object(sha256):
+                    # 相同内容已备份过，只登记引用
+                    size = state.size
+                    record(target_path, object_filename, sha256, size)
+                    return True, f"已备份原始文件（与已有备份内容相同）: {sha256[:12]}", False
+                
+                # 执行备份，并登记到备份索引
+                object_path = self.manifest.object_path(sha256)
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                _, size = atomic_write(target_path, object_path, self.write_mode, allow_link=False)
+                record(target_path, object_filename, sha256, size)
+            return True, f"已备份原始文件: {sha256[:12]}", False
         except PermissionError:
             return False, "备份失败: 权限不足", True
         except Exception as e:
             return False, f"备份失败: {str(e)}", False
     
+    @staticmethod
+    def _may_need_backup(entry, has_backup):
+        """不计算哈希能否确定目标不需要备份（已有备份且程序未写入过目标时直接跳过）"""
+        return not has_backup or bool(entry.get("legacy")) or "deployed" in entry
+    
+    def _backup_recorder(self, entry, has_backup, sha256):
+        """目标当前内容为 sha256 时用于登记备份的方法，不需要备份时返回 None"""
+        if not has_backup:
+            return self.manifest.record
+        if self.manifest.needs_own_backup(entry, sha256):
+            # 使用旧版备份的目标：当前内容另行备份，旧版备份仍作为还原来源
+            return self.manifest.record_own
+        if self.manifest.needs_new_generation(entry, sha256):
+            # 原始文件已被替换：作为新一代备份，之前的一代移入历史，由 compact 按保留策略清理
+            return self.manifest.record_generation
+        return None
+    
+    def is_up_to_date(self, source, target_path, state=None):
+        """检查目标文件内容是否已与源图片相同
+        
+        先比较大小，大小相同时再比较哈希（按路径、大小、修改时间缓存），
+        不需要修改目标文件的属性。
+        
+        Args:
+            source: 源图片路径，或已读取的 SourceImage
+            target_path: 目标路径
+            state: 已探测的 TargetState（可选，避免重复 stat）
+        """
+        if state is None:
+            state = TargetState.probe(target_path)
+        if not state.exists:
+            return False
+        target_stat = state.stat
+        try:
+            if isinstance(source, SourceImage):
+                if source.size != target_stat.st_size:
+                    return False
+                source_sha256 = source.sha256
+            else:
+                count("stat")
+                source_stat = os.stat(source)
+                if source_stat.st_size != target_stat.st_size:
+                    return False
+                source_sha256 = hash_cache.sha256(source, source_stat)
+            return hash_cache.sha256(target_path, target_stat) == source_sha256
+        except OSError:
+            return False
+    
+    def gc_backups(self):
+        """清理不再被任何目标引用的备份对象
+        
+        Returns:
+            tuple: (删除的文件数, 释放的字节数)
+        """
+        return self.manifest.gc()
+    
+    def compact_backups(self, retention=None, dry_run=False):
+        """按保留策略压缩备份：删除被取代的旧版备份与未引用的备份对象
+        
+        每个目标最早的原始文件与仍被引用的备份始终保留。
+        
+        Args:
+            retention: 保留策略 {"keep_generations", "max_total_mb", "max_age_days"}，
+                未指定时读取配置
+            dry_run: 只统计将要删除的文件，不实际删除
+        
+        Returns:
+            dict: {"removed", "removed_objects", "freed", "kept", "total_before", "total_after",
+                   "over_limit", "dry_run"}
+        """
+        if retention is None:
+            retention = self.config_manager.get_backup_retention() if self.config_manager else {}
+        with track("compact", self.call_stats):
+            report = self.manifest.compact(
+                keep_generations=retention.get("keep_generations", 0),
+                max_total_bytes=retention.get("max_total_mb", 0) * 1024 * 1024,
+                max_age=retention.get("max_age_days", 0) * 86400,
+                dry_run=dry_run,
+            )
+        report["dry_run"] = dry_run
+        return report
+    
+    def _native_size(self, target_path):
+        """目标的原生尺寸：优先读取目标自己的原始文件备份的 PNG 头，没有时读取目标本身
+        
+        迁移时分配的旧版备份可能来自其他同名目标，不用来判断尺寸。
+        """
+        entry = self.manifest.lookup(target_path)
+        own = entry.get("own") if entry and entry.get("legacy") else entry
+        if own is not None:
+            size = read_png_size(self.manifest.backup_path(own))
+            if size is not None:
+                return size
+        return read_png_size(target_path)
+    
+    def _source_size(self, source_path):
+        """源图片的尺寸：优先查询图片库的 PNG 元数据索引"""
+        if self.metadata_lookup is not None:
+            metadata = self.metadata_lookup(source_path)
+            return (metadata["width"], metadata["height"]) if metadata else None
+        return read_png_size(source_path)
+    
+    def check_compatibility(self, source_path, target_paths):
+        """检查源图片与各目标的尺寸是否一致（只读取 PNG 头，不解码图片）
+        
+        Args:
+            source_path: 源图片路径
+            target_paths: 目标文件路径列表，或 SplashDirSnapshot
+        
+        Returns:
+            list[dict]: 每个目标的结果
+                {"path", "source_size", "native_size", "compatible", "render"}
+                render 为替换时是否会按目标尺寸渲染变体；尺寸未知时 compatible 为 True
+        """
+        if isinstance(target_paths, SplashDirSnapshot):
+            target_paths = target_paths.paths
+        source_size = self._source_size(source_path)
+        results = []
+        for target_path in target_paths:
+            native = self._native_size(target_path)
+            compatible = source_size is None or native is None or native == source_size
+            results.append({
+                "path": target_path,
+                "source_size": source_size,
+                "native_size": native,
+                "compatible": compatible,
+                "render": not compatible and self.renderer.enabled,
+            })
+        return results
+    
+    def prepare_source(self, source_path):
+        """预先做源图片的 PNG 优化并写入缓存（可在后台线程中调用）
+        
+        选中图片时在后台调用，之后替换时 _load_source 直接命中优化缓存，
+        不在界面线程中搜索候选编码；优化仍在进行时替换会等待同一次优化完成，不会重复编码。
+        
+        Returns:
+            dict | None: 优化报告（见 core.png_optimizer），未启用优化时为 None
+        """
+        return self._load_source(source_path).optimization
+    
+    def _load_source(self, source_path):
+        """读取源图片并做无损 PNG 优化（结果按源文件哈希缓存）"""
+        return self._optimize_source(SourceImage(source_path))
+    
+    def _optimize_source(self, source):
+        """使用源图片的优化版本；没有变小或优化失败时使用原图"""
+        try:
+            report = self.optimizer.optimize(source.path, source.sha256)
+        except Exception as e:
+            print(f"PNG 优化失败，使用原图: {e}")
+            return source
+        if report is None or not report["optimized"]:
+            source.optimization = report
+            return source
+        optimized = SourceImage(report["path"])
+        optimized.origin_path = source.origin_path
+        optimized.optimization = report
+        return optimized
+    
+    @staticmethod
+    def _with_optimization_note(msg, source):
+        """在结果消息后附上 PNG 优化的节省量与解码耗时"""
+        note = describe_optimization(source.optimization)
+        return f"{msg} | {note}" if note else msg
+    
+    def _source_for_target(self, source, target_path):
+        """选择写入目标的图片：尺寸与目标不同时使用按目标尺寸渲染的变体"""
+        if not self.renderer.enabled or source.dimensions is None:
+            return source
+        native = self._native_size(target_path)
+        if native is None or native == source.dimensions:
+            return source
+        try:
+            return source.variant(self.renderer, *native, prepare=self._optimize_source)
+        except Exception as e:
+            print(f"生成 {native[0]}x{native[1]} 启动图失败，使用原图: {e}")
+            return source
+    
+    def _clear_protection(self, state):
+        """根据目标状态移除只读 / 隐藏 / 系统属性，只做必要的一次调用
+        
+        Windows 上一次 SetFileAttributesW 同时清除三种属性；其他平台只补回写权限位。
+        
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            if os.name == 'nt' and state.protection_attributes:
+                count("set_attributes")
+                new_attrs = state.attributes & ~PROTECTION_ATTRIBUTES
+                # 属性为 0 时需要使用 FILE_ATTRIBUTE_NORMAL
+                if not ctypes.windll.kernel32.SetFileAttributesW(state.path, new_attrs or 0x80):
+                    return False
+            elif state.readonly:
+                count("chmod")
+                os.chmod(state.path, state.mode | stat.S_IWUSR)
+        except Exception:
+            return False
+        
+        # 从配置中移除记录（如果提供了配置管理器）
+        if self.config_manager:
+            try:
+                with self._config_lock:
+                    self.config_manager.remove_protected_file(state.path)
+            except Exception:
+                pass
+        return True
+    
     def remove_readonly(self, filepath):
         """移除文件只读属性"""
         try:
@@ -64,7 +407,9 @@ class ImageReplacer:
     def set_readonly(self, filepath):
         """设置文件只读属性"""
         try:
+            count("stat")
             if os.path.exists(filepath):
+                count("chmod")
                 os.chmod(filepath, stat.S_IREAD)
             return True
         except:
@@ -77,6 +422,7 @@ class ImageReplacer:
         Returns:
             tuple: (是否成功, 保护详情)
         """
+        count("stat")
         if not os.path.exists(filepath):
             return False, "文件不存在"
         
@@ -91,10 +437,12 @@ class ImageReplacer:
             try:
                 if os.name == 'nt':  # Windows系统
                     # 获取当前文件属性
+                    count("get_attributes")
                     attrs = ctypes.windll.kernel32.GetFileAttributesW(filepath)
                     if attrs != -1:
                         # 添加系统文件属性 (0x4) 和隐藏属性 (0x2)
                         new_attrs = attrs | 0x4 | 0x2  # FILE_ATTRIBUTE_SYSTEM | FILE_ATTRIBUTE_HIDDEN
+                        count("set_attributes")
                         if ctypes.windll.kernel32.SetFileAttributesW(filepath, new_attrs):
                             protection_methods.append("系统保护")
             except Exception:
@@ -114,7 +462,8 @@ class ImageReplacer:
                 # 记录受保护的文件路径到配置（如果提供了配置管理器）
                 if self.config_manager:
                     try:
-                        self.config_manager.add_protected_file(filepath)
+                        with self._config_lock:
+                            self.config_manager.add_protected_file(filepath)
                     except Exception:
                         pass
                 return True, f"已启用保护: {' + '.join(protection_methods)}"
@@ -153,7 +502,8 @@ class ImageReplacer:
             # 从配置中移除记录（如果提供了配置管理器）
             if self.config_manager:
                 try:
-                    self.config_manager.remove_protected_file(filepath)
+                    with self._config_lock:
+                        self.config_manager.remove_protected_file(filepath)
                 except Exception:
                     pass
 
@@ -208,43 +558,88 @@ class ImageReplacer:
         if not os.path.exists(source_path):
             return False, "源图片不存在", False
         
-        if not os.path.exists(target_path):
-            return False, "目标路径不存在", False
+        try:
+            source = self._load_source(source_path)
+        except OSError as e:
+            return False, f"无法读取源图片: {str(e)}", False
         
-        # 检查目标文件是否受保护，如果是则先移除保护
-        was_protected = self.is_file_protected(target_path)
-        if was_protected:
-            remove_success, remove_msg = self.remove_enhanced_protection(target_path)
-            if not remove_success:
-                return False, f"无法移除现有保护: {remove_msg}", True
+        with track("replace", self.call_stats):
+            success, msg, is_perm_error, status, _ = self._replace_one(source, target_path, config_manager)
+        if status == self.STATUS_REPLACED:
+            msg = self._with_optimization_note(msg, source)
+        return success, msg, is_perm_error
+    
+    def _write_source(self, source, target_path, allow_link=True):
+        """把源图片写入目标文件（临时文件 + os.replace 原子替换），保留源文件的时间戳等元数据
+        
+        Args:
+            source: SourceImage
+            target_path: 目标路径
+            allow_link: 是否允许硬链接到图片库中的源文件
+        
+        Returns:
+            int: 写入字节数
+        """
+        _, size = atomic_write(source.path, target_path, self.write_mode, data=source.data, allow_link=allow_link)
+        # 写入的内容已知，登记哈希，下次比较时不必重新读取目标
+        count("stat")
+        hash_cache.remember(target_path, os.stat(target_path), source.sha256)
+        return size
+    
+    def _replace_one(self, source, target_path, config_manager=None, target_plan=None):
+        """
+        替换单个目标文件
+        
+        Args:
+            source: SourceImage（批量替换时所有目标共用）
+            target_path: 目标路径
+            config_manager: 配置管理器实例（可选）
+            target_plan: 预先生成的 TargetPlan（可选，提供时直接使用规划结果，不再探测目标）
+        
+        Returns:
+            tuple: (成功与否, 消息, 是否为权限问题, 状态, 写入字节数)
+        """
+        if target_plan is not None:
+            state = target_plan.state
+            source = target_plan.source or source
+            if target_plan.action == ACTION_MISSING:
+                return False, "目标路径不存在", False, self.STATUS_MISSING, 0
+            if target_plan.action == ACTION_UP_TO_DATE:
+                return True, self.UP_TO_DATE_MSG, False, self.STATUS_UP_TO_DATE, 0
+        else:
+            # 一次 stat 得到目标的存在性、大小、修改时间与属性，后续流程都使用该状态
+            state = TargetState.probe(target_path)
+            if not state.exists:
+                return False, "目标路径不存在", False, self.STATUS_MISSING, 0
+            
+            # 尺寸与目标不同时改用按目标尺寸渲染的变体
+            source = self._source_for_target(source, target_path)
+            
+            # 目标已是所选图片时不做任何改动（不移除保护、不备份、不写入）
+            if self.is_up_to_date(source, target_path, state):
+                return True, self.UP_TO_DATE_MSG, False, self.STATUS_UP_TO_DATE, 0
         
-        # 先检查写权限
-        has_permission, perm_msg, is_permission_error = self.check_write_permission(target_path)
-        if not has_permission and is_permission_error:
-            return False, "权限不足，无法写入文件", True
+        # 目标受保护（只读）时先移除保护；没有写权限等情况在写入时以 PermissionError 报告
+        if state.protected and not self._clear_protection(state):
+            return False, "无法移除现有保护", True, self.STATUS_FAILED, 0
         
         try:
             # 备份原始文件
-            backup_success, backup_msg, backup_perm_error = self.backup_original(target_path)
-            if not backup_success and not self.has_backup(target_path):
-                return False, backup_msg, backup_perm_error
+            backup_success, backup_msg, backup_perm_error = self.backup_original(target_path, state)
+            if not backup_success:
+                return False, backup_msg, backup_perm_error, self.STATUS_FAILED, 0
             
-            # 移除只读属性（为了替换）
-            try:
-                if not os.access(target_path, os.W_OK):
-                    if not self.remove_readonly(target_path):
-                        return False, "无法移除只读属性", True
-            except Exception as e:
-                return False, f"检查文件属性失败: {str(e)}", False
-            
-            # 执行替换
-            shutil.copy2(source_path, target_path)
+            # 执行替换（启用保护时目标属性会被修改，不能与图片库中的源文件共用硬链接）
+            protect_enabled = bool(config_manager and config_manager.get_file_protection_enabled())
+            written = self._write_source(source, target_path, allow_link=not protect_enabled)
+            # 记录写入的内容，之后目标内容变为其他图片时可以识别出新的原始文件
+            self.manifest.mark_deployed(target_path, source.sha256)
 
             # 根据配置决定是否启用保护
             protect_success = False
             protect_msg = ""
             
-            if config_manager and config_manager.get_file_protection_enabled():
+            if protect_enabled:
                 # 只有在配置启用时才设置保护
                 protect_success, protect_msg = self.set_enhanced_protection(target_path)
             else:
@@ -262,201 +657,331 @@ class ImageReplacer:
             else:
                 success_msg += f" | {protect_msg}"
 
-            return True, success_msg, False
+            return True, success_msg, False, self.STATUS_REPLACED, written
             
         except PermissionError as e:
-            return False, f"权限不足: {str(e)}", True
+            return False, f"权限不足: {str(e)}", True, self.STATUS_FAILED, 0
         except OSError as e:
             if e.errno == 13:  # Permission denied
-                return False, "权限不足，无法替换文件", True
-            return False, f"替换失败: {str(e)}", False
+                return False, "权限不足，无法替换文件", True, self.STATUS_FAILED, 0
+            return False, f"替换失败: {str(e)}", False, self.STATUS_FAILED, 0
         except Exception as e:
-            return False, f"替换失败: {str(e)}", False
+            return False, f"替换失败: {str(e)}", False, self.STATUS_FAILED, 0
     
-    def replace_multiple_images(self, source_path, target_paths, config_manager=None):
+    def _run_batch(self, name, action, target_paths):
         """
-        批量替换多个图片文件并根据配置决定是否启用保护
+        用有界线程池并行处理多个目标
         
         Args:
-            source_path: 源图片路径
+            name: 调用名称（计入 call_stats）
+            action: 处理单个目标的函数，返回 (成功与否, 消息, 是否为权限问题, 状态, 字节数)
             target_paths: 目标文件路径列表
-            config_manager: 配置管理器实例（可选）
-            
+        
         Returns:
-            tuple: (成功与否, 消息, 是否为权限问题, 成功数量, 失败数量)
+            list: 按 target_paths 顺序排列的逐个结果，每项为
+                  {"path", "status", "bytes", "duration", "message", "permission_error", "syscalls"}
         """
-        if not os.path.exists(source_path):
-            return False, "源图片不存在", False, 0, 0
-
-        if not target_paths:
-            return False, "目标路径列表为空", False, 0, 0
-
-        success_count = 0
-        failed_count = 0
-        failed_files = []
-        permission_error = False
-
-        # 逐个替换文件
-        for target_path in target_paths:
-            if not os.path.exists(target_path):
-                failed_count += 1
-                failed_files.append(os.path.basename(target_path))
-                continue
-
-            success, msg, is_perm_error = self.replace_image(source_path, target_path, config_manager)
+        def run(target_path):
+            with track(name, self.call_stats) as call:
+                try:
+                    success, msg, is_perm_error, status, size = action(target_path)
+                except Exception as e:
+                    success, msg, is_perm_error, status, size = False, str(e), False, self.STATUS_FAILED, 0
+            return {
+                "path": target_path,
+                "status": status,
+                "bytes": size,
+                "duration": call.duration,
+                "message": msg,
+                "permission_error": is_perm_error,
+                "syscalls": dict(call.counts),
+            }
 
-            if success:
-                success_count += 1
-            else:
-                failed_count += 1
-                failed_files.append(os.path.basename(target_path))
-                if is_perm_error:
-                    permission_error = True
+        workers = max(1, min(self.max_workers, len(target_paths)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(run, target_paths))
+    
+    def _summarize_batch(self, results, action_name):
+        """
+        汇总批量结果
+        
+        Returns:
+            tuple: (成功与否, 消息, 是否为权限问题, 成功数量, 失败数量, 逐个结果)
+        """
+        total = len(results)
+        success_count = sum(1 for r in results if r["status"] not in self.FAILED_STATUSES)
+        up_to_date_count = sum(1 for r in results if r["status"] == self.STATUS_UP_TO_DATE)
+        failed_count = total - success_count
+        permission_error = any(r["permission_error"] for r in results)
 
-        # 构造返回消息
-        if success_count == len(target_paths):
+        if up_to_date_count == total:
+            # 全部已是最新
+            msg = f"全部 {total} 个文件{self.UP_TO_DATE_MSG}"
+        elif success_count == total:
             # 全部成功
-            msg = f"成功替换 {success_count} 个文件"
+            msg = f"成功{action_name} {success_count} 个文件"
+            if up_to_date_count:
+                msg += f"（其中 {up_to_date_count} 个已是最新）"
         elif success_count > 0:
             # 部分成功
-            msg = f"成功替换 {success_count} 个文件，{failed_count} 个失败"
-            if failed_files:
-                msg += f"\n失败文件: {', '.join(failed_files[:5])}"  # 最多显示5个失败文件名
-                if len(failed_files) > 5:
-                    msg += f" 等共 {len(failed_files)} 个"
+            msg = f"成功{action_name} {success_count} 个文件，{failed_count} 个失败"
         else:
             # 全部失败
-            msg = f"替换失败: 所有 {len(target_paths)} 个文件都无法替换"
-            if failed_files:
-                msg += f"\n失败文件: {', '.join(failed_files[:5])}"
-                if len(failed_files) > 5:
-                    msg += f" 等共 {len(failed_files)} 个"
+            msg = f"{action_name}失败: 所有 {total} 个文件都无法{action_name}"
 
         # 如果至少有一个成功，则认为整体成功
         overall_success = success_count > 0
 
-        return overall_success, msg, permission_error, success_count, failed_count
+        return overall_success, msg, permission_error, success_count, failed_count, results
     
-    def restore_backup(self, target_path):
-        """
-        从备份还原并移除保护
+    def _expected_permission_problem(self, state, admin):
+        """根据目标状态预判写入时的权限问题（只读检查，不修改任何文件）
+        
+        Args:
+            state: TargetState
+            admin: 当前是否以管理员权限运行
         
         Returns:
-            tuple: (成功与否, 消息, 是否为权限问题)
+            str | None: 预计的问题说明
         """
-        if not os.path.exists(target_path):
-            return False, "目标路径不存在", False
+        directory = os.path.dirname(os.path.abspath(state.path))
+        count("access")
+        if not os.access(directory, os.W_OK):
+            return "目标目录不可写"
+        if os.name == 'nt':
+            # Windows 上 os.access 不检查 ACL，系统目录下的文件按是否为管理员判断
+            if not admin and any(
+                os.path.normcase(directory).startswith(os.path.normcase(root) + os.sep)
+                for root in self._protected_roots()
+            ):
+                return "目标位于系统目录，需要管理员权限"
+        elif state.protected and hasattr(os, "geteuid"):
+            euid = os.geteuid()
+            if euid != 0 and state.stat.st_uid != euid:
+                return "目标文件只读且不属于当前用户，无法移除保护"
+        return None
+    
+    @staticmethod
+    def _protected_roots():
+        """需要管理员权限才能写入的系统目录"""
+        names = ("ProgramFiles", "ProgramFiles(x86)", "ProgramW6432", "SystemRoot")
+        return [os.environ[name] for name in names if os.environ.get(name)]
+    
+    def _plan_one(self, source, target_path, protect_enabled, admin, planned_objects, plan_lock):
+        """只读地规划单个目标
         
-        # 查找备份文件
-        base_name = os.path.basename(target_path)
-        name_without_ext = os.path.splitext(base_name)[0]
+        planned_objects: 本次计划中已安排写入备份库的内容哈希（内容相同的目标只需写入一次备份），
+                         由 plan_lock 保护
+        """
+        state = TargetState.probe(target_path)
+        if not state.exists:
+            return TargetPlan(target_path, state, ACTION_MISSING)
+        
+        source = self._source_for_target(source, target_path)
+        if self.is_up_to_date(source, target_path, state):
+            return TargetPlan(target_path, state, ACTION_UP_TO_DATE, source=source)
+        
+        permission_problem = self._expected_permission_problem(state, admin)
+        backup, backup_bytes = BACKUP_PRESENT, 0
+        entry = self.manifest.lookup(target_path)
+        has_backup = self._find_backup(target_path) is not None
+        if self._may_need_backup(entry, has_backup):
+            try:
+                sha256 = hash_cache.sha256(target_path, state.stat)
+                count("stat")
+                if self._backup_recorder(entry, has_backup, sha256) is not None:
+                    with plan_lock:
+                        already_planned = sha256 in planned_objects
+                        planned_objects.add(sha256)
+                    if already_planned or self.manifest.has_object(sha256):
+                        backup = BACKUP_REFERENCE
+                    else:
+                        backup, backup_bytes = BACKUP_NEEDED, state.size
+            except PermissionError:
+                backup, backup_bytes = BACKUP_NEEDED, state.size
+                permission_problem = permission_problem or "无法读取目标文件"
+            except OSError:
+                backup, backup_bytes = BACKUP_NEEDED, state.size
+        
+        return TargetPlan(
+            target_path, state, ACTION_REPLACE,
+            bytes_to_write=source.size,
+            backup=backup,
+            backup_bytes=backup_bytes,
+            strip_protection=state.protected,
+            reapply_protection=protect_enabled,
+            permission_problem=permission_problem,
+            source=source,
+        )
+    
+    def plan_replace(self, source_path, target_paths, config_manager=None):
+        """
+        生成批量替换计划（只读，不修改任何文件）
         
-        backup_file = None
-        for filename in os.listdir(self.backup_dir):
-            if filename.startswith(name_without_ext + "_"):
-                backup_file = filename
-                break
+        一次并行遍历所有目标：是否会改动、写入字节数、是否需要备份、
+        是否需要移除 / 重新设置保护、预计的权限问题。生成的计划可以直接交给
+        replace_multiple_images 执行，执行时不再重新探测目标。
+        目标尺寸与源图片不同时，规划阶段会生成渲染变体（只写入渲染缓存，不改动目标）。
         
-        if not backup_file:
-            return False, "未找到备份文件", False
+        Args:
+            source_path: 源图片路径
+            target_paths: 目标文件路径列表，或 SplashDirSnapshot
+            config_manager: 配置管理器实例（可选）
         
-        backup_path = os.path.join(self.backup_dir, backup_file)
+        Returns:
+            tuple: (成功与否, 消息, ReplacePlan 或 None)
+        """
+        if not os.path.exists(source_path):
+            return False, "源图片不存在", None
         
-        # 检查目标文件是否受保护，如果是则先移除保护
-        was_protected = self.is_file_protected(target_path)
-        if was_protected:
-            remove_success, remove_msg = self.remove_enhanced_protection(target_path)
-            if not remove_success:
-                return False, f"无法移除现有保护: {remove_msg}", True
+        if isinstance(target_paths, SplashDirSnapshot):
+            target_paths = target_paths.paths
         
-        # 先检查写权限
-        has_permission, perm_msg, is_permission_error = self.check_write_permission(target_path)
-        if not has_permission and is_permission_error:
-            return False, "权限不足，无法写入文件", True
+        if not target_paths:
+            return False, "目标路径列表为空", None
         
         try:
-            # 移除只读属性（为了还原）
-            try:
-                if not os.access(target_path, os.W_OK):
-                    if not self.remove_readonly(target_path):
-                        return False, "无法移除只读属性", True
-            except Exception as e:
-                return False, f"检查文件属性失败: {str(e)}", False
+            source = self._load_source(source_path)
+        except OSError as e:
+            return False, f"无法读取源图片: {str(e)}", None
+        
+        from utils.admin_helper import is_admin
+        admin = bool(is_admin())
+        protect_enabled = bool(config_manager and config_manager.get_file_protection_enabled())
+        planned_objects = set()
+        plan_lock = threading.Lock()
+        
+        def plan_one(target_path):
+            with track("plan", self.call_stats):
+                return self._plan_one(source, target_path, protect_enabled, admin, planned_objects, plan_lock)
+        
+        workers = max(1, min(self.max_workers, len(target_paths)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            targets = list(executor.map(plan_one, target_paths))
+        
+        plan = ReplacePlan(source, targets, self.write_mode, protect_enabled)
+        return True, plan.summary(), plan
+    
+    def replace_multiple_images(self, source_path, target_paths, config_manager=None):
+        """
+        批量替换多个图片文件并根据配置决定是否启用保护
+        
+        源图片只读取一次，所有目标共用同一份只读数据，由有界线程池并行写入。
+        
+        Args:
+            source_path: 源图片路径
+            target_paths: 目标文件路径列表、SplashDirSnapshot（文件已确认存在，不再逐个检查），
+                          或 plan_replace 生成的 ReplacePlan（直接按计划执行，不再探测目标）
+            config_manager: 配置管理器实例（可选）
             
-            # 执行还原
-            shutil.copy2(backup_path, target_path)
+        Returns:
+            tuple: (成功与否, 消息, 是否为权限问题, 成功数量, 失败数量, 逐个结果)
+                   逐个结果见 _run_batch
+        """
+        plan = target_paths if isinstance(target_paths, ReplacePlan) else None
+        if plan is not None:
+            if os.path.normcase(os.path.abspath(plan.source.origin_path)) != os.path.normcase(os.path.abspath(source_path)):
+                return False, "替换计划与所选图片不一致，请重新生成计划", False, 0, 0, []
+            source = plan.source
+            target_paths = plan.paths
+            target_plans = {target.path: target for target in plan.targets}
+        else:
+            if not os.path.exists(source_path):
+                return False, "源图片不存在", False, 0, 0, []
+
+            if isinstance(target_paths, SplashDirSnapshot):
+                target_paths = target_paths.paths
+
+            try:
+                source = self._load_source(source_path)
+            except OSError as e:
+                return False, f"无法读取源图片: {str(e)}", False, 0, 0, []
+            target_plans = {}
+
+        if not target_paths:
+            return False, "目标路径列表为空", False, 0, 0, []
+
+        results = self._run_batch(
+            "replace",
+            lambda target_path: self._replace_one(
+                source, target_path, config_manager, target_plans.get(target_path)
+            ),
+            target_paths,
+        )
+        summary = self._summarize_batch(results, "替换")
+        if any(r["status"] == self.STATUS_REPLACED for r in results):
+            summary = (summary[0], self._with_optimization_note(summary[1], source)) + summary[2:]
+        return summary
+    
+    def restore_backup(self, target_path):
+        """
+        从备份还原并移除保护
+        
+        Returns:
+            tuple: (成功与否, 消息, 是否为权限问题)
+        """
+        with track("restore", self.call_stats):
+            success, msg, is_perm_error, _, _ = self._restore_one(target_path)
+        return success, msg, is_perm_error
+    
+    def _restore_one(self, target_path):
+        """
+        还原单个目标文件
+        
+        Returns:
+            tuple: (成功与否, 消息, 是否为权限问题, 状态, 写入字节数)
+        """
+        # 一次 stat 得到目标的存在性与属性，后续流程都使用该状态
+        state = TargetState.probe(target_path)
+        if not state.exists:
+            return False, "目标路径不存在", False, self.STATUS_MISSING, 0
+        
+        # 查找备份文件（按完整目标路径查询备份索引）
+        backup_path = self._find_backup(target_path)
+        if not backup_path:
+            return False, "未找到备份文件", False, self.STATUS_FAILED, 0
+        
+        # 目标受保护（只读）时先移除保护；没有写权限等情况在写入时以 PermissionError 报告
+        was_protected = state.protected
+        if was_protected and not self._clear_protection(state):
+            return False, "无法移除现有保护", True, self.STATUS_FAILED, 0
+        
+        try:
+            # 执行还原（不使用硬链接，避免目标之后被修改时连带改动备份）
+            _, restored = atomic_write(backup_path, target_path, self.write_mode, allow_link=False)
             
             # 还原时不重新启用保护，保持原始状态
             success_msg = "已还原备份"
             if was_protected:
                 success_msg += " | 已移除文件保护"
             
-            return True, success_msg, False
+            return True, success_msg, False, self.STATUS_RESTORED, restored
             
         except PermissionError as e:
-            return False, f"权限不足: {str(e)}", True
+            return False, f"权限不足: {str(e)}", True, self.STATUS_FAILED, 0
         except OSError as e:
             if e.errno == 13:  # Permission denied
-                return False, "权限不足，无法还原文件", True
-            return False, f"还原失败: {str(e)}", False
+                return False, "权限不足，无法还原文件", True, self.STATUS_FAILED, 0
+            return False, f"还原失败: {str(e)}", False, self.STATUS_FAILED, 0
         except Exception as e:
-            return False, f"还原失败: {str(e)}", False
+            return False, f"还原失败: {str(e)}", False, self.STATUS_FAILED, 0
     
     def restore_multiple_backups(self, target_paths):
         """
-        批量从备份还原多个文件并移除保护
+        批量从备份还原多个文件并移除保护（有界线程池并行还原）
         
         Args:
-            target_paths: 目标文件路径列表
+            target_paths: 目标文件路径列表，或 SplashDirSnapshot（文件已确认存在，不再逐个检查）
             
         Returns:
-            tuple: (成功与否, 消息, 是否为权限问题, 成功数量, 失败数量)
+            tuple: (成功与否, 消息, 是否为权限问题, 成功数量, 失败数量, 逐个结果)
+                   逐个结果见 _run_batch
         """
+        if isinstance(target_paths, SplashDirSnapshot):
+            target_paths = target_paths.paths
+
         if not target_paths:
-            return False, "目标路径列表为空", False, 0, 0
-        
-        success_count = 0
-        failed_count = 0
-        failed_files = []
-        permission_error = False
-        
-        # 逐个还原文件
-        for target_path in target_paths:
-            if not os.path.exists(target_path):
-                failed_count += 1
-                failed_files.append(os.path.basename(target_path))
-                continue
-            
-            success, msg, is_perm_error = self.restore_backup(target_path)
-            
-            if success:
-                success_count += 1
-            else:
-                failed_count += 1
-                failed_files.append(os.path.basename(target_path))
-                if is_perm_error:
-                    permission_error = True
-        
-        # 构造返回消息
-        if success_count == len(target_paths):
-            # 全部成功
-            msg = f"成功还原 {success_count} 个文件"
-        elif success_count > 0:
-            # 部分成功
-            msg = f"成功还原 {success_count} 个文件，{failed_count} 个失败"
-            if failed_files:
-                msg += f"\n失败文件: {', '.join(failed_files[:5])}"  # 最多显示5个失败文件名
-                if len(failed_files) > 5:
-                    msg += f" 等共 {len(failed_files)} 个"
-        else:
-            # 全部失败
-            msg = f"还原失败: 所有 {len(target_paths)} 个文件都无法还原"
-            if failed_files:
-                msg += f"\n失败文件: {', '.join(failed_files[:5])}"
-                if len(failed_files) > 5:
-                    msg += f" 等共 {len(failed_files)} 个"
-        
-        # 如果至少有一个成功，则认为整体成功
-        overall_success = success_count > 0
+            return False, "目标路径列表为空", False, 0, 0, []
         
-        return overall_success, msg, permission_error, success_count, failed_count
+        results = self._run_batch("restore", self._restore_one, target_paths)
+        return self._summarize_batch(results, "还原")
@@ -0,0 +1,64 @@
+# file: core/target_state.py
+
+import os
+import stat
+from core.op_stats import count
+
+
+# Windows 文件属性
+FILE_ATTRIBUTE_READONLY = 0x1
+FILE_ATTRIBUTE_HIDDEN = 0x2
+FILE_ATTRIBUTE_SYSTEM = 0x4
+PROTECTION_ATTRIBUTES = FILE_ATTRIBUTE_READONLY | FILE_ATTRIBUTE_HIDDEN | FILE_ATTRIBUTE_SYSTEM
+
+
+class TargetState:
+    """目标文件状态 - 一次 stat 得到替换 / 还原流程需要的全部信息
+
+    属性:
+        path: 文件路径
+        stat: os.stat 结果，文件不存在或无法访问时为 None
+        exists: 是否存在（且为普通文件）
+        size / mtime_ns / mode: 大小、修改时间（纳秒）、权限位
+        attributes: Windows 文件属性（其他平台为 0）
+        readonly: 是否只读（只读属性或没有写权限位）
+        writable: 是否可写。只根据属性判断，ACL 等拒绝写入的情况在写入时以 PermissionError 报告
+    """
+
+    __slots__ = ("path", "stat", "exists", "size", "mtime_ns", "mode", "attributes", "readonly")
+
+    def __init__(self, path, st):
+        self.path = path
+        self.stat = st
+        self.exists = st is not None and stat.S_ISREG(st.st_mode)
+        self.size = st.st_size if st is not None else 0
+        self.mtime_ns = st.st_mtime_ns if st is not None else 0
+        self.mode = st.st_mode if st is not None else 0
+        self.attributes = getattr(st, "st_file_attributes", 0) if st is not None else 0
+        self.readonly = self.exists and (
+            not (self.mode & stat.S_IWUSR) or bool(self.attributes & FILE_ATTRIBUTE_READONLY)
+        )
+
+    @classmethod
+    def probe(cls, path):
+        """stat 一次目标文件并创建状态"""
+        count("stat")
+        try:
+            st = os.stat(path)
+        except (OSError, ValueError):
+            st = None
+        return cls(path, st)
+
+    @property
+    def writable(self):
+        return self.exists and not self.readonly
+
+    @property
+    def protected(self):
+        """是否处于保护状态（与原有判断一致：不可写即视为受保护）"""
+        return self.readonly
+
+    @property
+    def protection_attributes(self):
+        """当前设置的保护相关 Windows 属性（只读 / 隐藏 / 系统）"""
+        return self.attributes & PROTECTION_ATTRIBUTES
@@ -0,0 +1,177 @@
+# file: core/write_strategies.py
+
+import errno
+import os
+import shutil
+import threading
+from core.op_stats import count
+
+
+# 写入方式
+WRITE_COPY = "copy"          # 用户态写入（批量替换时写入共用的源图片数据）
+WRITE_KERNEL = "kernel"      # 内核态复制：copy_file_range / sendfile
+WRITE_REFLINK = "reflink"    # 写时复制克隆（Btrfs / XFS 等支持 FICLONE 的文件系统）
+WRITE_HARDLINK = "hardlink"  # 与图片库中的源文件建立硬链接（需同一卷）
+
+WRITE_MODES = (WRITE_COPY, WRITE_KERNEL, WRITE_REFLINK, WRITE_HARDLINK)
+
+# Linux FICLONE ioctl
+_FICLONE = 0x40049409
+
+# 不支持某种写入方式时的错误码（回退到下一种方式）
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.EPERM, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP,
+    errno.ENOSYS, errno.EBADF, getattr(errno, "ENOTTY", errno.EINVAL),
+}
+
+# 每种写入方式失败时依次尝试的方式
+_FALLBACKS = {
+    WRITE_HARDLINK: (WRITE_HARDLINK, WRITE_REFLINK, WRITE_KERNEL, WRITE_COPY),
+    WRITE_REFLINK: (WRITE_REFLINK, WRITE_KERNEL, WRITE_COPY),
+    WRITE_KERNEL: (WRITE_KERNEL, WRITE_COPY),
+    WRITE_COPY: (WRITE_COPY,),
+}
+
+
+class WriteUnsupported(Exception):
+    """当前平台或文件系统不支持该写入方式"""
+
+
+def _temp_path(target_path):
+    """与目标位于同一目录的临时文件路径（保证 os.replace 在同一卷内原子完成）"""
+    directory, name = os.path.split(target_path)
+    return os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _write_buffer(source_path, data, tmp_path):
+    count("open")
+    count("write")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+
+
+def _write_kernel(source_path, data, tmp_path):
+    """在内核中复制文件内容，不经过用户态缓冲区"""
+    copy_file_range = getattr(os, "copy_file_range", None)
+    sendfile = getattr(os, "sendfile", None)
+    if copy_file_range is None and sendfile is None:
+        raise WriteUnsupported("copy_file_range / sendfile 不可用")
+
+    count("open", 2)
+    with open(source_path, "rb") as src, open(tmp_path, "wb") as dst:
+        count("stat")
+        size = os.fstat(src.fileno()).st_size
+        offset = 0
+        use_range = copy_file_range is not None
+        while offset < size:
+            count("copy_file_range" if use_range else "sendfile")
+            try:
+                if use_range:
+                    sent = copy_file_range(src.fileno(), dst.fileno(), size - offset, offset, offset)
+                else:
+                    sent = sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED_ERRNOS:
+                    raise
+                if use_range and sendfile is not None and offset == 0:
+                    # 跨文件系统等情况 copy_file_range 不可用，改用 sendfile
+                    use_range = False
+                    continue
+                raise WriteUnsupported(str(e))
+            if sent == 0:
+                break
+            offset += sent
+        if offset != size:
+            raise OSError(errno.EIO, "内核复制未完成")
+
+
+def _write_reflink(source_path, data, tmp_path):
+    """写时复制克隆，只复制元数据，数据块与源文件共享直到被修改"""
+    try:
+        import fcntl
+    except ImportError:
+        raise WriteUnsupported("当前平台不支持 reflink")
+
+    count("open", 2)
+    count("ioctl")
+    with open(source_path, "rb") as src, open(tmp_path, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        except OSError as e:
+            if e.errno in _UNSUPPORTED_ERRNOS:
+                raise WriteUnsupported(str(e))
+            raise
+
+
+def _write_hardlink(source_path, data, tmp_path):
+    """建立指向源文件的硬链接（源与目标必须位于同一卷）"""
+    count("link")
+    try:
+        os.link(source_path, tmp_path)
+    except OSError as e:
+        if e.errno in _UNSUPPORTED_ERRNOS or getattr(e, "winerror", None) == 17:  # ERROR_NOT_SAME_DEVICE
+            raise WriteUnsupported(str(e))
+        raise
+
+
+_WRITERS = {
+    WRITE_COPY: _write_buffer,
+    WRITE_KERNEL: _write_kernel,
+    WRITE_REFLINK: _write_reflink,
+    WRITE_HARDLINK: _write_hardlink,
+}
+
+
+def atomic_write(source_path, target_path, mode=WRITE_COPY, data=None, allow_link=True):
+    """把源文件写入目标文件：先写入同目录下的临时文件，再用 os.replace 原子替换
+
+    写入中途出错或进程退出时目标文件保持原样，不会留下写了一半的图片。
+
+    Args:
+        source_path: 源文件路径
+        target_path: 目标文件路径
+        mode: 写入方式（WRITE_MODES 之一），不支持时依次回退，最终回退到用户态写入
+        data: 已读取的源文件内容（用户态写入时使用，为 None 时读取 source_path）
+        allow_link: 是否允许硬链接（目标之后会被修改属性或内容时应关闭）
+
+    Returns:
+        tuple: (实际使用的写入方式, 写入字节数)
+    """
+    if mode not in _FALLBACKS:
+        raise ValueError(f"未知的写入方式: {mode}")
+
+    tmp_path = _temp_path(target_path)
+    try:
+        used = None
+        for candidate in _FALLBACKS[mode]:
+            if candidate == WRITE_HARDLINK and not allow_link:
+                continue
+            if candidate == WRITE_COPY and data is None:
+                count("open")
+                with open(source_path, "rb") as f:
+                    data = f.read()
+            try:
+                _WRITERS[candidate](source_path, data, tmp_path)
+            except WriteUnsupported:
+                if os.path.exists(tmp_path):
+                    count("unlink")
+                    os.remove(tmp_path)
+                continue
+            used = candidate
+            break
+
+        if used != WRITE_HARDLINK:
+            # 硬链接与源文件是同一个文件，元数据已经一致
+            count("copystat")
+            shutil.copystat(source_path, tmp_path)
+        count("stat")
+        size = os.path.getsize(tmp_path)
+        count("replace")
+        os.replace(tmp_path, target_path)
+        return used, size
+    finally:
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
@@ -1,9 +1,34 @@
+import argparse
 import sys
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import Qt
 from ui.main_window import MainWindow
 
+
+def compact_backups(dry_run=False):
+    """不启动界面，按配置中的保留策略压缩备份"""
+    from core.backup_manifest import describe_compaction
+    from core.config_manager import ConfigManager
+    from core.replacer import ImageReplacer
+
+    replacer = ImageReplacer(ConfigManager())
+    report = replacer.compact_backups(dry_run=dry_run)
+    for filename in report["removed"]:
+        print(f"  {filename}")
+    print(describe_compaction(report))
+    if report["over_limit"]:
+        print("原始文件已超出总占用上限")
+    return 0
+
+
 def main():
+    parser = argparse.ArgumentParser(add_help=True)
+    parser.add_argument("--compact-backups", action="store_true", help="按保留策略压缩备份后退出")
+    parser.add_argument("--dry-run", action="store_true", help="与 --compact-backups 一起使用，只显示将要删除的备份")
+    args, qt_args = parser.parse_known_args()
+    if args.compact_backups:
+        sys.exit(compact_backups(args.dry_run))
+
     # 在创建QApplication之前设置高DPI支持
     if hasattr(Qt, 'AA_EnableHighDpiScaling'):
         QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
@@ -14,7 +39,7 @@ def main():
     QApplication.setHighDpiScaleFactorRoundingPolicy(Qt.HighDpiScaleFactorRoundingPolicy.PassThrough)
 
     # 创建应用程序
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1] + qt_args)
     
     # 创建并显示主窗口（主题与主题色在 MainWindow 中于创建子界面前应用）
     window = MainWindow()
@@ -0,0 +1,21 @@
+"""测试公共配置：把项目根目录加入导入路径，并提供生成测试图片的夹具"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_png():
+    """生成 PNG 测试图片：make_png(路径, (宽, 高), 颜色, mode="RGB", **保存参数) -> 路径"""
+    from PIL import Image
+
+    def make(path, size=(16, 8), color=(255, 0, 0), mode="RGB", **params):
+        os.makedirs(os.path.dirname(str(path)), exist_ok=True)
+        Image.new(mode, size, color).save(str(path), format="PNG", **params)
+        return str(path)
+
+    return make
@@ -0,0 +1,308 @@
+"""core.backup_manifest 测试：旧版备份的迁移与分配"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from core.backup_manifest import BackupManifest, target_key
+from core.config_manager import ConfigManager
+from core.replacer import ImageReplacer
+
+
+def _pixel(path):
+    with Image.open(path) as image:
+        return image.convert("RGB").getpixel((0, 0))
+
+
+@pytest.fixture
+def users(tmp_path, make_png):
+    """两个用户的 Banner.png 与一份旧版备份（用户 A 的原始文件，A 已被旧版程序替换）"""
+    backup_dir = tmp_path / "backups"
+    legacy = make_png(backup_dir / "Banner_20240101_080000.png", (100, 50), (255, 0, 0))
+    a = make_png(tmp_path / "A" / "Banner.png", (100, 50), (0, 0, 255))
+    b = make_png(tmp_path / "B" / "Banner.png", (100, 50), (0, 255, 0))
+    return backup_dir, legacy, a, b
+
+
+def _replacer(tmp_path, backup_dir, targets):
+    config = ConfigManager(str(tmp_path / "splash.json"))
+    for path in reversed(targets):
+        config.set_target_path(path)
+    return ImageReplacer(
+        config, backup_dir=str(backup_dir), render_mode="off",
+        render_cache_dir=str(tmp_path / "renders"), optimize=False,
+    )
+
+
+def test_single_known_target_adopts_oldest_legacy(tmp_path, users):
+    backup_dir, legacy, a, b = users
+    replacer = _replacer(tmp_path, backup_dir, [a])
+    assert os.path.samefile(replacer._find_backup(a), legacy)
+    # B 在迁移时未知，不会分到 A 的旧版备份
+    assert replacer.manifest.lookup(b) is None
+    assert not replacer.has_backup(b)
+
+
+def test_same_name_targets_with_same_size_are_not_adopted(tmp_path, users):
+    backup_dir, legacy, a, b = users
+    replacer = _replacer(tmp_path, backup_dir, [a, b])
+    assert replacer.manifest.lookup(a) is None
+    assert replacer.manifest.lookup(b) is None
+    # 旧版备份仍保留在 legacy 中
+    assert replacer.manifest.data["legacy"][os.path.normcase("Banner")] == [os.path.basename(legacy)]
+
+
+def test_other_target_backs_up_and_restores_its_own_original(tmp_path, users, make_png):
+    backup_dir, legacy, a, b = users
+    replacer = _replacer(tmp_path, backup_dir, [a])
+    source = make_png(tmp_path / "custom.png", (100, 50), (9, 9, 9))
+
+    success, msg, _ = replacer.replace_image(source, b)
+    assert success, msg
+    assert _pixel(b) == (9, 9, 9)
+    success, msg, _ = replacer.restore_backup(b)
+    assert success, msg
+    assert _pixel(b) == (0, 255, 0)
+
+
+def test_same_name_targets_matched_by_png_size(tmp_path, make_png):
+    backup_dir = tmp_path / "backups"
+    splash = tmp_path / "splash"
+    root_legacy = make_png(backup_dir / "splash_default_bg_20240101_080000.png", (100, 50), (1, 1, 1))
+    hdpi_legacy = make_png(backup_dir / "splash_default_bg_20240101_080001.png", (200, 100), (2, 2, 2))
+    root_target = make_png(splash / "splash_default_bg.png", (100, 50), (5, 5, 5))
+    hdpi_target = make_png(splash / "hdpi" / "splash_default_bg.png", (200, 100), (6, 6, 6))
+
+    manifest = BackupManifest(str(backup_dir), known_targets=[root_target, hdpi_target])
+    assert manifest.lookup(root_target)["file"] == os.path.basename(root_legacy)
+    assert manifest.lookup(hdpi_target)["file"] == os.path.basename(hdpi_legacy)
+
+
+def test_lookup_does_not_write_manifest(tmp_path, users, monkeypatch):
+    backup_dir, legacy, a, b = users
+    replacer = _replacer(tmp_path, backup_dir, [a])
+
+    def fail():
+        raise AssertionError("lookup 不应保存索引")
+
+    monkeypatch.setattr(replacer.manifest, "save", fail)
+    for target in (a, b):
+        replacer.manifest.lookup(target)
+        replacer.has_backup(target)
+        replacer._native_size(target)
+
+
+def test_adopted_legacy_does_not_skip_own_backup(tmp_path, users, make_png):
+    backup_dir, legacy, a, b = users
+    replacer = _replacer(tmp_path, backup_dir, [a])
+    success, msg, _ = replacer.backup_original(a)
+    assert success and "已备份原始文件" in msg
+
+    entry = replacer.manifest.lookup(a)
+    assert entry["legacy"] and entry["file"] == os.path.basename(legacy)
+    own = os.path.join(str(backup_dir), entry["own"]["file"])
+    assert _pixel(own) == (0, 0, 255)
+    # 自己的原始文件被引用，不会被 gc 清理
+    assert replacer.gc_backups() == (0, 0)
+    assert os.path.exists(own)
+
+
+def test_version_1_manifest_drops_lazy_adoptions(tmp_path, users):
+    backup_dir, legacy, a, b = users
+    stale = {
+        "version": 1,
+        "entries": {
+            target_key(b): {
+                "target": b, "file": os.path.basename(legacy), "sha256": "0" * 64,
+                "size": 1, "created": 0, "legacy": True,
+            },
+        },
+        "legacy": {os.path.normcase("Banner"): [os.path.basename(legacy)]},
+    }
+    (backup_dir / "manifest.json").write_text(json.dumps(stale), encoding="utf-8")
+
+    manifest = BackupManifest(str(backup_dir), known_targets=[a])
+    assert manifest.lookup(b) is None
+    assert manifest.lookup(a)["file"] == os.path.basename(legacy)
+    saved = json.loads((backup_dir / "manifest.json").read_text(encoding="utf-8"))
+    assert saved["version"] == BackupManifest.MANIFEST_VERSION
+
+
+def test_gc_only_removes_unreferenced_objects(tmp_path, make_png):
+    backup_dir = tmp_path / "backups"
+    objects = backup_dir / "objects"
+    unreferenced = make_png(objects / ("a" * 64 + ".png"))
+    partial = make_png(objects / (".%s.png.1.2.tmp" % ("b" * 64)))
+    other = make_png(objects / "notes.png")
+
+    manifest = BackupManifest(str(backup_dir))
+    removed, freed = manifest.gc()
+    assert removed == 1 and freed > 0
+    assert not os.path.exists(unreferenced)
+    assert os.path.exists(partial) and os.path.exists(other)
+
+
+def test_gc_waits_for_backup_writes(tmp_path, make_png):
+    backup_dir = tmp_path / "backups"
+    orphan = make_png(backup_dir / "objects" / ("c" * 64 + ".png"))
+    manifest = BackupManifest(str(backup_dir))
+
+    worker = threading.Thread(target=manifest.gc)
+    with manifest.lock:
+        worker.start()
+        worker.join(0.2)
+        assert worker.is_alive() and os.path.exists(orphan)
+    worker.join(5)
+    assert not os.path.exists(orphan)
+
+
+def test_native_size_ignores_adopted_legacy_backup(tmp_path, make_png):
+    backup_dir = tmp_path / "backups"
+    make_png(backup_dir / "Banner_20240101_080000.png", (200, 100))
+    target = make_png(tmp_path / "A" / "Banner.png", (100, 50))
+    replacer = _replacer(tmp_path, backup_dir, [target])
+    assert replacer.manifest.lookup(target)["legacy"]
+    assert replacer._native_size(target) == (100, 50)
+
+    replacer.backup_original(target)
+    make_png(target, (30, 30))
+    assert replacer._native_size(target) == (100, 50)
+
+
+GENERATIONS = [f"Banner_202401{day:02d}_080000.png" for day in (1, 2, 3, 4)]
+
+
+@pytest.fixture
+def generations(tmp_path):
+    """同一目标的 4 代旧版备份（每个 1000 字节）与一个未引用的对象文件"""
+    backup_dir = tmp_path / "backups"
+    (backup_dir / "objects").mkdir(parents=True)
+    for name in GENERATIONS:
+        (backup_dir / name).write_bytes(b"\0" * 1000)
+    (backup_dir / "objects" / ("d" * 64 + ".png")).write_bytes(b"\0" * 1000)
+    return BackupManifest(str(backup_dir))
+
+
+def _day(day):
+    return time.mktime(time.strptime(f"202401{day:02d}_080000", "%Y%m%d_%H%M%S"))
+
+
+def _remaining(manifest):
+    return sorted(name for name in os.listdir(manifest.backup_dir) if name.endswith(".png"))
+
+
+def test_compact_keeps_newest_generations_and_original(generations):
+    report = generations.compact(keep_generations=2)
+    assert report["removed"] == GENERATIONS[1:3]
+    assert report["removed_objects"] == 1
+    assert report["freed"] == 3000
+    assert _remaining(generations) == [GENERATIONS[0], GENERATIONS[3]]
+    assert BackupManifest(generations.backup_dir).data["legacy"][os.path.normcase("Banner")] == _remaining(generations)
+
+
+def test_compact_removes_expired_generations(generations):
+    report = generations.compact(max_age=2.5 * 86400, now=_day(4) + 86400)
+    # 原始文件（第 1 代）再旧也保留
+    assert report["removed"] == [GENERATIONS[1]]
+    assert _remaining(generations) == [GENERATIONS[0]] + GENERATIONS[2:]
+
+
+def test_compact_size_limit_removes_oldest_first(generations):
+    report = generations.compact(max_total_bytes=2500)
+    assert report["total_before"] == 5000
+    assert report["removed"] == GENERATIONS[1:3]
+    assert report["total_after"] == 2000 and not report["over_limit"]
+
+    report = generations.compact(max_total_bytes=500)
+    assert report["removed"] == [GENERATIONS[3]]
+    assert report["total_after"] == 1000 and report["over_limit"]
+    assert _remaining(generations) == [GENERATIONS[0]]
+
+
+def test_compact_dry_run_changes_nothing(generations):
+    before = sorted(os.listdir(generations.backup_dir)) + os.listdir(os.path.join(generations.backup_dir, "objects"))
+    report = generations.compact(keep_generations=1, dry_run=True)
+    assert report["removed"] == GENERATIONS[1:]
+    assert report["removed_objects"] == 1 and report["freed"] == 4000
+    after = sorted(os.listdir(generations.backup_dir)) + os.listdir(os.path.join(generations.backup_dir, "objects"))
+    assert after == before
+    assert len(generations.data["legacy"][os.path.normcase("Banner")]) == 4
+
+
+def test_replaced_original_is_backed_up_as_new_generation(tmp_path, make_png):
+    backup_dir = tmp_path / "backups"
+    target = make_png(tmp_path / "A" / "Banner.png", (100, 50), (255, 0, 0))
+    custom = make_png(tmp_path / "custom.png", (100, 50), (0, 0, 0))
+    replacer = _replacer(tmp_path, backup_dir, [target])
+
+    assert replacer.replace_image(custom, target)[0]
+    # 希沃更新两次换掉了启动图，每次之后都重新替换
+    for size, color in (((120, 60), (0, 255, 0)), ((140, 70), (0, 0, 255))):
+        make_png(target, size, color)
+        assert replacer.replace_image(custom, target)[0]
+
+    entry = replacer.manifest.lookup(target)
+    assert [_pixel(backup_dir / generation["file"]) for generation in entry["history"]] == [(255, 0, 0), (0, 255, 0)]
+    assert replacer.restore_backup(target)[0]
+    assert _pixel(target) == (0, 0, 255)
+
+    # 还原后再次替换不会产生新的一代
+    assert replacer.replace_image(custom, target)[0]
+    assert len(replacer.manifest.lookup(target)["history"]) == 2
+
+
+def test_compact_prunes_content_addressed_generations(tmp_path, make_png):
+    backup_dir = tmp_path / "backups"
+    a = make_png(tmp_path / "A" / "Banner.png", (100, 50), (255, 0, 0))
+    b = make_png(tmp_path / "B" / "SplashScreen.png", (100, 50), (255, 0, 0))
+    custom = make_png(tmp_path / "custom.png", (100, 50), (0, 0, 0))
+    replacer = _replacer(tmp_path, backup_dir, [a, b])
+    for target in (a, b):
+        assert replacer.replace_image(custom, target)[0]
+    for size, color in (((120, 60), (0, 255, 0)), ((140, 70), (0, 0, 255))):
+        make_png(a, size, color)
+        assert replacer.replace_image(custom, a)[0]
+    manifest = replacer.manifest
+    oldest, middle = manifest.lookup(a)["history"]
+    (backup_dir / "manifest.json.tmp").write_bytes(b"\0" * 5000)
+
+    before = sorted(os.listdir(backup_dir / "objects"))
+    report = manifest.compact(keep_generations=2, dry_run=True)
+    assert report["removed_generations"] == 1
+    # 最早的一代仍被 B 引用，删除这一代不释放空间
+    assert report["removed_objects"] == 0 and report["freed"] == 0
+    assert sorted(os.listdir(backup_dir / "objects")) == before
+
+    report = manifest.compact(keep_generations=1)
+    assert report["removed_generations"] == 2
+    assert report["removed_objects"] == 1 and report["freed"] == middle["size"]
+    assert "history" not in manifest.lookup(a)
+    assert not (backup_dir / middle["file"]).exists()
+    assert (backup_dir / oldest["file"]).exists()
+    assert os.path.exists(manifest.backup_path(manifest.lookup(a)))
+    # 索引的临时文件不计入占用
+    assert report["total_after"] == manifest.total_size() == sum(
+        os.path.getsize(backup_dir / "objects" / name) for name in os.listdir(backup_dir / "objects")
+    )
+
+
+def test_compact_size_limit_prunes_oldest_generation_first(tmp_path, make_png):
+    backup_dir = tmp_path / "backups"
+    target = make_png(tmp_path / "A" / "Banner.png", (100, 50), (255, 0, 0))
+    custom = make_png(tmp_path / "custom.png", (100, 50), (0, 0, 0))
+    replacer = _replacer(tmp_path, backup_dir, [target])
+    assert replacer.replace_image(custom, target)[0]
+    for size, color in (((120, 60), (0, 255, 0)), ((140, 70), (0, 0, 255))):
+        make_png(target, size, color)
+        assert replacer.replace_image(custom, target)[0]
+    manifest = replacer.manifest
+    oldest, middle = manifest.lookup(target)["history"]
+
+    report = manifest.compact(max_total_bytes=manifest.total_size() - 1)
+    assert report["removed_generations"] == 1 and report["freed"] == oldest["size"]
+    assert manifest.lookup(target)["history"] == [middle]
+    assert not report["over_limit"]
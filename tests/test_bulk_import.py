@@ -0,0 +1,49 @@
+"""core.bulk_import 测试：批次内重复文件与复制失败"""
+
+import os
+import time
+
+import core.bulk_import as bulk_import
+from core.bulk_import import BulkImporter, STATUS_DUPLICATE, STATUS_FAILED, STATUS_IMPORTED
+
+
+def test_in_batch_duplicates_are_copied_once(tmp_path, make_png):
+    sources = [
+        make_png(tmp_path / "in" / "a.png", color=(1, 2, 3)),
+        make_png(tmp_path / "in" / "b.png", color=(1, 2, 3)),
+        make_png(tmp_path / "in" / "c.png", color=(4, 5, 6)),
+        make_png(tmp_path / "in" / "d.png", color=(1, 2, 3)),
+    ]
+    custom = tmp_path / "custom"
+    results = BulkImporter(custom, taken_names=[], max_workers=4).run(sources)
+
+    statuses = {result["display_name"]: result["status"] for result in results}
+    assert statuses["c"] == STATUS_IMPORTED
+    kept = [result for result in results if result["display_name"] != "c" and result["status"] == STATUS_IMPORTED]
+    assert len(kept) == 1
+    for result in results:
+        if result["status"] == STATUS_DUPLICATE:
+            assert result["filename"] == kept[0]["filename"]
+    assert sorted(os.listdir(custom)) == sorted(["c.png", kept[0]["filename"]])
+
+
+def test_duplicate_of_failed_copy_is_imported(tmp_path, make_png, monkeypatch):
+    sources = [
+        make_png(tmp_path / "in" / "a.png", color=(1, 2, 3)),
+        make_png(tmp_path / "in" / "b.png", color=(1, 2, 3)),
+    ]
+    copy2 = bulk_import.shutil.copy2
+
+    def flaky_copy(src, dst):
+        if os.path.basename(src) == "a.png":
+            time.sleep(0.1)  # 让 b.png 在 a.png 复制期间到达
+            raise OSError("磁盘已满")
+        return copy2(src, dst)
+
+    monkeypatch.setattr(bulk_import.shutil, "copy2", flaky_copy)
+    custom = tmp_path / "custom"
+    a, b = BulkImporter(custom, taken_names=[], max_workers=2).run(sources)
+
+    assert a["status"] == STATUS_FAILED and "磁盘已满" in a["message"]
+    assert b["status"] == STATUS_IMPORTED and b["filename"] == "b.png"
+    assert os.listdir(custom) == ["b.png"]
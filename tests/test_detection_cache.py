@@ -0,0 +1,117 @@
+"""utils.detection_cache 测试：上级目录变化时失效、缓存文件异常时完整扫描、慢速根目录的持久化"""
+
+import os
+import time
+
+import pytest
+
+import ui.controllers.path_controller as path_controller
+import utils.detection_cache as detection_cache
+from core.config_manager import ConfigManager
+from utils.detection_cache import DetectionCache
+from utils.scan_engine import root_quarantine
+
+
+@pytest.fixture
+def app_data(tmp_path, monkeypatch):
+    monkeypatch.setattr(detection_cache, "get_app_data_path", lambda path: str(tmp_path / "app" / path))
+    return tmp_path / "app"
+
+
+@pytest.fixture
+def install(tmp_path):
+    """模拟安装树中的 SplashScreen.png"""
+    assets = tmp_path / "C" / "Program Files" / "Seewo" / "EasiNote5" / "EasiNote5_5.2" / "Main" / "Assets"
+    assets.mkdir(parents=True)
+    splash = assets / "SplashScreen.png"
+    splash.write_bytes(b"png")
+    return splash
+
+
+def _touch_dir(path, offset=10):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + offset * 10 ** 9))
+
+
+def test_valid_until_ancestor_changes(app_data, install):
+    cache = DetectionCache()
+    cache.put("home", [str(install)])
+    assert DetectionCache().get("home") == [str(install)]
+
+    # 启动图所在目录中写入文件（替换启动图）不会使缓存失效
+    (install.parent / "backup.tmp").write_bytes(b"x")
+    assert DetectionCache().get("home") == [str(install)]
+
+    # 新版本安装：上级目录的修改时间变化
+    _touch_dir(install.parents[3])
+    assert DetectionCache().get("home") is None
+
+
+def test_missing_path_invalidates(app_data, install):
+    DetectionCache().put("home", [str(install)])
+    install.unlink()
+    assert DetectionCache().get("home") is None
+
+
+@pytest.mark.parametrize("content", [None, "{not json", '{"version": 0, "entries": {}}'])
+def test_missing_or_corrupt_file_is_empty(app_data, content):
+    cache_file = app_data / "config" / "detect_cache.json"
+    if content is not None:
+        cache_file.parent.mkdir(parents=True)
+        cache_file.write_text(content, encoding="utf-8")
+    cache = DetectionCache()
+    assert cache.get("home") is None
+    assert cache.get_slow_roots() == {}
+
+
+def test_pages_do_not_overwrite_each_other(app_data, install):
+    home = DetectionCache()
+    wps = DetectionCache()
+    home.put("home", [str(install)])
+    wps.put("wps", [str(install.parent)])
+    cache = DetectionCache()
+    assert cache.get("home") == [str(install)]
+    assert cache.get("wps") == [str(install.parent)]
+
+
+def test_slow_roots_round_trip(app_data, install):
+    until = time.time() + 600
+    expired = time.time() - 1
+    cache = DetectionCache()
+    cache.put("home", [str(install)])
+    cache.set_slow_roots({"E": until, "F": expired})
+
+    loaded = DetectionCache()
+    assert loaded.get_slow_roots() == {"E": until, "F": expired}
+    assert loaded.get("home") == [str(install)]
+
+    root_quarantine.clear()
+    try:
+        root_quarantine.restore(loaded.get_slow_roots())
+        # 已过期的记录不再隔离
+        assert root_quarantine.is_quarantined("E")
+        assert not root_quarantine.is_quarantined("F")
+    finally:
+        root_quarantine.clear()
+
+
+@pytest.mark.parametrize("content", [None, "{not json"])
+def test_controller_scans_without_usable_cache(app_data, tmp_path, install, monkeypatch, content):
+    cache_file = app_data / "config" / "detect_cache.json"
+    if content is not None:
+        cache_file.parent.mkdir(parents=True)
+        cache_file.write_text(content, encoding="utf-8")
+    scans = []
+
+    def iter_seewo_paths(first_only, cancel_token, progress, session):
+        scans.append(first_only)
+        return iter([str(install)])
+
+    monkeypatch.setattr(path_controller.PathDetector, "iter_seewo_paths", staticmethod(iter_seewo_paths))
+    controller = path_controller.PathController(None, ConfigManager(str(tmp_path / "splash.json")))
+
+    assert controller.detect_paths(use_cache=True) == [str(install)]
+    assert len(scans) == 1
+    # 完整扫描的结果写入缓存，下次直接命中
+    assert controller.detect_paths(use_cache=True) == [str(install)]
+    assert len(scans) == 1
@@ -0,0 +1,176 @@
+"""core.image_store 与自定义图片重命名测试"""
+
+import sqlite3
+
+import pytest
+
+import core.image_manager as image_manager
+from core.config_manager import ConfigManager
+from core.image_store import ImageStore
+
+
+def _create_v1(db_path):
+    """版本 1 的索引：只有 images 表"""
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(
+            """
+            CREATE TABLE images (
+                filename TEXT PRIMARY KEY COLLATE NOCASE,
+                display_name TEXT NOT NULL,
+                sha256 TEXT,
+                size INTEGER,
+                mtime_ns INTEGER,
+                added REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("INSERT INTO images VALUES ('Sunset.png', 'Sunset', 'ab', 10, 20, 1.0)")
+        conn.execute("PRAGMA user_version = 1")
+    conn.close()
+
+
+def test_migrates_version_1_to_current(tmp_path):
+    db_path = str(tmp_path / "images.db")
+    _create_v1(db_path)
+
+    store = ImageStore(db_path)
+    record = store.get("sunset.png")
+    assert record["filename"] == "Sunset.png" and record["sha256"] == "ab" and record["aliases"] == []
+    store.add_aliases([("Sunset.png", "Evening")])
+    assert store.get("Sunset.png")["aliases"] == ["Evening"]
+    store.close()
+
+    conn = sqlite3.connect(db_path)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"images", "image_aliases", "image_metadata"} <= tables
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == ImageStore.SCHEMA_VERSION
+    conn.close()
+
+
+def test_case_only_rename():
+    store = ImageStore(":memory:")
+    store.add("photo.png", "photo")
+    store.add_aliases([("photo.png", "copy")])
+    assert store.rename("photo.png", "Photo.png", "Photo")
+    record = store.get("photo.png")
+    assert record["filename"] == "Photo.png" and record["display_name"] == "Photo"
+    assert record["aliases"] == ["copy"]
+    assert store.count() == 1
+
+
+def test_rename_rolls_back_when_apply_fails():
+    store = ImageStore(":memory:")
+    store.add("a.png", "a")
+
+    def fail():
+        raise OSError("disk")
+
+    with pytest.raises(OSError):
+        store.rename("a.png", "b.png", "b", apply=fail)
+    assert store.get("a.png")["display_name"] == "a"
+    assert store.get("b.png") is None
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_manager, "get_app_data_path", lambda path: str(tmp_path / path))
+    config = ConfigManager(str(tmp_path / "config" / "splash.json"))
+    return image_manager.ImageManager(config, store=ImageStore(":memory:"))
+
+
+def test_rename_custom_image_case_only(manager, make_png):
+    make_png(manager.custom_dir / "photo.png")
+    manager.store.add("photo.png", "photo")
+
+    success, msg, new_filename = manager.rename_custom_image("photo.png", "Photo")
+    assert success, msg
+    assert new_filename == "Photo.png"
+    assert [path.name for path in manager.custom_dir.iterdir()] == ["Photo.png"]
+    assert manager.store.get("photo.png")["filename"] == "Photo.png"
+
+
+def test_rename_conflict_in_index_leaves_file(manager, make_png):
+    make_png(manager.custom_dir / "a.png")
+    manager.store.add("a.png", "a")
+    # 索引中已有只差大小写的记录（对应文件已不在磁盘上）
+    manager.store.add("B.png", "B")
+
+    success, _, new_filename = manager.rename_custom_image("a.png", "b")
+    assert not success and new_filename == "a.png"
+    assert [path.name for path in manager.custom_dir.iterdir()] == ["a.png"]
+    assert manager.store.get("a.png")["display_name"] == "a"
+
+
+def test_rename_failure_on_disk_rolls_back_index(manager, make_png, monkeypatch):
+    make_png(manager.custom_dir / "a.png")
+    manager.store.add("a.png", "a")
+
+    def fail(self, target):
+        raise PermissionError("locked")
+
+    monkeypatch.setattr(image_manager.Path, "rename", fail)
+    success, _, new_filename = manager.rename_custom_image("a.png", "c")
+    assert not success and new_filename == "a.png"
+    assert manager.store.get("a.png")["display_name"] == "a"
+    assert manager.store.get("c.png") is None
+
+
+def test_listing_does_not_dedup(manager, make_png):
+    for name in ("a.png", "b.png"):
+        make_png(manager.custom_dir / name)
+    assert [image["filename"] for image in manager.get_custom_images()] == ["a.png", "b.png"]
+    assert sorted(path.name for path in manager.custom_dir.iterdir()) == ["a.png", "b.png"]
+    assert manager.pending_duplicates() == 1
+    assert not manager.config_manager.get_custom_images_deduplicated()
+
+
+def test_dedup_remaps_last_selected_image(manager, make_png):
+    make_png(manager.custom_dir / "a.png")
+    manager.store.add("a.png", "a")
+    make_png(manager.custom_dir / "b.png")
+    manager.store.add("b.png", "b")
+    manager.config_manager.set_last_selected_image("B.png", "wps")
+
+    assert manager.dedup_custom_images()[0] == 1
+    assert manager.config_manager.get_last_selected_image("wps") == "a.png"
+    assert manager.store.get("a.png")["aliases"] == ["b"]
+    assert manager.config_manager.get_custom_images_deduplicated()
+    assert manager.pending_duplicates() == 0
+
+
+def test_failed_dedup_is_retried(manager, make_png, monkeypatch):
+    make_png(manager.custom_dir / "a.png")
+    manager.store.add("a.png", "a")
+    make_png(manager.custom_dir / "b.png")
+    manager.store.add("b.png", "b")
+
+    def fail(self):
+        raise PermissionError("locked")
+
+    monkeypatch.setattr(image_manager.Path, "unlink", fail)
+    assert manager.dedup_custom_images()[0] == 0
+    assert not manager.config_manager.get_custom_images_deduplicated()
+    assert manager.pending_duplicates() == 1
+
+
+def test_single_metadata_lookup_does_not_hash(manager, make_png, monkeypatch):
+    import core.hash_cache
+
+    path = str(make_png(manager.custom_dir / "photo.png", (120, 60)))
+    real_sha256 = core.hash_cache.file_sha256
+
+    def fail(path):
+        raise AssertionError("悬停查询不应计算哈希")
+
+    monkeypatch.setattr(core.hash_cache, "file_sha256", fail)
+    metadata = manager.get_image_metadata(path)
+    assert (metadata["width"], metadata["height"]) == (120, 60)
+    assert metadata["sha256"] is None
+
+    # 后台刷新补全哈希，之后的单张查询直接使用索引中的哈希
+    monkeypatch.setattr(core.hash_cache, "file_sha256", real_sha256)
+    digest = manager.get_images_metadata([path])[path]["sha256"]
+    assert digest == real_sha256(path)
+    monkeypatch.setattr(core.hash_cache, "file_sha256", fail)
+    assert manager.get_image_metadata(path)["sha256"] == digest
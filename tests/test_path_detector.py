@@ -0,0 +1,60 @@
+"""utils.path_detector 测试：在替代文件系统根目录中构造模拟安装树"""
+
+import os
+
+import pytest
+
+from utils.path_detector import PathDetector
+from utils.registry_index import FakeRegistryProvider, set_registry_provider
+from utils.scan_engine import root_quarantine, set_fs_root
+
+
+def _touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+    return path
+
+
+@pytest.fixture
+def fake_fs(tmp_path):
+    root_quarantine.clear()
+    set_fs_root(str(tmp_path))
+    set_registry_provider(FakeRegistryProvider())
+    yield tmp_path
+    set_fs_root(None)
+    set_registry_provider(None)
+    root_quarantine.clear()
+
+
+def _banner(root, drive, user):
+    return _touch(os.path.join(
+        root, drive, "Users", user, "AppData", "Roaming", "Seewo", "EasiNote5", "Resources", "Banner", "Banner.png",
+    ))
+
+
+def _splashscreen(root, drive, program_files):
+    return _touch(os.path.join(
+        root, drive, program_files, "Seewo", "EasiNote5", "EasiNote5_5.2.0.1000", "Main", "Assets", "SplashScreen.png",
+    ))
+
+
+def test_seewo_paths_grouped_by_kind_across_drives(fake_fs):
+    root = str(fake_fs)
+    c_splash = _splashscreen(root, "C", "Program Files (x86)")
+    c_banner = _banner(root, "C", "alice")
+    d_splash = _splashscreen(root, "D", "Program Files")
+    d_banner = _banner(root, "D", "bob")
+
+    # 与分别扫描时一致：先所有驱动器的 Banner.png，再所有驱动器的 SplashScreen.png
+    expected = [c_banner, d_banner, c_splash, d_splash]
+    assert PathDetector.detect_all_paths() == expected
+    assert PathDetector.detect_banner_paths() + PathDetector.detect_splashscreen_paths() == expected
+    assert list(PathDetector.iter_seewo_paths(first_only=True)) == [c_banner]
+
+
+def test_first_only_prefers_banner_on_later_drive(fake_fs):
+    root = str(fake_fs)
+    _splashscreen(root, "C", "Program Files (x86)")
+    d_banner = _banner(root, "D", "bob")
+    assert list(PathDetector.iter_seewo_paths(first_only=True)) == [d_banner]
@@ -0,0 +1,134 @@
+"""core.png_optimizer 测试：优化前后像素一致，无法无损处理的图片原样使用"""
+
+import io
+import struct
+import zlib
+
+import pytest
+from PIL import Image, PngImagePlugin
+
+from core.png_optimizer import PngOptimizer
+
+
+def _chunk(chunk_type, data):
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+
+def _png_16bit_rgb(path, width=8, height=4):
+    """16 位 RGB 图片（Pillow 无法直接生成），每个采样的低字节互不相同"""
+    rows = b"".join(
+        b"\x00" + b"".join(struct.pack(">HHH", 0x1200 + x, 0x3400 + y, 0x5601 + x * y) for x in range(width))
+        for y in range(height)
+    )
+    data = (
+        b"\x89PNG\r\n\x1a\n"
+        + _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 16, 2, 0, 0, 0))
+        + _chunk(b"tEXt", b"Comment\x00" + b"x" * 4096)
+        + _chunk(b"IDAT", zlib.compress(rows, 1))
+        + _chunk(b"IEND", b"")
+    )
+    path.write_bytes(data)
+    return str(path)
+
+
+def _with_text(**params):
+    info = PngImagePlugin.PngInfo()
+    info.add_text("Comment", "x" * 4096)
+    return dict(pnginfo=info, compress_level=0, **params)
+
+
+def _rgba(path_or_data):
+    source = io.BytesIO(path_or_data) if isinstance(path_or_data, bytes) else path_or_data
+    with Image.open(source) as image:
+        return image.convert("RGBA").tobytes()
+
+
+@pytest.fixture
+def optimizer(tmp_path):
+    return PngOptimizer(str(tmp_path / "cache"))
+
+
+def _assert_unchanged(report, source, original):
+    assert not report["optimized"]
+    assert report["path"] == source
+    with open(source, "rb") as f:
+        assert f.read() == original
+
+
+def test_16bit_rgb_is_passed_through(tmp_path, optimizer):
+    source = _png_16bit_rgb(tmp_path / "deep.png")
+    original = open(source, "rb").read()
+    _assert_unchanged(optimizer.optimize(source), source, original)
+
+
+def test_16bit_gray_is_passed_through(tmp_path, optimizer, make_png):
+    source = make_png(tmp_path / "gray16.png", (8, 4), 0x1234, mode="I;16", **_with_text())
+    original = open(source, "rb").read()
+    _assert_unchanged(optimizer.optimize(source), source, original)
+
+
+def test_gray_alpha_is_passed_through(tmp_path, optimizer, make_png):
+    source = make_png(tmp_path / "la.png", (8, 4), (100, 128), mode="LA", **_with_text())
+    original = open(source, "rb").read()
+    _assert_unchanged(optimizer.optimize(source), source, original)
+
+
+def test_rgb_round_trip(tmp_path, optimizer, make_png):
+    source = make_png(tmp_path / "rgb.png", (64, 32), (10, 20, 30), **_with_text())
+    report = optimizer.optimize(source)
+    assert report["optimized"] and report["saved_bytes"] > 0
+    assert _rgba(report["path"]) == _rgba(source)
+
+
+def test_palette_with_transparency_round_trip(tmp_path, optimizer):
+    image = Image.new("P", (64, 32), 0)
+    image.putpalette([255, 0, 0, 0, 255, 0, 0, 0, 255])
+    image.paste(1, (0, 0, 32, 32))
+    image.paste(2, (32, 0, 64, 16))
+    source = str(tmp_path / "palette.png")
+    image.save(source, transparency=b"\x00\x80", **_with_text())
+
+    report = optimizer.optimize(source)
+    assert report["optimized"]
+    assert _rgba(report["path"]) == _rgba(source)
+    with Image.open(report["path"]) as result:
+        assert result.mode == "P"
+
+
+def test_failed_candidate_falls_back_to_next(tmp_path, optimizer, make_png, monkeypatch):
+    source = make_png(tmp_path / "rgb.png", (64, 32), (10, 20, 30), **_with_text())
+    wrong = io.BytesIO()
+    Image.new("RGB", (1, 1)).save(wrong, format="PNG")  # 比所有候选都小，但像素不一致
+    candidates = PngOptimizer._candidates
+
+    def with_wrong_candidate(image):
+        yield "wrong", wrong.getvalue()
+        yield from candidates(image)
+
+    monkeypatch.setattr(PngOptimizer, "_candidates", staticmethod(with_wrong_candidate))
+    report = optimizer.optimize(source)
+    assert report["optimized"] and report["method"] != "wrong"
+    assert _rgba(report["path"]) == _rgba(source)
+
+
+def test_prepared_source_is_not_optimized_again(tmp_path, make_png, monkeypatch):
+    from core.config_manager import ConfigManager
+    from core.replacer import ImageReplacer
+
+    source = make_png(tmp_path / "custom.png", (64, 32), (10, 20, 30), **_with_text())
+    target = make_png(tmp_path / "A" / "Banner.png", (64, 32), (255, 0, 0))
+    replacer = ImageReplacer(
+        ConfigManager(str(tmp_path / "splash.json")), backup_dir=str(tmp_path / "backups"),
+        render_mode="off", optimize=True, optimize_cache_dir=str(tmp_path / "optimized"),
+    )
+    report = replacer.prepare_source(source)
+    assert report["optimized"] and not report["cached"]
+
+    # 替换时直接使用预处理的结果，不再搜索候选编码
+    def fail(*args):
+        raise AssertionError("替换时不应重新优化")
+
+    monkeypatch.setattr(PngOptimizer, "_optimize", fail)
+    _, _, plan = replacer.plan_replace(source, [target])
+    assert plan.targets[0].source.optimization["cached"]
+    assert replacer.replace_multiple_images(source, plan)[3] == 1
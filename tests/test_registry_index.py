@@ -0,0 +1,19 @@
+"""utils.registry_index 测试"""
+
+import pytest
+
+from utils.registry_index import FakeRegistryProvider, RegistryProvider, UninstallIndex
+
+
+def test_provider_interface_is_abstract():
+    with pytest.raises(TypeError):
+        RegistryProvider()
+
+
+def test_uninstall_index_finds_install_locations():
+    provider = FakeRegistryProvider()
+    provider.add_uninstall_entry("EasiNote5", "希沃白板5", "D:\\Seewo\\EasiNote5\\ ")
+    provider.add_uninstall_entry("Other", "Other App", "C:\\Other")
+    provider.add_uninstall_entry("NoLocation", "希沃白板 旧版")
+    index = UninstallIndex.build(provider)
+    assert index.find_install_locations(lambda name: "希沃白板" in name) == ["D:\\Seewo\\EasiNote5"]
@@ -0,0 +1,94 @@
+"""ImageReplacer.plan_replace 测试：规划只读，逐个目标报告计划动作"""
+
+import hashlib
+import os
+import stat
+
+import pytest
+
+import core.replacer as replacer_module
+from core.replace_plan import (
+    ACTION_MISSING, ACTION_REPLACE, ACTION_UP_TO_DATE, BACKUP_NEEDED, BACKUP_PRESENT, BACKUP_REFERENCE,
+)
+from core.replacer import ImageReplacer
+
+
+def _tree(*roots):
+    """目录树的快照 {相对路径: (大小, 修改时间, 权限, 内容哈希)}"""
+    snapshot = {}
+    for root in roots:
+        for directory, dirs, files in os.walk(root):
+            for name in dirs + files:
+                path = os.path.join(directory, name)
+                st = os.stat(path)
+                digest = None
+                if name in files:
+                    with open(path, "rb") as f:
+                        digest = hashlib.sha256(f.read()).hexdigest()
+                snapshot[path] = (st.st_size, st.st_mtime_ns, stat.S_IMODE(st.st_mode), digest)
+    return snapshot
+
+
+@pytest.fixture
+def setup(tmp_path, make_png):
+    targets = tmp_path / "targets"
+    source = make_png(tmp_path / "library" / "custom.png", (32, 16), (9, 9, 9))
+    paths = {
+        "first": make_png(targets / "first.png", (32, 16), (1, 1, 1)),
+        # 与 first 内容相同：只需登记一次备份引用
+        "same": make_png(targets / "same.png", (32, 16), (1, 1, 1)),
+        "current": make_png(targets / "current.png", (32, 16), (9, 9, 9)),
+        "backed_up": make_png(targets / "backed_up.png", (32, 16), (2, 2, 2)),
+        "readonly": make_png(targets / "readonly.png", (32, 16), (3, 3, 3)),
+        "locked": make_png(targets / "locked" / "splash.png", (32, 16), (4, 4, 4)),
+        "missing": str(targets / "missing.png"),
+    }
+    replacer = ImageReplacer(
+        backup_dir=str(tmp_path / "backups"), render_mode="off", optimize=False,
+        render_cache_dir=str(tmp_path / "cache" / "renders"),
+    )
+    assert replacer.backup_original(paths["backed_up"])[0]
+    os.chmod(paths["readonly"], 0o444)
+    return replacer, source, paths, [str(targets), str(tmp_path / "backups"), str(tmp_path / "library")]
+
+
+def test_plan_is_read_only(setup, monkeypatch):
+    replacer, source, paths, roots = setup
+    locked_dir = os.path.dirname(paths["locked"])
+    access = os.access
+    monkeypatch.setattr(
+        replacer_module.os, "access", lambda path, mode: path != locked_dir and access(path, mode)
+    )
+    before = _tree(*roots)
+    manifest = dict(replacer.manifest.data["entries"])
+
+    success, _, plan = replacer.plan_replace(source, list(paths.values()))
+    assert success
+    assert _tree(*roots) == before
+    assert replacer.manifest.data["entries"] == manifest
+
+    targets = {name: plan.targets[index] for index, name in enumerate(paths)}
+    assert targets["first"].action == ACTION_REPLACE and targets["first"].backup == BACKUP_NEEDED
+    assert targets["first"].backup_bytes == os.path.getsize(paths["first"])
+    assert targets["same"].backup == BACKUP_REFERENCE and targets["same"].backup_bytes == 0
+    assert targets["current"].action == ACTION_UP_TO_DATE and not targets["current"].will_change
+    assert targets["backed_up"].backup == BACKUP_PRESENT
+    assert targets["readonly"].strip_protection
+    assert targets["locked"].permission_problem == "目标目录不可写"
+    assert targets["missing"].action == ACTION_MISSING
+    assert {target.path for target in plan.problems} == {paths["locked"], paths["missing"]}
+    assert plan.bytes_to_write == 5 * os.path.getsize(source)
+
+
+def test_plan_executes_as_reported(setup):
+    replacer, source, paths, roots = setup
+    targets = [paths[name] for name in ("first", "same", "current", "backed_up")]
+    _, _, plan = replacer.plan_replace(source, targets)
+    success, msg, _, succeeded, failed, _ = replacer.replace_multiple_images(source, plan)
+    assert success, msg
+    with open(source, "rb") as f:
+        data = f.read()
+    for path in targets:
+        with open(path, "rb") as f:
+            assert f.read() == data
+    assert (succeeded, failed) == (4, 0)
@@ -0,0 +1,127 @@
+"""utils.scan_engine 测试"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from utils import scan_engine
+from utils.scan_engine import (
+    ScanSession, SkippedRoots, iter_scan_roots, list_dir, path_exists, root_quarantine, scan_roots,
+)
+
+
+def test_sessions_count_independently(tmp_path):
+    for name in ("a", "b", "c"):
+        (tmp_path / name).mkdir()
+    roots = [str(tmp_path / name) for name in ("a", "b", "c")]
+    barrier = threading.Barrier(2)
+    sessions = {"home": ScanSession(), "wps": ScanSession()}
+
+    def detect(key, scan_func):
+        barrier.wait()
+        for _ in range(20):
+            scan_roots(roots, scan_func, session=sessions[key])
+
+    threads = [
+        threading.Thread(target=detect, args=("home", lambda root: list(list_dir(root)))),
+        threading.Thread(target=detect, args=("wps", lambda root: [root] if path_exists(root) else [])),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sessions["home"].stats.snapshot() == {"scandir": 60, "stat": 0, "total": 60}
+    assert sessions["wps"].stats.snapshot() == {"scandir": 0, "stat": 60, "total": 60}
+
+
+def test_calls_outside_session_are_not_counted(tmp_path):
+    session = ScanSession()
+    list(iter_scan_roots([str(tmp_path)], lambda root: [root], session=session))
+    list_dir(str(tmp_path))
+    assert session.stats.snapshot()["total"] == 0
+
+
+@pytest.fixture
+def quarantine():
+    root_quarantine.clear()
+    yield root_quarantine
+    root_quarantine.clear()
+
+
+def test_long_walk_within_call_budget_is_not_skipped(tmp_path, quarantine):
+    for i in range(8):
+        (tmp_path / f"d{i}").mkdir()
+
+    def walk(root):
+        # 每次列举都很快，但整棵树的遍历超过预算
+        found = []
+        for name in sorted(list_dir(root)):
+            time.sleep(0.05)
+            list_dir(os.path.join(root, name))
+            found.append(name)
+        return found
+
+    session = ScanSession()
+    found = scan_roots([str(tmp_path)], walk, time_budget=0.2, session=session)
+    assert len(found) == 8
+    assert session.skipped.snapshot() == []
+    assert not quarantine.is_quarantined(str(tmp_path))
+
+
+def test_hung_listing_is_skipped_on_daemon_thread(tmp_path, monkeypatch, quarantine):
+    hung = tmp_path / "hung"
+    hung.mkdir()
+    release = threading.Event()
+    real_scandir = scan_engine._scandir
+
+    def scandir(path):
+        if path == str(hung):
+            release.wait(5)
+        return real_scandir(path)
+
+    monkeypatch.setattr(scan_engine, "_scandir", scandir)
+    session = ScanSession()
+    try:
+        found = scan_roots(
+            [str(hung), str(tmp_path)], lambda root: [root] if list_dir(root) is not None else [],
+            time_budget=0.2, session=session,
+        )
+        assert found == [str(tmp_path)]
+        assert session.skipped.snapshot() == [(str(hung), SkippedRoots.SLOW)]
+        assert quarantine.is_quarantined(str(hung))
+        stuck = [t for t in threading.enumerate() if t.name.startswith("path-scan")]
+        assert stuck and all(t.daemon for t in stuck)
+    finally:
+        release.set()
+
+
+def test_more_hung_roots_than_workers(tmp_path, monkeypatch, quarantine):
+    hung = [tmp_path / f"hung{i}" for i in range(3)]
+    for path in hung:
+        path.mkdir()
+    hung_paths = {str(path) for path in hung}
+    release = threading.Event()
+    real_scandir = scan_engine._scandir
+
+    def scandir(path):
+        if path in hung_paths:
+            release.wait(10)
+        return real_scandir(path)
+
+    monkeypatch.setattr(scan_engine, "_scandir", scandir)
+    session = ScanSession()
+    roots = [str(path) for path in hung] + [str(tmp_path)]
+    try:
+        start = time.monotonic()
+        found = scan_roots(
+            roots, lambda root: [root] if list_dir(root) is not None else [],
+            max_workers=2, time_budget=0.2, session=session,
+        )
+        assert time.monotonic() - start < 5
+        assert found == [str(tmp_path)]
+        assert sorted(root for root, _ in session.skipped.snapshot()) == sorted(hung_paths)
+    finally:
+        release.set()
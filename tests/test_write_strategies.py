@@ -0,0 +1,111 @@
+"""core.write_strategies 测试：原子写入、回退顺序与失败时的清理"""
+
+import os
+
+import pytest
+
+from core import write_strategies
+from core.write_strategies import (
+    WRITE_COPY, WRITE_HARDLINK, WRITE_KERNEL, WRITE_MODES, WRITE_REFLINK, WriteUnsupported, atomic_write,
+)
+
+
+@pytest.fixture
+def files(tmp_path):
+    source = tmp_path / "source.png"
+    source.write_bytes(b"new image" * 100)
+    target = tmp_path / "target.png"
+    target.write_bytes(b"original")
+    return source, target
+
+
+def _leftovers(directory):
+    return [name for name in os.listdir(directory) if name.endswith(".tmp")]
+
+
+@pytest.mark.parametrize("mode", WRITE_MODES)
+def test_every_mode_writes_target(files, mode):
+    source, target = files
+    used, size = atomic_write(str(source), str(target), mode)
+    assert used in write_strategies._FALLBACKS[mode]
+    assert size == len(source.read_bytes())
+    assert target.read_bytes() == source.read_bytes()
+    assert _leftovers(target.parent) == []
+
+
+def test_copy_uses_given_data(files):
+    source, target = files
+    assert atomic_write(str(source), str(target), WRITE_COPY, data=b"cached") == (WRITE_COPY, 6)
+    assert target.read_bytes() == b"cached"
+
+
+def test_hardlink_disabled_when_not_allowed(files):
+    source, target = files
+    used, _ = atomic_write(str(source), str(target), WRITE_HARDLINK, allow_link=False)
+    assert used != WRITE_HARDLINK
+    assert not os.path.samefile(source, target)
+
+
+def test_unknown_mode_rejected(files):
+    source, target = files
+    with pytest.raises(ValueError):
+        atomic_write(str(source), str(target), "mmap")
+    assert target.read_bytes() == b"original"
+
+
+def test_fallback_order_and_partial_file_cleanup(files, monkeypatch):
+    source, target = files
+    calls = []
+
+    def unsupported(name):
+        def write(source_path, data, tmp_path):
+            calls.append(name)
+            # 留下写了一半的临时文件，回退前应被删除
+            with open(tmp_path, "wb") as f:
+                f.write(b"partial")
+            raise WriteUnsupported(name)
+        return write
+
+    for mode in (WRITE_HARDLINK, WRITE_REFLINK, WRITE_KERNEL):
+        monkeypatch.setitem(write_strategies._WRITERS, mode, unsupported(mode))
+    copy = write_strategies._WRITERS[WRITE_COPY]
+
+    def recorded_copy(source_path, data, tmp_path):
+        assert not os.path.exists(tmp_path)
+        calls.append(WRITE_COPY)
+        copy(source_path, data, tmp_path)
+
+    monkeypatch.setitem(write_strategies._WRITERS, WRITE_COPY, recorded_copy)
+    used, _ = atomic_write(str(source), str(target), WRITE_HARDLINK)
+    assert calls == [WRITE_HARDLINK, WRITE_REFLINK, WRITE_KERNEL, WRITE_COPY]
+    assert used == WRITE_COPY
+    assert target.read_bytes() == source.read_bytes()
+    assert _leftovers(target.parent) == []
+
+
+def test_write_error_leaves_target_untouched(files, monkeypatch):
+    source, target = files
+
+    def failing(source_path, data, tmp_path):
+        with open(tmp_path, "wb") as f:
+            f.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setitem(write_strategies._WRITERS, WRITE_KERNEL, failing)
+    with pytest.raises(OSError, match="disk full"):
+        atomic_write(str(source), str(target), WRITE_KERNEL)
+    assert target.read_bytes() == b"original"
+    assert _leftovers(target.parent) == []
+
+
+def test_replace_error_leaves_target_untouched(files, monkeypatch):
+    source, target = files
+
+    def failing_replace(src, dst):
+        raise PermissionError("locked")
+
+    monkeypatch.setattr(write_strategies.os, "replace", failing_replace)
+    with pytest.raises(PermissionError):
+        atomic_write(str(source), str(target), WRITE_COPY)
+    assert target.read_bytes() == b"original"
+    assert _leftovers(target.parent) == []
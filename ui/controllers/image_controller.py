@@ -2,6 +2,7 @@
 
 import os
 from PyQt6.QtWidgets import QWidget, QFileDialog
+from core.bulk_import import STATUS_IMPORTED, STATUS_DUPLICATE, STATUS_CANCELLED
 from core.config_manager import ConfigManager
 from core.image_manager import ImageManager
 from qfluentwidgets import MessageBoxBase, SubtitleLabel, LineEdit
@@ -16,66 +17,46 @@ class ImageController:
         self.config_manager = config_manager
         self.image_manager = image_manager
     
-    def import_single_image(self, allow_multiple: bool = False) -> tuple[bool, str, str]:
-        """导入图片
+    def select_import_files(self) -> list[str]:
+        """选择要导入的 PNG 图片（可多选）
         
-        Args:
-            allow_multiple: 是否允许选择多个文件
-            
         Returns:
-            (成功标志, 消息, 文件路径)
+            选中的文件路径列表，取消时为空列表
         """
         file_dialog = QFileDialog(self.parent, "选择PNG图片", os.path.expanduser("~"))
         file_dialog.setNameFilter("PNG图片 (*.png)")
-        
-        # 根据参数设置文件选择模式
-        if allow_multiple:
-            file_dialog.setFileMode(QFileDialog.FileMode.ExistingFiles)
-        else:
-            file_dialog.setFileMode(QFileDialog.FileMode.ExistingFile)
-        
+        file_dialog.setFileMode(QFileDialog.FileMode.ExistingFiles)
         if file_dialog.exec():
-            selected_files = file_dialog.selectedFiles()
-            if selected_files:
-                if allow_multiple:
-                    # 使用现有的批量导入逻辑
-                    success_count, failed_files = self.import_multiple_images(selected_files)
-                    if success_count > 0:
-                        if failed_files:
-                            msg = f"成功导入 {success_count} 个图片，{len(failed_files)} 个失败"
-                        else:
-                            msg = f"成功导入 {success_count} 个图片"
-                        return True, msg, selected_files[0]  # 返回第一个文件路径保持接口一致
-                    else:
-                        return False, "所有图片导入失败", ""
-                else:
-                    # 原有的单个导入逻辑
-                    source_path = selected_files[0]
-                    success, msg = self.image_manager.import_image(source_path)
-                    return success, msg, source_path
-        
-        return False, "", ""
+            return file_dialog.selectedFiles()
+        return []
     
-    def import_multiple_images(self, file_paths: list[str]) -> tuple[int, list]:
+    def import_multiple_images(self, file_paths: list[str]) -> tuple[int, int, list]:
         """批量导入图片
         
         Args:
             file_paths: 文件路径列表
             
         Returns:
-            (成功数量, 失败文件列表[(文件名, 错误信息)])
+            (成功数量, 与已有图片相同的数量, 失败文件列表[(文件名, 错误信息)])
         """
-        success_count = 0
-        failed_files = []
-        
-        for file_path in file_paths:
-            success, msg = self.image_manager.import_image(file_path)
-            if success:
-                success_count += 1
-            else:
-                failed_files.append((os.path.basename(file_path), msg))
+        results = self.image_manager.import_images(file_paths)
+        return self.summarize_import(results)
+    
+    @staticmethod
+    def summarize_import(results: list) -> tuple[int, int, list]:
+        """汇总批量导入结果
         
-        return success_count, failed_files
+        Returns:
+            (成功数量, 与已有图片相同的数量, 失败文件列表[(文件名, 错误信息)])，已取消的文件不计入失败
+        """
+        success_count = sum(1 for r in results if r["status"] == STATUS_IMPORTED)
+        duplicate_count = sum(1 for r in results if r["status"] == STATUS_DUPLICATE)
+        failed_files = [
+            (os.path.basename(r["source"]), r["message"])
+            for r in results
+            if r["status"] not in (STATUS_IMPORTED, STATUS_DUPLICATE, STATUS_CANCELLED)
+        ]
+        return success_count, duplicate_count, failed_files
     
     def rename_image(self, image_info: dict) -> tuple[bool, str]:
         """重命名图片
@@ -101,12 +82,7 @@ class ImageController:
             )
             
             if success:
-                # 更新配置
-                self.config_manager.update_custom_image_name(
-                    image_info["filename"],
-                    new_name,
-                    new_filename
-                )
+                # 配置与图片目录已由 ImageManager 更新
                 return True, f"已重命名为: {new_name}"
             else:
                 MessageHelper.show_error(self.parent, "重命名失败", msg)
@@ -128,7 +104,6 @@ class ImageController:
         
         success = self.image_manager.delete_custom_image(image_info["filename"])
         if success:
-            self.config_manager.remove_custom_image(image_info["filename"])
             return True, f"已删除图片: {image_info['display_name']}"
         
         return False, "无法删除图片,请检查文件权限"
@@ -4,6 +4,9 @@ from PyQt6.QtWidgets import QWidget
 from qfluentwidgets import MessageBoxBase, SubtitleLabel, ComboBox, BodyLabel
 from core.config_manager import ConfigManager
 from utils.path_detector import PathDetector
+from utils.detection_cache import DetectionCache
+from utils.splash_snapshot import SplashDirSnapshot
+from utils.scan_engine import ScanSession, SkippedRoots, root_quarantine, describe_root
 import os
 
 class TargetPathSelectionDialog(MessageBoxBase):
@@ -49,6 +52,55 @@ class PathController:
         self.config_manager = config_manager
         self.page = page  # "home" 或 "wps"
         self.target_path = ""  # 对于WPS，这是splash目录路径；对于希沃，这是单个文件路径
+        self.detection_cache = DetectionCache()
+        self.last_skipped_roots = []  # 最近一次检测中被跳过的根目录 [(根目录, 原因)]
+        # 恢复上次运行时记录的慢速根目录，隔离期内的检测直接跳过它们
+        root_quarantine.restore(self.detection_cache.get_slow_roots())
+    
+    @property
+    def target_path(self):
+        return self._target_path
+    
+    @target_path.setter
+    def target_path(self, path):
+        self._target_path = path
+        # WPS splash 目录快照，目标变化后旧快照不再适用
+        self._splash_snapshot = None
+    
+    def get_splash_snapshot(self, refresh: bool = False):
+        """获取当前 WPS splash 目录的快照
+        
+        快照在首次使用时创建并缓存，同一次用户操作中的计数、显示与替换共用；
+        开始一次新的替换 / 还原操作时传入 refresh=True 重新列举目录。
+        
+        Args:
+            refresh: 是否重新列举目录
+            
+        Returns:
+            SplashDirSnapshot | None: 非 WPS 页面或未设置路径时返回 None
+        """
+        if self.page != "wps" or not self.target_path:
+            return None
+        if refresh or self._splash_snapshot is None:
+            self._splash_snapshot = SplashDirSnapshot.capture(self.target_path)
+        return self._splash_snapshot
+    
+    def invalidate_splash_snapshot(self):
+        """丢弃缓存的目录快照（目录中的文件被修改后调用）"""
+        self._splash_snapshot = None
+    
+    def _adopt_wps_dir(self, splash_dir):
+        """校验 splash 目录，有效时设为目标并保留本次列举得到的快照
+        
+        Returns:
+            SplashDirSnapshot | None: 目录有效时返回快照，否则返回 None
+        """
+        snapshot = SplashDirSnapshot.capture(splash_dir)
+        if not snapshot.valid:
+            return None
+        self.target_path = splash_dir
+        self._splash_snapshot = snapshot
+        return snapshot
     
     def get_target_paths(self):
         """获取目标路径列表
@@ -60,10 +112,9 @@ class PathController:
             list: 目标文件路径列表
         """
         if self.page == "wps":
-            # WPS页面：target_path是splash目录，需要获取所有文件
-            if self.target_path and os.path.isdir(self.target_path):
-                return PathDetector.get_wps_splash_files(self.target_path)
-            return []
+            # WPS页面：target_path是splash目录，文件列表来自目录快照
+            snapshot = self.get_splash_snapshot()
+            return snapshot.paths if snapshot else []
         else:
             # 希沃页面：target_path是单个文件
             if self.target_path and os.path.isfile(self.target_path):
@@ -81,11 +132,10 @@ class PathController:
         
         if saved_path:
             if self.page == "wps":
-                # WPS页面：验证splash目录
-                if os.path.isdir(saved_path) and PathDetector._validate_wps_splash_dir(saved_path):
-                    self.target_path = saved_path
-                    file_count = len(PathDetector.get_wps_splash_files(saved_path))
-                    return True, f"已加载WPS启动图目录 ({file_count}个文件)"
+                # WPS页面：验证splash目录（一次列举，快照留给后续计数与显示）
+                snapshot = self._adopt_wps_dir(saved_path)
+                if snapshot:
+                    return True, f"已加载WPS启动图目录 ({snapshot.file_count}个文件)"
             else:
                 # 希沃页面：验证单个文件
                 is_valid, error_msg = PathDetector.validate_target_path(saved_path)
@@ -97,11 +147,10 @@ class PathController:
         history = self.config_manager.get_path_history(self.page)
         for historical_path in history:
             if self.page == "wps":
-                if os.path.isdir(historical_path) and PathDetector._validate_wps_splash_dir(historical_path):
-                    self.target_path = historical_path
+                snapshot = self._adopt_wps_dir(historical_path)
+                if snapshot:
                     self.config_manager.set_target_path(historical_path, self.page)
-                    file_count = len(PathDetector.get_wps_splash_files(historical_path))
-                    return True, f"已从历史记录恢复WPS启动图目录 ({file_count}个文件)"
+                    return True, f"已从历史记录恢复WPS启动图目录 ({snapshot.file_count}个文件)"
             else:
                 is_valid, _ = PathDetector.validate_target_path(historical_path)
                 if is_valid:
@@ -118,17 +167,68 @@ class PathController:
         
         return False, ""
     
+    def detect_paths(self, use_cache: bool = False, first_only: bool = False,
+                     cancel_token=None, progress=None) -> list[str]:
+        """执行路径检测，并刷新检测缓存
+        
+        只做文件系统与注册表扫描，不涉及任何界面操作，可以在后台线程中调用。
+        
+        Args:
+            use_cache: 是否优先使用检测缓存（上级目录未变化时跳过完整扫描）
+            first_only: 是否在找到第一个有效路径后立即停止扫描
+            cancel_token: 可选的 CancelToken，取消后尽快结束扫描
+            progress: 可选的 ScanProgress，用于报告检测进度
+        """
+        self.last_skipped_roots = []
+        if use_cache:
+            cached = self.detection_cache.get(self.page)
+            if cached is not None:
+                return cached
+        
+        # 每次检测使用各自的计数范围，首页与 WPS 页同时检测时互不干扰
+        session = ScanSession()
+        if self.page == "wps":
+            # WPS 只使用第一个有效的 splash 目录，找到即停止
+            paths = list(PathDetector.iter_wps_paths(True, cancel_token, progress, session))
+        else:
+            paths = list(PathDetector.iter_seewo_paths(first_only, cancel_token, progress, session))
+        self.last_skipped_roots = session.skipped.snapshot()
+        self.detection_cache.set_slow_roots(root_quarantine.snapshot())
+        
+        # 被取消的检测结果不完整，不写入缓存；有根目录被跳过时结果可能不完整，同样不写入
+        if (cancel_token is None or not cancel_token.cancelled) and not self.last_skipped_roots:
+            self.detection_cache.put(self.page, paths)
+        return paths
+    
+    def describe_skipped_roots(self) -> str:
+        """生成最近一次检测中被跳过的根目录说明，没有跳过时返回空字符串"""
+        slow = []
+        quarantined = []
+        for root, reason in self.last_skipped_roots:
+            target = slow if reason == SkippedRoots.SLOW else quarantined
+            name = describe_root(root)
+            if name not in target:
+                target.append(name)
+        
+        lines = []
+        if slow:
+            lines.append(f"以下位置响应过慢，已跳过：{'、'.join(slow)}")
+        if quarantined:
+            lines.append(f"以下位置之前响应过慢，暂不扫描：{'、'.join(quarantined)}")
+        if lines:
+            lines.append("如目标位于这些位置，请稍后重新检测或手动选择")
+        return "\n".join(lines)
+    
     def _silent_detect(self) -> tuple[bool, str]:
-        """静默检测目标路径"""
+        """静默检测目标路径（热启动时使用检测缓存，只需第一个有效路径）"""
+        paths = self.detect_paths(use_cache=True, first_only=True)
         if self.page == "wps":
-            paths = PathDetector.detect_wps_paths()
             if paths:
                 self.target_path = paths[0]  # splash目录路径
                 self.config_manager.set_target_path(self.target_path, self.page)
-                file_count = len(PathDetector.get_wps_splash_files(self.target_path))
+                file_count = self.get_splash_snapshot().file_count
                 return True, f"检测到WPS启动图目录 ({file_count}个文件)"
         else:
-            paths = PathDetector.detect_all_paths()
             if paths:
                 self.target_path = paths[0]
                 self.config_manager.set_target_path(self.target_path, self.page)
@@ -139,15 +239,27 @@ class PathController:
     def detect_with_user_interaction(self) -> tuple[bool, str]:
         """检测目标路径（用户主动触发，可能需要用户选择）
         
+        在当前线程中同步检测；界面中请使用 PathDetectWorker 在后台检测，
+        完成后再调用 handle_detected_paths。
+        
         Returns:
             (成功标志, 提示消息)
         """
-        if self.page == "wps":
-            paths = PathDetector.detect_wps_paths()
-            app_type = "wps"
-        else:
-            paths = PathDetector.detect_all_paths()
-            app_type = "seewo"
+        # 用户主动检测时总是完整扫描，并用结果刷新缓存
+        return self.handle_detected_paths(self.detect_paths())
+    
+    def handle_detected_paths(self, paths: list[str]) -> tuple[bool, str]:
+        """处理检测结果（必须在界面线程调用）
+        
+        未检测到路径时引导用户手动选择，检测到多个路径时弹出选择对话框。
+        
+        Args:
+            paths: detect_paths 返回的路径列表
+            
+        Returns:
+            (成功标志, 提示消息)
+        """
+        app_type = "wps" if self.page == "wps" else "seewo"
         
         if not paths:
             # 手动选择
@@ -188,11 +300,10 @@ class PathController:
                     selected_dirs = dialog.selectedFiles()
                     if selected_dirs:
                         selected_dir = selected_dirs[0]
-                        if PathDetector._validate_wps_splash_dir(selected_dir):
-                            self.target_path = selected_dir
+                        snapshot = self._adopt_wps_dir(selected_dir)
+                        if snapshot:
                             self.config_manager.set_target_path(self.target_path, self.page)
-                            file_count = len(PathDetector.get_wps_splash_files(self.target_path))
-                            return True, f"路径设置成功: WPS启动图目录 ({file_count}个文件)"
+                            return True, f"路径设置成功: WPS启动图目录 ({snapshot.file_count}个文件)"
                         else:
                             return False, "选择的目录不是有效的WPS splash目录\n请选择包含启动图文件的splash目录"
                 return False, ""
@@ -221,7 +332,7 @@ class PathController:
         
         self.config_manager.set_target_path(self.target_path, self.page)
         if self.page == "wps":
-            file_count = len(PathDetector.get_wps_splash_files(self.target_path))
+            file_count = self.get_splash_snapshot().file_count
             return True, f"检测成功: WPS启动图目录 ({file_count}个文件)"
         else:
             return True, f"检测成功: {os.path.basename(self.target_path)}"
@@ -4,9 +4,10 @@ import os
 from PyQt6.QtWidgets import QVBoxLayout, QWidget
 from PyQt6.QtGui import QIcon
 from PyQt6.QtCore import QTimer, QSize
-from qfluentwidgets import FluentWindow, FluentIcon as FIF, IndeterminateProgressBar, NavigationItemPosition, SystemThemeListener, SplashScreen
+from qfluentwidgets import FluentWindow, FluentIcon as FIF, IndeterminateProgressBar, NavigationItemPosition, SystemThemeListener, SplashScreen, MessageBox
 
 from core.config_manager import ConfigManager
+from core.image_catalog import EVENT_ADDED, EVENT_UPDATED, EVENT_REMOVED
 from core.image_manager import ImageManager
 from core.replacer import ImageReplacer
 from utils.admin_helper import is_admin
@@ -14,6 +15,7 @@ from utils.admin_helper import is_admin
 from .widgets import PathInfoCard, ImageListWidget, ActionBar
 from .dialogs import MessageHelper
 from .controllers import PathController, ImageController, PermissionController
+from .workers import PathDetectWorker, ImageImportWorker, MetadataIndexWorker, SourcePrepareWorker
 from .settings import SettingsInterface, apply_saved_appearance_from_config
 
 
@@ -63,9 +65,14 @@ class MainWindow(FluentWindow):
 
     def _init_managers(self):
         self.config_manager = ConfigManager()
-        self.image_manager = ImageManager()
-        self.replacer = ImageReplacer(self.config_manager)
+        self.image_manager = ImageManager(self.config_manager)
+        # 替换时通过图片库的 PNG 元数据索引查询源图片尺寸
+        self.replacer = ImageReplacer(self.config_manager, metadata_lookup=self.image_manager.get_image_metadata)
         self.permission_ctrl = PermissionController()
+        self.import_worker = None
+        self.metadata_worker = None
+        self.source_worker = None
+        self._pending_source = None  # 预处理线程忙时最近选中的图片，线程结束后再处理
 
     def _init_controllers(self):
         for pg in PAGES:
@@ -88,6 +95,7 @@ class MainWindow(FluentWindow):
 
             path_card = PathInfoCard(interface)
             image_list = ImageListWidget(interface)
+            image_list.metadata_provider = self.image_manager.get_image_metadata
             action_bar = ActionBar(interface)
             progress_bar = IndeterminateProgressBar(interface)
             progress_bar.setVisible(False)
@@ -139,31 +147,77 @@ class MainWindow(FluentWindow):
             ilist.imageSelected.connect(lambda info, k=key: self._on_image_selected(info, k))
             ilist.imagesDropped.connect(lambda data, k=key: self._on_images_dropped(data, k))
 
+        # 导入、重命名、删除以差量事件通知两个页面，只更新受影响的卡片
+        self.image_manager.catalog.add_listener(self._on_catalog_changed)
+
     # --- initial load ---
 
     def _load_initial_data(self):
         for pg in PAGES:
             self.load_images(pg["key"])
             success, message = getattr(self, f"{pg['key']}_path_ctrl").load_and_validate_target_path()
-            card = getattr(self, f"{pg['key']}_path_card")
             if success:
-                ctrl = getattr(self, f"{pg['key']}_path_ctrl")
-                tp = ctrl.get_target_paths()
-                file_count = len(tp) if tp else None
-                card.update_path_display(ctrl.target_path, file_count)
+                self._update_path_card(pg["key"])
                 MessageHelper.show_success(self, message, 3000)
             else:
-                card.update_path_display("")
+                getattr(self, f"{pg['key']}_path_card").update_path_display("")
+            self._show_skipped_roots(pg["key"])
+
+        # 在后台补全图片库的 PNG 元数据（只读取新增或变化的文件）
+        # 之后统计重复的自定义图片，由用户决定是否合并
+        self.metadata_worker = MetadataIndexWorker(self.image_manager, self)
+        self.metadata_worker.duplicatesFound.connect(self._on_duplicates_found)
+        self.metadata_worker.start()
 
         if hasattr(self, 'splashScreen'):
             self.splashScreen.finish()
 
+    def _on_duplicates_found(self, count):
+        """发现重复的自定义图片时询问是否合并（删除文件与更新图片目录在界面线程中进行）"""
+        w = MessageBox(
+            "发现重复图片",
+            f"自定义图片中有 {count} 张与其他图片内容完全相同。\n\n"
+            "是否合并？每组只保留最早导入的一张，其余图片的名称记为它的别名，重复的文件将被删除。",
+            self
+        )
+        if not w.exec():
+            # 用户选择不合并，之后不再提示
+            self.config_manager.set_custom_images_deduplicated(True)
+            return
+
+        removed, freed = self.image_manager.dedup_custom_images()
+        for pg in PAGES:
+            last_selected = self.config_manager.get_last_selected_image(pg["key"])
+            if last_selected:
+                getattr(self, f"{pg['key']}_image_list").select_image_by_filename(last_selected)
+        if removed < count:
+            MessageHelper.show_warning(
+                self, "部分重复图片未合并", f"已合并 {removed} 张，其余图片删除失败，下次启动时将再次提示"
+            )
+        else:
+            MessageHelper.show_success(self, f"已合并 {removed} 张重复图片，释放 {freed / 1024:.1f} KB", 3000)
+
     # --- event handlers (unified per-page) ---
 
     def _on_image_selected(self, image_info, page="home"):
         self.config_manager.set_last_selected_image(image_info["filename"], page)
         is_custom = image_info["type"] == "custom"
         getattr(self, f"{page}_action_bar").set_rename_delete_enabled(is_custom)
+        self._prepare_source(image_info["path"])
+
+    def _prepare_source(self, source_path):
+        """在后台预先优化选中的图片，替换时不在界面线程中做 PNG 优化"""
+        if self.source_worker is not None and self.source_worker.isRunning():
+            self._pending_source = source_path
+            return
+        self._pending_source = None
+        self.source_worker = SourcePrepareWorker(self.replacer, source_path, self)
+        self.source_worker.finished.connect(self._on_source_worker_finished)
+        self.source_worker.start()
+
+    def _on_source_worker_finished(self):
+        if self._pending_source is not None:
+            self._prepare_source(self._pending_source)
 
     def _on_images_dropped(self, drop_data, page="home"):
         file_paths, ignored_files = drop_data
@@ -180,17 +234,52 @@ class MainWindow(FluentWindow):
         if not file_paths:
             return
 
-        ctrl = getattr(self, f"{page}_image_ctrl")
+        self._start_import(file_paths, page)
+
+    def _start_import(self, file_paths, page="home"):
+        """在后台线程中批量导入，导入期间导入按钮变为取消按钮"""
+        if self.import_worker is not None and self.import_worker.isRunning():
+            MessageHelper.show_warning(self, "正在导入", "请等待当前导入完成或先取消导入")
+            return
+
         self.show_progress(f"正在导入 {len(file_paths)} 个文件...", page)
-        success_count, failed_files = ctrl.import_multiple_images(file_paths)
+        for pg in PAGES:
+            getattr(self, f"{pg['key']}_action_bar").set_importing(True)
+
+        from functools import partial
+        worker = ImageImportWorker(self.image_manager, file_paths, self)
+        worker.progressChanged.connect(self._on_import_progress)
+        worker.importFinished.connect(partial(self._on_import_finished, page))
+        worker.finished.connect(worker.deleteLater)
+        self.import_worker = worker
+        worker.start()
+
+    def _on_import_progress(self, done, total, name):
+        for pg in PAGES:
+            getattr(self, f"{pg['key']}_action_bar").show_import_progress(done, total)
+
+    def _on_import_finished(self, page, results):
+        cancelled = self.import_worker is not None and self.import_worker.cancel_token.cancelled
+        self.import_worker = None
         self.hide_progress(page)
+        for pg in PAGES:
+            getattr(self, f"{pg['key']}_action_bar").set_importing(False)
 
-        if success_count > 0:
+        # 在界面线程中一次性登记，图片目录的变更事件只更新新增的卡片
+        self.image_manager.commit_import(results)
+        success_count, duplicate_count, failed_files = getattr(self, f"{page}_image_ctrl").summarize_import(results)
+
+        if success_count > 0 or duplicate_count > 0:
             msg = f"成功导入 {success_count} 个图片"
+            if duplicate_count:
+                msg += f"，{duplicate_count} 个与已有图片相同，未重复保存"
             if failed_files:
                 msg += f"，{len(failed_files)} 个失败"
+            if cancelled:
+                msg += "（导入已取消）"
             MessageHelper.show_success(self, msg, 3000)
-            self.load_images(page)
+        elif cancelled:
+            MessageHelper.show_success(self, "导入已取消", 2000)
 
         if failed_files:
             error_details = "\n".join(f"• {name}: {msg}" for name, msg in failed_files[:5])
@@ -199,45 +288,77 @@ class MainWindow(FluentWindow):
             MessageHelper.show_error(self, "部分文件导入失败", error_details)
 
     def _on_detect_path(self, page="home"):
+        worker = getattr(self, f"{page}_detect_worker", None)
+        if worker is not None and worker.isRunning():
+            return
+
         ctrl = getattr(self, f"{page}_path_ctrl")
         card = getattr(self, f"{page}_path_card")
 
+        # 在后台线程中检测，界面保持响应，进度条正常动画
         self.show_progress("正在检测路径...", page)
-        success, message = ctrl.detect_with_user_interaction()
+        card.set_detecting(True)
+
+        from functools import partial
+        worker = PathDetectWorker(ctrl, self)
+        worker.progressChanged.connect(card.show_detect_progress)
+        worker.detectFinished.connect(partial(self._on_detect_finished, page))
+        worker.finished.connect(worker.deleteLater)
+        setattr(self, f"{page}_detect_worker", worker)
+        worker.start()
+
+    def _on_detect_finished(self, page, paths):
+        ctrl = getattr(self, f"{page}_path_ctrl")
+        card = getattr(self, f"{page}_path_card")
+        setattr(self, f"{page}_detect_worker", None)
+
         self.hide_progress(page)
+        card.set_detecting(False)
 
-        tp = ctrl.get_target_paths()
-        file_count = len(tp) if tp else None
-        card.update_path_display(ctrl.target_path, file_count)
+        # 检测完成后再弹出需要用户选择的对话框
+        success, message = ctrl.handle_detected_paths(paths)
+
+        self._update_path_card(page)
         if success:
             MessageHelper.show_success(self, message, 5000)
         elif message:
             MessageHelper.show_error(self, "检测失败", message)
+        self._show_skipped_roots(page)
+
+    def _show_skipped_roots(self, page="home"):
+        """提示检测中因响应过慢而被跳过的驱动器 / 目录"""
+        report = getattr(self, f"{page}_path_ctrl").describe_skipped_roots()
+        if report:
+            MessageHelper.show_warning(self, "部分位置已跳过", report)
+
+    def _update_path_card(self, page="home"):
+        """按当前目标路径刷新路径卡片（WPS 使用已有的目录快照，不重复列举）"""
+        ctrl = getattr(self, f"{page}_path_ctrl")
+        tp = ctrl.get_target_paths()
+        file_count = len(tp) if tp else None
+        getattr(self, f"{page}_path_card").update_path_display(
+            ctrl.target_path, file_count, ctrl.get_splash_snapshot()
+        )
 
     def _on_show_history(self, page="home"):
         ctrl = getattr(self, f"{page}_path_ctrl")
-        card = getattr(self, f"{page}_path_card")
 
         success, result, need_detect = ctrl.select_from_history()
         if success:
-            tp = ctrl.get_target_paths()
-            file_count = len(tp) if tp else None
-            card.update_path_display(result, file_count)
+            self._update_path_card(page)
             MessageHelper.show_success(self, f"已设置目标路径: {os.path.basename(result)}", 5000)
         elif need_detect:
             self._on_detect_path(page)
 
     def _on_import_image(self, page="home"):
-        ctrl = getattr(self, f"{page}_image_ctrl")
-        self.show_progress("正在导入...", page)
-        success, msg, source_path = ctrl.import_single_image(allow_multiple=True)
-        self.hide_progress(page)
+        # 导入进行中时按钮为“取消导入”
+        if self.import_worker is not None and self.import_worker.isRunning():
+            self.import_worker.cancel()
+            return
 
-        if success:
-            MessageHelper.show_success(self, f"图片导入成功: {os.path.basename(source_path)}", 3000)
-            self.load_images(page)
-        elif msg:
-            MessageHelper.show_error(self, "导入失败", msg)
+        file_paths = getattr(self, f"{page}_image_ctrl").select_import_files()
+        if file_paths:
+            self._start_import(file_paths, page)
 
     def _on_rename_image(self, page="home"):
         ilist = getattr(self, f"{page}_image_list")
@@ -250,7 +371,6 @@ class MainWindow(FluentWindow):
         success, msg = ctrl.rename_image(image_info)
         if success:
             MessageHelper.show_success(self, msg, 2000)
-            self.load_images(page)
         elif msg:
             MessageHelper.show_warning(self, "重命名失败", msg)
 
@@ -265,7 +385,6 @@ class MainWindow(FluentWindow):
         success, msg = ctrl.delete_image(image_info)
         if success:
             MessageHelper.show_success(self, msg, 2000)
-            self.load_images(page)
         else:
             MessageHelper.show_error(self, "删除失败", msg)
 
@@ -283,28 +402,41 @@ class MainWindow(FluentWindow):
             MessageHelper.show_warning(self, "未选择图片", "请先从列表中选择要替换的图片")
             return
 
-        target_paths = ctrl.get_target_paths()
+        # WPS 在操作开始时重新列举一次 splash 目录，本次替换全程使用该快照
+        snapshot = ctrl.get_splash_snapshot(refresh=True)
+        target_paths = snapshot.paths if snapshot else ctrl.get_target_paths()
         if not target_paths:
             MessageHelper.show_warning(self, "未找到启动图文件", "请确保splash目录包含所有必要的启动图文件")
             return
 
         # WPS 用批量，希沃走单文件
         if page == "wps":
+            # 先只读地生成替换计划，预计有权限问题时在改动任何文件之前提示
+            planned, plan_msg, plan = replacer.plan_replace(image_info["path"], snapshot, self.config_manager)
+            if not planned:
+                MessageHelper.show_error(self, "替换失败", plan_msg)
+                return
+            problems = [t for t in plan.targets if t.permission_problem]
+            if problems:
+                self.permission_ctrl.handle_permission_error(self, problems[0].permission_problem)
+                return
+
             self.show_progress(f"正在替换 {len(target_paths)} 个文件...", page)
-            success, msg, is_perm_error, sc, fc = replacer.replace_multiple_images(
-                image_info["path"], target_paths, self.config_manager
+            success, msg, is_perm_error, sc, fc, results = replacer.replace_multiple_images(
+                image_info["path"], plan, self.config_manager
             )
+            ctrl.invalidate_splash_snapshot()
             self.hide_progress(page)
 
             if success:
                 if sc == len(target_paths):
-                    MessageHelper.show_success(self, f"启动图片已替换为: {image_info['display_name']}\n成功替换 {sc} 个文件", 4000)
+                    MessageHelper.show_success(self, f"启动图片已替换为: {image_info['display_name']}\n{msg}", 4000)
                 else:
-                    MessageHelper.show_warning(self, f"部分替换成功\n{msg}", 5000)
+                    MessageHelper.show_warning(self, f"部分替换成功\n{msg}{self._describe_batch_failures(results)}", 5000)
             elif is_perm_error:
                 self.permission_ctrl.handle_permission_error(self, msg)
             else:
-                MessageHelper.show_error(self, "替换失败", msg)
+                MessageHelper.show_error(self, "替换失败", msg + self._describe_batch_failures(results))
         else:
             self.show_progress("正在替换...", page)
             success, msg, is_perm_error = replacer.replace_image(
@@ -312,8 +444,14 @@ class MainWindow(FluentWindow):
             )
             self.hide_progress(page)
 
-            if success:
-                MessageHelper.show_success(self, f"启动图片已替换为: {image_info['display_name']}", 3000)
+            if success and msg == replacer.UP_TO_DATE_MSG:
+                MessageHelper.show_success(self, f"启动图片已是: {image_info['display_name']}\n{msg}", 3000)
+            elif success:
+                mismatch = self._describe_size_mismatch(image_info["path"], [ctrl.target_path])
+                if mismatch:
+                    MessageHelper.show_warning(self, f"启动图片已替换为: {image_info['display_name']}", mismatch)
+                else:
+                    MessageHelper.show_success(self, f"启动图片已替换为: {image_info['display_name']}", 3000)
             elif is_perm_error:
                 self.permission_ctrl.handle_permission_error(self, msg)
             else:
@@ -327,25 +465,28 @@ class MainWindow(FluentWindow):
             MessageHelper.show_warning(self, "未检测到路径", "请先点击'检测路径'按钮")
             return
 
-        target_paths = ctrl.get_target_paths()
+        # WPS 在操作开始时重新列举一次 splash 目录，本次还原全程使用该快照
+        snapshot = ctrl.get_splash_snapshot(refresh=True)
+        target_paths = snapshot.paths if snapshot else ctrl.get_target_paths()
         if not target_paths:
             MessageHelper.show_warning(self, "未找到启动图文件", "请确保splash目录包含所有必要的启动图文件")
             return
 
         if page == "wps":
             self.show_progress(f"正在还原 {len(target_paths)} 个文件...", page)
-            success, msg, is_perm_error, sc, fc = replacer.restore_multiple_backups(target_paths)
+            success, msg, is_perm_error, sc, fc, results = replacer.restore_multiple_backups(snapshot)
+            ctrl.invalidate_splash_snapshot()
             self.hide_progress(page)
 
             if success:
                 if sc == len(target_paths):
                     MessageHelper.show_success(self, f"已从备份还原启动图片\n成功还原 {sc} 个文件", 4000)
                 else:
-                    MessageHelper.show_warning(self, f"部分还原成功\n{msg}", 5000)
+                    MessageHelper.show_warning(self, f"部分还原成功\n{msg}{self._describe_batch_failures(results)}", 5000)
             elif is_perm_error:
                 self.permission_ctrl.handle_permission_error(self, msg)
             else:
-                MessageHelper.show_error(self, "还原失败", msg)
+                MessageHelper.show_error(self, "还原失败", msg + self._describe_batch_failures(results))
         else:
             self.show_progress("正在还原...", page)
             success, msg, is_perm_error = replacer.restore_backup(ctrl.target_path)
@@ -359,6 +500,24 @@ class MainWindow(FluentWindow):
                 MessageHelper.show_error(self, "还原失败", msg)
 
     # --- helpers ---
+    @staticmethod
+    def _describe_batch_failures(results, limit=5):
+        """由批量结果生成失败文件说明（最多列出 limit 个）"""
+        failed = [r for r in results if r["status"] in ImageReplacer.FAILED_STATUSES]
+        if not failed:
+            return ""
+        lines = [f"{os.path.basename(r['path'])}: {r['message']}" for r in failed[:limit]]
+        if len(failed) > limit:
+            lines.append(f"等共 {len(failed)} 个")
+        return "\n失败文件:\n" + "\n".join(lines)
+
+    def _describe_size_mismatch(self, source_path, target_paths):
+        """未按目标尺寸渲染且尺寸不一致时的提示，没有问题时返回空字符串"""
+        for result in self.replacer.check_compatibility(source_path, target_paths):
+            if not result["compatible"] and not result["render"]:
+                (sw, sh), (tw, th) = result["source_size"], result["native_size"]
+                return f"图片尺寸 {sw}×{sh} 与启动图 {tw}×{th} 不一致，显示时可能被拉伸或裁剪"
+        return ""
 
     def show_progress(self, message: str, page="home"):
         getattr(self, f"{page}_progress_bar").setVisible(True)
@@ -370,14 +529,28 @@ class MainWindow(FluentWindow):
         getattr(self, f"{page}_progress_bar").setVisible(False)
 
     def load_images(self, page="home"):
-        preset_images = self.image_manager.get_preset_images(page)
-        custom_images = self.image_manager.get_custom_images()
-        getattr(self, f"{page}_image_list").load_images(preset_images, custom_images)
+        catalog = self.image_manager.catalog
+        getattr(self, f"{page}_image_list").load_images(catalog.preset_images(page), catalog.custom_images())
 
         last_selected = self.config_manager.get_last_selected_image(page)
         if last_selected:
             getattr(self, f"{page}_image_list").select_image_by_filename(last_selected)
 
+    def _on_catalog_changed(self, event, img_info, index, old_filename=None):
+        """图片目录变化：在每个页面中插入、更新或移除对应的卡片"""
+        for pg in PAGES:
+            key = pg["key"]
+            ilist = getattr(self, f"{key}_image_list")
+            if event == EVENT_ADDED:
+                ilist.insert_custom_image(img_info, index)
+            elif event == EVENT_UPDATED:
+                ilist.update_custom_image(old_filename, img_info, index)
+                if self.config_manager.get_last_selected_image(key) == old_filename:
+                    self.config_manager.set_last_selected_image(img_info["filename"], key)
+            elif event == EVENT_REMOVED:
+                if ilist.remove_custom_image(img_info["filename"]):
+                    getattr(self, f"{key}_action_bar").set_rename_delete_enabled(False)
+
     def _check_admin_status(self):
         if is_admin():
             current_title = self.windowTitle()
@@ -395,6 +568,20 @@ class MainWindow(FluentWindow):
             self.splashScreen.resize(self.size())
 
     def closeEvent(self, e):
+        for pg in PAGES:
+            worker = getattr(self, f"{pg['key']}_detect_worker", None)
+            if worker is not None and worker.isRunning():
+                worker.cancel()
+                worker.wait(2000)
+        if self.import_worker is not None and self.import_worker.isRunning():
+            self.import_worker.cancel()
+            self.import_worker.wait(5000)
+        if self.metadata_worker is not None and self.metadata_worker.isRunning():
+            self.metadata_worker.cancel()
+            self.metadata_worker.wait(2000)
+        self._pending_source = None
+        if self.source_worker is not None and self.source_worker.isRunning():
+            self.source_worker.wait(2000)
         if hasattr(self, 'themeListener'):
             self.themeListener.terminate()
             self.themeListener.deleteLater()
@@ -9,11 +9,14 @@ from qfluentwidgets import (
     FluentIcon as FIF, SettingCardGroup, OptionsSettingCard, 
     SwitchSettingCard, PrimaryPushSettingCard, PushSettingCard,
     ExpandGroupSettingCard, qconfig, setTheme, Theme,
-    TitleLabel, ScrollArea, ExpandLayout, setThemeColor
+    TitleLabel, ScrollArea, ExpandLayout, setThemeColor, CompactSpinBox, PushButton,
+    SettingCard, ComboBox
 )
 
+from core.backup_manifest import describe_compaction
 from core.config_manager import ConfigManager
 from core.file_protector import FileProtector
+from core.image_renderer import RENDER_OFF, RENDER_CONTAIN, RENDER_COVER, RENDER_STRETCH
 from core.app_info import get_version, get_app_name, get_repository
 from utils.system_theme import get_system_theme_color
 from .dialogs import MessageHelper
@@ -169,6 +172,74 @@ class SettingsInterface(ScrollArea):
         
         # 将手风琴卡片添加到行为设置组
         self.behavior_group.addSettingCard(self.protection_expand_card)
+        
+        # PNG 优化开关
+        self.png_optimize_card = SwitchSettingCard(
+            FIF.ZIP_FOLDER,
+            "部署前优化 PNG",
+            "无损压缩启动图（去除附加信息、选择更优的压缩参数），减小体积并加快解码",
+            parent=self.behavior_group
+        )
+        self.png_optimize_card.checkedChanged.connect(self._on_png_optimize_changed)
+        self.behavior_group.addSettingCard(self.png_optimize_card)
+        
+        # 按目标尺寸缩放（默认关闭，直接使用原图）
+        self.render_mode_card = SettingCard(
+            FIF.FIT_PAGE,
+            "按目标尺寸缩放",
+            "图片尺寸与启动图不一致时，生成与每个启动图尺寸相同的图片再替换",
+            parent=self.behavior_group
+        )
+        self.render_mode_combo = ComboBox(self.render_mode_card)
+        for mode, text in (
+            (RENDER_OFF, "关闭"),
+            (RENDER_CONTAIN, "完整显示"),
+            (RENDER_COVER, "填满并裁剪"),
+            (RENDER_STRETCH, "拉伸"),
+        ):
+            self.render_mode_combo.addItem(text, userData=mode)
+        self.render_mode_card.hBoxLayout.addWidget(self.render_mode_combo, 0, Qt.AlignmentFlag.AlignRight)
+        self.render_mode_card.hBoxLayout.addSpacing(16)
+        self.behavior_group.addSettingCard(self.render_mode_card)
+        
+        # 备份保留策略 - 手风琴卡片
+        self.backup_retention_card = ExpandGroupSettingCard(
+            FIF.HISTORY,
+            "备份保留策略",
+            "删除被取代的旧备份，每个启动图用于还原的原始文件始终保留",
+            parent=self.behavior_group
+        )
+        
+        # 保留代数、总占用上限、保留天数（0 表示不限制）
+        self.keep_generations_spin = self._create_retention_spin_box(0, 99)
+        self.max_total_mb_spin = self._create_retention_spin_box(0, 10240, " MB")
+        self.max_age_days_spin = self._create_retention_spin_box(0, 3650, " 天")
+        self.backup_retention_card.addGroup(
+            FIF.SYNC, "每个启动图保留的代数", "包含用于还原的原始文件，0 表示不限制", self.keep_generations_spin
+        )
+        self.backup_retention_card.addGroup(
+            FIF.ZIP_FOLDER, "备份总占用上限", "超出时从最早的旧备份开始删除，0 表示不限制", self.max_total_mb_spin
+        )
+        self.backup_retention_card.addGroup(
+            FIF.DATE_TIME, "旧备份保留天数", "被取代的备份超过该天数后删除，0 表示不限制", self.max_age_days_spin
+        )
+        
+        # 立即压缩按钮
+        self.compact_backups_button = PushButton("立即压缩", self.backup_retention_card)
+        self.compact_backups_button.clicked.connect(self._on_compact_backups)
+        self.backup_retention_card.addGroup(
+            FIF.BROOM, "压缩备份", "按保留策略删除旧备份，并清理未引用的备份文件", self.compact_backups_button
+        )
+        
+        self.behavior_group.addSettingCard(self.backup_retention_card)
+    
+    def _create_retention_spin_box(self, minimum, maximum, suffix=""):
+        """创建备份保留策略的数值输入框"""
+        spin_box = CompactSpinBox(self.backup_retention_card)
+        spin_box.setRange(minimum, maximum)
+        spin_box.setSuffix(suffix)
+        spin_box.setMinimumWidth(120)
+        return spin_box
     
     def _create_about_group(self):
         """创建关于设置组"""
@@ -205,6 +276,29 @@ class SettingsInterface(ScrollArea):
         # 绑定文件保护设置
         protect_enabled = self.config_manager.get_file_protection_enabled()
         self.prevent_restore_card.setChecked(protect_enabled)
+        
+        # 绑定 PNG 优化设置
+        self.png_optimize_card.setChecked(self.config_manager.get_png_optimize())
+        
+        # 绑定缩放方式
+        index = self.render_mode_combo.findData(self.config_manager.get_render_mode())
+        self.render_mode_combo.setCurrentIndex(max(index, 0))
+        self.render_mode_combo.currentIndexChanged.connect(self._on_render_mode_changed)
+        
+        # 绑定备份保留策略
+        retention = self.config_manager.get_backup_retention()
+        self.keep_generations_spin.setValue(retention["keep_generations"])
+        self.max_total_mb_spin.setValue(retention["max_total_mb"])
+        self.max_age_days_spin.setValue(retention["max_age_days"])
+        self.keep_generations_spin.valueChanged.connect(
+            lambda value: self.config_manager.set_backup_retention(keep_generations=value)
+        )
+        self.max_total_mb_spin.valueChanged.connect(
+            lambda value: self.config_manager.set_backup_retention(max_total_mb=value)
+        )
+        self.max_age_days_spin.valueChanged.connect(
+            lambda value: self.config_manager.set_backup_retention(max_age_days=value)
+        )
     
     def _on_theme_changed(self, item):
         """主题切换事件"""
@@ -323,7 +417,70 @@ class SettingsInterface(ScrollArea):
                 f"移除保护时出现错误: {str(e)}",
                 3000
             )
-
+    
+    def _on_png_optimize_changed(self, enabled):
+        """PNG 优化开关事件"""
+        self.config_manager.set_png_optimize(enabled)
+        replacer = getattr(self.parent_window, "replacer", None)
+        if replacer is not None:
+            replacer.optimizer.enabled = enabled
+        
+        if not self._is_applying_saved_settings:
+            status = "已启用" if enabled else "已禁用"
+            if self.parent_window:
+                MessageHelper.show_success(
+                    self.parent_window,
+                    f"PNG 优化{status}",
+                    2000
+                )
+    
+    def _on_render_mode_changed(self, index):
+        """缩放方式切换事件"""
+        mode = self.render_mode_combo.itemData(index)
+        self.config_manager.set_render_mode(mode)
+        replacer = getattr(self.parent_window, "replacer", None)
+        if replacer is not None:
+            replacer.renderer.mode = mode
+        
+        if self.parent_window:
+            MessageHelper.show_success(
+                self.parent_window,
+                f"缩放方式：{self.render_mode_combo.itemText(index)}",
+                2000
+            )
+    
+    def _on_compact_backups(self):
+        """压缩备份按钮点击事件"""
+        replacer = getattr(self.parent_window, "replacer", None)
+        if replacer is None:
+            return
+        try:
+            report = replacer.compact_backups()
+            removed = len(report["removed"]) + report["removed_objects"]
+            if report["over_limit"]:
+                MessageHelper.show_warning(
+                    self.parent_window,
+                    f"{describe_compaction(report)}，原始文件已超出总占用上限",
+                    3000
+                )
+            elif removed:
+                MessageHelper.show_success(
+                    self.parent_window,
+                    describe_compaction(report),
+                    3000
+                )
+            else:
+                MessageHelper.show_success(
+                    self.parent_window,
+                    "没有需要清理的备份文件",
+                    2000
+                )
+        except Exception as e:
+            MessageHelper.show_error(
+                self.parent_window,
+                f"压缩备份时出现错误: {str(e)}",
+                3000
+            )
     
     def _get_all_protected_files(self):
         """获取所有可能受保护的文件路径"""
@@ -55,3 +55,25 @@ class ActionBar(QWidget):
         """
         self.rename_btn.setEnabled(enabled)
         self.delete_btn.setEnabled(enabled)
+    
+    def set_importing(self, importing: bool):
+        """设置导入中状态（导入期间导入按钮变为取消按钮）
+        
+        Args:
+            importing: 是否正在导入
+        """
+        if importing:
+            self.import_btn.setIcon(FIF.CLOSE)
+            self.import_btn.setText("取消导入")
+        else:
+            self.import_btn.setIcon(FIF.ADD)
+            self.import_btn.setText("导入图片")
+    
+    def show_import_progress(self, done: int, total: int):
+        """在取消按钮上显示导入进度
+        
+        Args:
+            done: 已完成的文件数
+            total: 文件总数
+        """
+        self.import_btn.setText(f"取消导入 ({done}/{total})")
@@ -3,6 +3,7 @@ from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QPixmap, QDragEnterEvent, QDropEvent
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QSizePolicy
 from qfluentwidgets import FlowLayout, CardWidget, SingleDirectionScrollArea, CaptionLabel, ToolTipFilter, ToolTipPosition
+from core.png_header import COLOR_TYPE_NAMES
 
 
 class ImageCard(CardWidget):
@@ -10,10 +11,13 @@ class ImageCard(CardWidget):
     
     imageClicked = pyqtSignal(dict)  # 改名为 imageClicked，避免与父类的 clicked 冲突
     
-    def __init__(self, img_info: dict, parent=None):
+    def __init__(self, img_info: dict, parent=None, metadata_provider=None):
         super().__init__(parent)
         self.img_info = img_info
         self.is_selected = False
+        # PNG 元数据查询 metadata_provider(path) -> dict | None，鼠标首次悬停时才查询
+        self.metadata_provider = metadata_provider
+        self.metadata = None
         self._init_ui()
     
     def _init_ui(self):
@@ -33,6 +37,30 @@ class ImageCard(CardWidget):
         self.image_label.setScaledContents(False)
         
         # 加载图片
+        self._load_pixmap()
+        
+        # 文字标签
+        self.text_label = CaptionLabel(self.img_info["display_name"])
+        self.text_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.text_label.setWordWrap(True)
+        
+        layout.addWidget(self.image_label, 0, Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.text_label, 0, Qt.AlignmentFlag.AlignCenter)
+        
+        # 设置工具提示 - 使用官方最佳实践
+        self._setup_tooltip()
+        
+        # 设置鼠标光标
+        self.setCursor(Qt.CursorShape.PointingHandCursor)
+        
+        # 连接父类的 clicked 信号到我们的处理函数
+        self.clicked.connect(self._on_clicked)
+        
+        # 更新样式
+        self._update_style()
+    
+    def _load_pixmap(self):
+        """加载并缩放缩略图"""
         if os.path.exists(self.img_info["path"]):
             pixmap = QPixmap(self.img_info["path"])
             if not pixmap.isNull():
@@ -53,35 +81,24 @@ class ImageCard(CardWidget):
                 scaled_pixmap.setDevicePixelRatio(dpr)
                 
                 self.image_label.setPixmap(scaled_pixmap)
+    
+    def update_info(self, img_info: dict):
+        """更新图片信息（如重命名），只在文件内容可能变化时重新加载缩略图
         
-        # 文字标签
-        self.text_label = CaptionLabel(self.img_info["display_name"])
-        self.text_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.text_label.setWordWrap(True)
-        
-        layout.addWidget(self.image_label, 0, Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(self.text_label, 0, Qt.AlignmentFlag.AlignCenter)
-        
-        # 设置工具提示 - 使用官方最佳实践
-        self._setup_tooltip()
-        
-        # 设置鼠标光标
-        self.setCursor(Qt.CursorShape.PointingHandCursor)
-        
-        # 连接父类的 clicked 信号到我们的处理函数
-        self.clicked.connect(self._on_clicked)
-        
-        # 更新样式
-        self._update_style()
+        重命名只改变路径与名称，缩略图保持不变。
+        """
+        old_info = self.img_info
+        self.img_info = img_info
+        self.metadata = None
+        self.text_label.setText(img_info["display_name"])
+        self.setToolTip(self._tooltip_text())
+        if old_info["filename"] == img_info["filename"]:
+            self._load_pixmap()
     
     def _setup_tooltip(self):
         """设置工具提示 - 按照官方最佳实践"""
-        # 构建工具提示文本
-        img_type = '预设' if self.img_info['type'] == 'preset' else '自定义'
-        tooltip_text = f"类型: {img_type}\n文件名: {self.img_info['filename']}"
-        
         # 设置工具提示文本
-        self.setToolTip(tooltip_text)
+        self.setToolTip(self._tooltip_text())
         
         # 安装 ToolTipFilter 事件过滤器
         # 参数: (目标控件, 延迟时间ms, 显示位置)
@@ -93,6 +110,33 @@ class ImageCard(CardWidget):
         # self.setToolTipDuration(3000)  # 3秒后自动消失
         # self.setToolTipDuration(-1)    # 不自动消失，直到鼠标移开
     
+    def _tooltip_text(self):
+        """构建工具提示文本"""
+        img_type = '预设' if self.img_info['type'] == 'preset' else '自定义'
+        text = f"类型: {img_type}\n文件名: {self.img_info['filename']}"
+        if self.img_info.get('aliases'):
+            text += f"\n别名: {'、'.join(self.img_info['aliases'])}"
+        if self.metadata:
+            meta = self.metadata
+            color = COLOR_TYPE_NAMES.get(meta['color_type'], str(meta['color_type']))
+            text += (
+                f"\n尺寸: {meta['width']} × {meta['height']}"
+                f"\n格式: {color} {meta['bit_depth']} 位"
+                f"\n大小: {meta['size'] / 1024:.1f} KB"
+            )
+        return text
+    
+    def enterEvent(self, event):
+        """鼠标首次悬停时查询 PNG 元数据并补充到工具提示中（提示在延迟后才读取文本）"""
+        if self.metadata is None and self.metadata_provider is not None:
+            try:
+                self.metadata = self.metadata_provider(self.img_info["path"]) or {}
+            except Exception as e:
+                print(f"读取图片元数据失败: {e}")
+                self.metadata = {}
+            self.setToolTip(self._tooltip_text())
+        super().enterEvent(event)
+    
     def _on_clicked(self):
         """处理父类的 clicked 信号"""
         self.imageClicked.emit(self.img_info)
@@ -139,6 +183,8 @@ class ImageListWidget(QWidget):
         super().__init__(parent)
         self.image_cards = []  # 存储所有图片卡片
         self.selected_card = None  # 当前选中的卡片
+        self.preset_count = 0  # 列表开头的预设图片数量（自定义图片排在其后）
+        self.metadata_provider = None  # 卡片工具提示使用的 PNG 元数据查询
         self._init_ui()
         self._setup_drag_drop()
     
@@ -266,17 +312,83 @@ class ImageListWidget(QWidget):
         self.image_cards.clear()
         self.selected_card = None
         
+        self.preset_count = len(preset_images)
         all_images = preset_images + custom_images
         
         for img_info in all_images:
-            card = ImageCard(img_info, self.content_widget)
-            card.imageClicked.connect(self._on_card_clicked)
+            card = self._create_card(img_info)
             self.image_cards.append(card)
             self.flow_layout.addWidget(card)
         
         # 更新内容控件的高度以适应所有卡片
         self._update_content_height()
     
+    def _create_card(self, img_info: dict):
+        card = ImageCard(img_info, self.content_widget, self.metadata_provider)
+        card.imageClicked.connect(self._on_card_clicked)
+        return card
+    
+    def _find_card(self, filename: str, img_type: str = "custom"):
+        for card in self.image_cards:
+            if card.img_info["filename"] == filename and card.img_info["type"] == img_type:
+                return card
+        return None
+    
+    def insert_custom_image(self, img_info: dict, index: int):
+        """在自定义图片的第 index 个位置插入一张卡片，其他卡片保持不变
+        
+        Args:
+            img_info: 图片信息
+            index: 在自定义图片中的位置
+        """
+        position = min(self.preset_count + index, len(self.image_cards))
+        card = self._create_card(img_info)
+        self.image_cards.insert(position, card)
+        self.flow_layout.insertWidget(position, card)
+        self._update_content_height()
+    
+    def update_custom_image(self, old_filename: str, img_info: dict, index: int):
+        """更新一张自定义图片卡片（如重命名），排序位置变化时移动卡片
+        
+        Args:
+            old_filename: 变化前的文件名
+            img_info: 新的图片信息
+            index: 在自定义图片中的新位置
+        """
+        card = self._find_card(old_filename)
+        if card is None:
+            self.insert_custom_image(img_info, index)
+            return
+        card.update_info(img_info)
+        
+        position = min(self.preset_count + index, len(self.image_cards) - 1)
+        if self.image_cards[position] is not card:
+            self.image_cards.remove(card)
+            self.image_cards.insert(position, card)
+            self.flow_layout.removeWidget(card)
+            # 清除“已被布局”标记，否则重新插入时 Qt 会把卡片当作已在布局中的控件再次移除
+            card.setAttribute(Qt.WidgetAttribute.WA_LaidOut, False)
+            self.flow_layout.insertWidget(position, card)
+            self._update_content_height()
+    
+    def remove_custom_image(self, filename: str):
+        """移除一张自定义图片卡片
+        
+        Returns:
+            bool: 被移除的卡片是否为选中的卡片
+        """
+        card = self._find_card(filename)
+        if card is None:
+            return False
+        was_selected = card is self.selected_card
+        if was_selected:
+            self.selected_card = None
+        self.image_cards.remove(card)
+        self.flow_layout.removeWidget(card)
+        card.deleteLater()
+        self._update_content_height()
+        return was_selected
+    
     def _update_content_height(self):
         """更新内容控件的高度"""
         # 让FlowLayout重新计算布局
@@ -1,4 +1,5 @@
 import os
+from datetime import datetime
 from PyQt6.QtWidgets import QHBoxLayout
 from qfluentwidgets import CardWidget, StrongBodyLabel, PushButton, FluentIcon as FIF, ToolTipFilter, ToolTipPosition
 
@@ -9,6 +10,7 @@ class PathInfoCard(CardWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFixedHeight(80)
+        self._detecting = False
         self._init_ui()
     
     def _init_ui(self):
@@ -65,13 +67,16 @@ class PathInfoCard(CardWidget):
         # 设置较长的显示时间，因为路径信息可能较长
         self.path_label.setToolTipDuration(5000)  # 5秒后自动消失
     
-    def update_path_display(self, path: str, file_count: int = None):
+    def update_path_display(self, path: str, file_count: int = None, snapshot=None):
         """更新路径显示
         
         Args:
             path: 目标路径,空字符串表示未设置路径
             file_count: 可选的文件数量（用于WPS页面显示）
+            snapshot: 可选的 SplashDirSnapshot（WPS页面），提供文件数量、大小与修改时间
         """
+        if snapshot is not None:
+            file_count = snapshot.file_count
         if path:
             # 缩短路径显示
             path_parts = path.split(os.sep)
@@ -89,6 +94,11 @@ class PathInfoCard(CardWidget):
             # 设置完整路径的工具提示
             if file_count is not None:
                 full_path_tooltip = f"完整路径:\n{path}\n\n包含 {file_count} 个启动图文件"
+                if snapshot is not None and snapshot.files:
+                    full_path_tooltip += f"\n总大小: {snapshot.total_size / 1024:.1f} KB"
+                    if snapshot.latest_mtime is not None:
+                        modified = datetime.fromtimestamp(snapshot.latest_mtime).strftime("%Y-%m-%d %H:%M:%S")
+                        full_path_tooltip += f"\n最近修改: {modified}"
             else:
                 full_path_tooltip = f"完整路径:\n{path}"
             self._setup_path_label_tooltip(full_path_tooltip, ToolTipPosition.BOTTOM)
@@ -99,3 +109,29 @@ class PathInfoCard(CardWidget):
             # 设置提示信息的工具提示
             help_tooltip = "请点击'检测路径'或'历史路径'按钮来设置启动图片路径"
             self._setup_path_label_tooltip(help_tooltip, ToolTipPosition.BOTTOM)
+    
+    def set_detecting(self, detecting: bool):
+        """设置检测中状态（检测期间禁用按钮，避免重复触发）
+        
+        Args:
+            detecting: 是否正在检测
+        """
+        self._detecting = detecting
+        self.detect_button.setEnabled(not detecting)
+        self.history_button.setEnabled(not detecting)
+        if detecting:
+            self.path_label.setText("正在检测启动图片路径...")
+    
+    def show_detect_progress(self, roots_scanned: int, candidates: int):
+        """显示检测进度
+        
+        Args:
+            roots_scanned: 已扫描的位置数
+            candidates: 已找到的候选路径数
+        """
+        # 检测结束后仍可能收到排队中的进度信号，忽略即可
+        if not self._detecting:
+            return
+        self.path_label.setText(
+            f"正在检测启动图片路径... 已扫描 {roots_scanned} 个位置，找到 {candidates} 个候选"
+        )
@@ -0,0 +1,8 @@
+"""后台任务模块"""
+
+from .detect_worker import PathDetectWorker
+from .import_worker import ImageImportWorker
+from .metadata_worker import MetadataIndexWorker
+from .source_worker import SourcePrepareWorker
+
+__all__ = ['PathDetectWorker', 'ImageImportWorker', 'MetadataIndexWorker', 'SourcePrepareWorker']
@@ -0,0 +1,40 @@
+"""路径检测后台线程 - 避免检测期间阻塞界面"""
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from utils.scan_engine import CancelToken, ScanProgress
+
+
+class PathDetectWorker(QThread):
+    """路径检测后台线程
+    
+    在后台线程中调用 PathController.detect_paths，通过信号报告进度与结果。
+    需要用户交互的部分（手动选择、多路径选择对话框）由接收方在界面线程中完成。
+    """
+    
+    progressChanged = pyqtSignal(int, int)  # (已扫描的位置数, 已找到的候选路径数)
+    detectFinished = pyqtSignal(list)  # 检测到的路径列表
+    
+    def __init__(self, path_controller, parent=None):
+        super().__init__(parent)
+        self.path_controller = path_controller
+        self.cancel_token = CancelToken()
+    
+    def run(self):
+        """线程入口"""
+        # 回调在扫描线程中触发，信号会被排队转发到界面线程
+        progress = ScanProgress(self.progressChanged.emit)
+        try:
+            paths = self.path_controller.detect_paths(
+                cancel_token=self.cancel_token,
+                progress=progress
+            )
+        except Exception as e:
+            print(f"路径检测失败: {e}")
+            paths = []
+        
+        if not self.cancel_token.cancelled:
+            self.detectFinished.emit(paths)
+    
+    def cancel(self):
+        """请求取消检测"""
+        self.cancel_token.cancel()
@@ -0,0 +1,43 @@
+"""批量导入后台线程 - 校验与复制期间不阻塞界面"""
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from utils.scan_engine import CancelToken
+
+
+class ImageImportWorker(QThread):
+    """批量导入后台线程
+    
+    在后台线程中调用 ImageManager.prepare_import（线程池并行校验与复制），
+    通过信号逐个文件报告进度。登记到图片索引与更新图片列表由接收方在界面线程中
+    调用 ImageManager.commit_import 完成；取消后已复制的文件同样需要登记。
+    """
+    
+    progressChanged = pyqtSignal(int, int, str)  # (已完成数, 总数, 刚完成的文件名)
+    importFinished = pyqtSignal(list)  # 逐个文件的结果
+    
+    def __init__(self, image_manager, file_paths, parent=None):
+        super().__init__(parent)
+        self.image_manager = image_manager
+        self.file_paths = list(file_paths)
+        self.cancel_token = CancelToken()
+    
+    def run(self):
+        """线程入口"""
+        # 回调在复制线程中触发，信号会被排队转发到界面线程
+        def progress(done, total, result):
+            self.progressChanged.emit(done, total, result["display_name"])
+        
+        try:
+            results = self.image_manager.prepare_import(
+                self.file_paths,
+                progress=progress,
+                cancel_token=self.cancel_token
+            )
+        except Exception as e:
+            print(f"批量导入失败: {e}")
+            results = []
+        self.importFinished.emit(results)
+    
+    def cancel(self):
+        """请求取消导入（正在复制的文件会完成，其余文件跳过）"""
+        self.cancel_token.cancel()
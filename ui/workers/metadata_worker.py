@@ -0,0 +1,43 @@
+"""PNG 元数据索引后台线程 - 启动时补全 / 更新图片库的元数据，不阻塞界面"""
+
+from PyQt6.QtCore import QThread, pyqtSignal
+from utils.scan_engine import CancelToken
+
+
+class MetadataIndexWorker(QThread):
+    """PNG 元数据索引后台线程
+    
+    调用 ImageManager.refresh_metadata：只有新增或变化的文件才会重新读取文件头与计算哈希，
+    未变化时只需一次索引查询与逐个文件的 stat。之后统计尚未合并的重复自定义图片
+    （ImageManager.pending_duplicates），是否合并由界面询问用户。
+    """
+    
+    indexFinished = pyqtSignal(int)  # 索引中的图片数量
+    duplicatesFound = pyqtSignal(int)  # 尚未合并的重复自定义图片数（大于 0 时发出）
+    
+    def __init__(self, image_manager, parent=None):
+        super().__init__(parent)
+        self.image_manager = image_manager
+        self.cancel_token = CancelToken()
+    
+    def run(self):
+        """线程入口"""
+        try:
+            indexed = self.image_manager.refresh_metadata(cancel_token=self.cancel_token)
+        except Exception as e:
+            print(f"更新图片元数据失败: {e}")
+            indexed = 0
+        self.indexFinished.emit(indexed)
+        if self.cancel_token.cancelled:
+            return
+        try:
+            duplicates = self.image_manager.pending_duplicates()
+        except Exception as e:
+            print(f"查找重复图片失败: {e}")
+            duplicates = 0
+        if duplicates:
+            self.duplicatesFound.emit(duplicates)
+    
+    def cancel(self):
+        """请求停止索引"""
+        self.cancel_token.cancel()
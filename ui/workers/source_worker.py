@@ -0,0 +1,27 @@
+"""源图片预处理后台线程 - 选中图片时预先做 PNG 优化，替换时不阻塞界面"""
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+
+class SourcePrepareWorker(QThread):
+    """源图片预处理后台线程
+    
+    调用 ImageReplacer.prepare_source：优化结果按源文件哈希缓存，
+    之后替换同一张图片时直接使用缓存，界面线程中只需读取源文件。
+    """
+    
+    prepared = pyqtSignal(str)  # 已预处理的源图片路径
+    
+    def __init__(self, replacer, source_path, parent=None):
+        super().__init__(parent)
+        self.replacer = replacer
+        self.source_path = source_path
+    
+    def run(self):
+        """线程入口"""
+        try:
+            self.replacer.prepare_source(self.source_path)
+        except Exception as e:
+            print(f"预处理源图片失败: {e}")
+            return
+        self.prepared.emit(self.source_path)
@@ -0,0 +1,145 @@
+"""路径检测缓存 - 记录检测结果及其上级目录的修改时间，热启动时免去全盘扫描"""
+
+import json
+import os
+import time
+from utils.resource_path import get_app_data_path
+
+
+class DetectionCache:
+    """路径检测缓存
+
+    每个页面（"home" / "wps"）保存一条记录：检测到的路径列表，以及这些路径所在的
+    上级目录的修改时间。新版本安装、新用户目录创建等都会改变上级目录的修改时间，
+    因此热启动时只需重新 stat 这些目录即可判断缓存是否仍然有效。
+    
+    另外保存慢速根目录的隔离记录（slow_roots），重启后在隔离期内仍然跳过这些根目录。
+    """
+
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_file="config/detect_cache.json"):
+        # 与 config/splash.json 放在同一目录
+        self.cache_file = get_app_data_path(cache_file)
+        self.data = self.load()
+
+    def load(self):
+        """加载缓存"""
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict) and data.get("version") == self.CACHE_VERSION:
+                    data.setdefault("entries", {})
+                    data.setdefault("slow_roots", {})
+                    return data
+            except Exception as e:
+                print(f"加载检测缓存失败: {e}")
+        return {"version": self.CACHE_VERSION, "entries": {}, "slow_roots": {}}
+
+    def save(self):
+        """保存缓存"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            return True
+        except Exception as e:
+            print(f"保存检测缓存失败: {e}")
+            return False
+
+    @staticmethod
+    def _watch_dirs(paths):
+        r"""计算需要监视修改时间的上级目录
+
+        从路径所在目录的上一级开始，一直到盘符根目录之前。路径自身所在的目录
+        （如 splash 目录、Assets 目录）不参与监视，替换启动图时会在其中写入文件。
+
+        例如 C:\Program Files\Seewo\EasiNote5\EasiNote5_5.2\Main\Assets\SplashScreen.png
+        会监视 Main、EasiNote5_5.2、EasiNote5、Seewo、Program Files 这几个目录。
+        """
+        dirs = []
+        seen = set()
+        for path in paths:
+            current = os.path.dirname(os.path.normpath(path))
+            while True:
+                parent = os.path.dirname(current)
+                if not parent or parent == current:
+                    break
+                if os.path.dirname(parent) == parent:
+                    # parent 已是盘符根目录
+                    break
+                key = os.path.normcase(parent)
+                if key not in seen:
+                    seen.add(key)
+                    dirs.append(parent)
+                current = parent
+        return dirs
+
+    @staticmethod
+    def _dir_mtime(path):
+        """获取目录修改时间（纳秒），不存在时返回 None"""
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self, page):
+        """读取缓存的检测结果
+
+        Args:
+            page: 页面标识，"home" 或 "wps"
+
+        Returns:
+            list | None: 缓存仍然有效时返回路径列表，否则返回 None（需要完整扫描）
+        """
+        entry = self.data["entries"].get(page)
+        if not entry or not entry.get("paths"):
+            return None
+
+        for directory, mtime in entry.get("dirs", {}).items():
+            if self._dir_mtime(directory) != mtime:
+                return None
+
+        paths = entry["paths"]
+        if not all(os.path.exists(p) for p in paths):
+            return None
+        return list(paths)
+
+    def put(self, page, paths):
+        """写入检测结果（空结果不缓存，下次仍进行完整扫描）
+
+        Args:
+            page: 页面标识，"home" 或 "wps"
+            paths: 检测到的路径列表
+        """
+        # 重新加载缓存，避免覆盖另一个页面刚写入的记录
+        self.data = self.load()
+        # 先确保缓存目录存在，避免随后创建目录改变被监视目录的修改时间
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        if paths:
+            dirs = {}
+            for directory in self._watch_dirs(paths):
+                mtime = self._dir_mtime(directory)
+                if mtime is not None:
+                    dirs[directory] = mtime
+            self.data["entries"][page] = {
+                "paths": list(paths),
+                "dirs": dirs,
+                "saved_at": time.time(),
+            }
+        else:
+            self.data["entries"].pop(page, None)
+        self.save()
+
+    def get_slow_roots(self):
+        """读取慢速根目录的隔离记录 {隔离键: 到期时间戳}"""
+        return dict(self.data.get("slow_roots", {}))
+
+    def set_slow_roots(self, slow_roots):
+        """写入慢速根目录的隔离记录（与已保存的记录相同时不写文件）"""
+        self.data = self.load()
+        if self.data.get("slow_roots", {}) == slow_roots:
+            return
+        self.data["slow_roots"] = dict(slow_roots)
+        self.save()
@@ -1,27 +1,40 @@
 import os
-import sys
-import glob
 import re
-from qfluentwidgets import MessageBox
-from PyQt6.QtWidgets import QFileDialog
+from utils.scan_engine import (
+    scan_roots, iter_scan_roots, dedupe_paths, path_key, scan_session, ScanSession,
+    path_exists, list_dir, child_dirs, DirWalker, CancelToken, DRIVE_LETTERS, drive_path,
+)
+from utils.registry_index import HKLM, HKCU, get_registry_provider, get_uninstall_index
+from utils.splash_snapshot import SplashDirSnapshot, WPS_SPLASH_FILES
+from utils.splash_layouts import (
+    WPS_USER, SEEWO_BANNER, SEEWO_REGISTRY_TRIE, SEEWO_DRIVE_TRIE, SEEWO_BANNER_TRIE, SEEWO_SPLASHSCREEN_TRIE,
+    WPS_INSTALL_TRIE, WPS_USER_TRIE, WPS_DRIVE_TRIE,
+)
 
 
 class PathDetector:
     """检测希沃白板启动图片路径"""
     
+    # WPS splash 目录必须包含的启动图文件（根目录与 hdpi 子目录各一套）
+    WPS_SPLASH_FILES = WPS_SPLASH_FILES
+    
     @staticmethod
-    def _get_available_drives():
+    def _get_available_drives(session=None):
         """
         获取所有可用的驱动器盘符
         
+        Args:
+            session: 可选的 ScanSession，探测计入本次检测
+        
         Returns:
             list: 可用驱动器盘符列表，如 ['C', 'D', 'E']
         """
-        drives = []
-        for drive_letter in "CDEFGHIJKLMNOPQRSTUVWXYZ":
-            drive_path = f"{drive_letter}:\\"
-            if os.path.exists(drive_path):
-                drives.append(drive_letter)
+        # 并发探测各盘符，避免断开的网络驱动器逐个阻塞
+        drives = scan_roots(
+            DRIVE_LETTERS,
+            lambda letter: [letter] if path_exists(drive_path(letter)) else [],
+            session=session,
+        )
         
         # 如果没有找到驱动器，尝试从环境变量获取
         if not drives:
@@ -36,286 +49,290 @@ class PathDetector:
         return drives
     
     @staticmethod
-    def _collect_wps_splash_from_base_dirs(base_paths):
-        """在给定的 WPS 安装根目录下查找已验证的 splash 目录。"""
-        splash_dirs = []
-        splash_dir_patterns = [
-            "office6\\mui\\*\\resource\\splash",
-            "office6\\mui\\*\\res\\splash",
-            "office6\\res\\splash",
-            "wps\\res\\splash",
-        ]
+    def _collect_wps_splash_from_base_dirs(base_paths, cancel_token=None):
+        """在给定的 WPS 安装根目录下查找已验证的 splash 目录。
+
+        Returns:
+            list: [(布局类型, splash 目录)]，布局见 utils.splash_layouts.WPS_INSTALL_LAYOUTS
+        """
+        matches = []
         for base_path in base_paths:
-            if not base_path or not os.path.exists(base_path):
+            if not base_path:
                 continue
-            for pattern in splash_dir_patterns:
-                full_pattern = os.path.join(base_path, pattern)
-                for splash_dir in glob.glob(full_pattern):
-                    if os.path.isdir(splash_dir) and PathDetector._validate_wps_splash_dir(splash_dir):
-                        splash_dirs.append(splash_dir)
-        return splash_dirs
+            # 全部布局编译在一棵前缀树中，每个根目录只遍历一次
+            for kind, splash_dir in WPS_INSTALL_TRIE.match(DirWalker(cancel_token), base_path):
+                if PathDetector._validate_wps_splash_dir(splash_dir):
+                    matches.append((kind, splash_dir))
+        return matches
     
     @staticmethod
-    def _enum_uninstall_subkeys():
-        """枚举卸载信息子键 (hkey, parent_path, subkey_name)。"""
-        if sys.platform != "win32":
-            return
-        import winreg
-        roots = [
-            (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
-            (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
-            (winreg.HKEY_CURRENT_USER, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
-        ]
-        for hkey, parent_path in roots:
-            try:
-                with winreg.OpenKey(hkey, parent_path, 0, winreg.KEY_READ) as key:
-                    i = 0
-                    while True:
-                        try:
-                            subname = winreg.EnumKey(key, i)
-                            i += 1
-                            yield hkey, parent_path, subname
-                        except OSError:
-                            break
-            except OSError:
-                continue
+    def _unique_dirs(dirs):
+        """去重（保持顺序）
+
+        不在此处检查目录是否存在：注册表中的目录可能位于断开的网络驱动器上，
+        存在性由随后带时间预算的扫描负责（目录不存在时第一次探测即返回）。
+        """
+        return dedupe_paths(dirs)
+    
+    @staticmethod
+    def _read_first_value(provider, key_specs, value_names):
+        """依次读取各键，返回每个键中第一个非空的值"""
+        results = []
+        for hive, subkey in key_specs:
+            values = provider.read_values(hive, subkey, value_names)
+            for name in value_names:
+                val = values.get(name, "")
+                if val.strip():
+                    results.append(val.strip().rstrip("\\/"))
+                    break
+        return results
     
     @staticmethod
     def _wps_install_roots_from_registry():
         """从注册表读取 WPS Office 安装根目录（用于解析 splash 路径）。"""
-        if sys.platform != "win32":
+        provider = get_registry_provider()
+        if provider is None:
             return []
-        import winreg
-        roots = []
-        key_specs = [
-            (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Kingsoft\Office\6.0\Common"),
-            (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\WOW6432Node\Kingsoft\Office\6.0\Common"),
-            (winreg.HKEY_CURRENT_USER, r"Software\Kingsoft\Office\6.0\Common"),
-        ]
-        for hkey, subkey in key_specs:
-            try:
-                with winreg.OpenKey(hkey, subkey, 0, winreg.KEY_READ) as k:
-                    for name in ("InstallRoot", "Path"):
-                        try:
-                            val, _ = winreg.QueryValueEx(k, name)
-                            if isinstance(val, str) and val.strip():
-                                roots.append(val.strip().rstrip("\\/"))
-                                break
-                        except OSError:
-                            continue
-            except OSError:
-                continue
-        
-        for hkey, parent_path, subname in PathDetector._enum_uninstall_subkeys():
-            try:
-                with winreg.OpenKey(hkey, f"{parent_path}\\{subname}", 0, winreg.KEY_READ) as k:
-                    try:
-                        display, _ = winreg.QueryValueEx(k, "DisplayName")
-                    except OSError:
-                        continue
-                    if not isinstance(display, str):
-                        continue
-                    dn = display.lower()
-                    if "wps" not in dn:
-                        continue
-                    if not ("office" in dn or "kingsoft" in dn or "金山" in dn):
-                        continue
-                    try:
-                        loc, _ = winreg.QueryValueEx(k, "InstallLocation")
-                        if isinstance(loc, str) and loc.strip():
-                            roots.append(loc.strip().rstrip("\\/"))
-                    except OSError:
-                        pass
-            except OSError:
-                continue
-        
-        out, seen = [], set()
-        for r in roots:
-            if not r or not os.path.exists(r):
-                continue
-            key = os.path.normcase(os.path.normpath(r))
-            if key not in seen:
-                seen.add(key)
-                out.append(r)
-        return out
+        roots = PathDetector._read_first_value(
+            provider,
+            [
+                (HKLM, r"SOFTWARE\Kingsoft\Office\6.0\Common"),
+                (HKLM, r"SOFTWARE\WOW6432Node\Kingsoft\Office\6.0\Common"),
+                (HKCU, r"Software\Kingsoft\Office\6.0\Common"),
+            ],
+            ("InstallRoot", "Path"),
+        )
+        
+        def _is_wps(dn):
+            return "wps" in dn and ("office" in dn or "kingsoft" in dn or "金山" in dn)
+        
+        # 卸载信息来自进程内共享的索引，不再重复枚举
+        roots.extend(get_uninstall_index().find_install_locations(_is_wps))
+        return PathDetector._unique_dirs(roots)
     
     @staticmethod
     def _seewo_install_bases_from_registry():
         """从注册表读取希沃白板 EasiNote5 相关安装目录。"""
-        if sys.platform != "win32":
+        provider = get_registry_provider()
+        if provider is None:
             return []
-        import winreg
-        bases = []
-        seewo_keys = [
-            (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Seewo\EasiNote5"),
-            (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\WOW6432Node\Seewo\EasiNote5"),
-            (winreg.HKEY_CURRENT_USER, r"Software\Seewo\EasiNote5"),
-        ]
-        for hkey, subkey in seewo_keys:
-            try:
-                with winreg.OpenKey(hkey, subkey, 0, winreg.KEY_READ) as k:
-                    for name in ("InstallPath", "Path", "InstallLocation", "InstallDir", "RootDir"):
-                        try:
-                            val, _ = winreg.QueryValueEx(k, name)
-                            if isinstance(val, str) and val.strip():
-                                bases.append(val.strip().rstrip("\\/"))
-                                break
-                        except OSError:
-                            continue
-            except OSError:
-                continue
-        
-        for hkey, parent_path, subname in PathDetector._enum_uninstall_subkeys():
-            try:
-                with winreg.OpenKey(hkey, f"{parent_path}\\{subname}", 0, winreg.KEY_READ) as k:
-                    try:
-                        display, _ = winreg.QueryValueEx(k, "DisplayName")
-                    except OSError:
-                        continue
-                    if not isinstance(display, str):
-                        continue
-                    dn = display.lower()
-                    if not (
-                        "easinote" in dn
-                        or "希沃白板" in dn
-                        or ("希沃" in dn and "白板" in dn)
-                        or ("seewo" in dn and "easi" in dn)
-                    ):
-                        continue
-                    try:
-                        loc, _ = winreg.QueryValueEx(k, "InstallLocation")
-                        if isinstance(loc, str) and loc.strip():
-                            bases.append(loc.strip().rstrip("\\/"))
-                    except OSError:
-                        pass
-            except OSError:
-                continue
+        bases = PathDetector._read_first_value(
+            provider,
+            [
+                (HKLM, r"SOFTWARE\Seewo\EasiNote5"),
+                (HKLM, r"SOFTWARE\WOW6432Node\Seewo\EasiNote5"),
+                (HKCU, r"Software\Seewo\EasiNote5"),
+            ],
+            ("InstallPath", "Path", "InstallLocation", "InstallDir", "RootDir"),
+        )
+        
+        def _is_easinote(dn):
+            return (
+                "easinote" in dn
+                or "希沃白板" in dn
+                or ("希沃" in dn and "白板" in dn)
+                or ("seewo" in dn and "easi" in dn)
+            )
         
-        out, seen = [], set()
-        for b in bases:
-            if not b or not os.path.exists(b):
-                continue
-            key = os.path.normcase(os.path.normpath(b))
-            if key not in seen:
-                seen.add(key)
-                out.append(b)
-        return out
+        # 卸载信息来自进程内共享的索引，不再重复枚举
+        bases.extend(get_uninstall_index().find_install_locations(_is_easinote))
+        return PathDetector._unique_dirs(bases)
     
     @staticmethod
-    def _collect_seewo_splash_from_install_bases(base_dirs):
-        """在给定的 EasiNote 安装目录下查找 SplashScreen.png。"""
-        paths = []
+    def _collect_seewo_splash_from_install_bases(base_dirs, cancel_token=None):
+        """在给定的 EasiNote 安装目录下查找 SplashScreen.png。
+
+        Returns:
+            list: [(布局类型, 路径)]，布局见 utils.splash_layouts.SEEWO_REGISTRY_LAYOUTS
+        """
+        matches = []
         for base_path in base_dirs:
-            if not base_path or not os.path.exists(base_path):
+            if not base_path:
                 continue
-            base_path = base_path.rstrip("\\/")
-            patterns = [
-                os.path.join(base_path, "EasiNote5*", "Main", "Assets", "SplashScreen.png"),
-                os.path.join(base_path, "EasiNote5_*", "Main", "Resources", "Startup", "SplashScreen.png"),
-            ]
-            for pattern in patterns:
-                paths.extend(glob.glob(pattern))
-            for direct in (
-                os.path.join(base_path, "Main", "Assets", "SplashScreen.png"),
-                os.path.join(base_path, "Main", "Resources", "Startup", "SplashScreen.png"),
-            ):
-                if os.path.exists(direct):
-                    paths.append(direct)
-        return paths
+            matches.extend(SEEWO_REGISTRY_TRIE.match(DirWalker(cancel_token), base_path.rstrip("\\/")))
+        return matches
+    
+    @staticmethod
+    def _scan_drive_seewo(drive_letter, cancel_token=None):
+        """一次遍历单个驱动器，同时匹配各用户的 Banner.png 与 Program Files 下的 SplashScreen.png
+
+        Returns:
+            list: [(布局类型, 路径)]，先 Banner，再 Program Files (x86)、Program Files
+        """
+        return SEEWO_DRIVE_TRIE.match(DirWalker(cancel_token), drive_path(drive_letter))
+    
+    @staticmethod
+    def _scan_drive_banner(drive_letter):
+        """扫描单个驱动器下各用户目录中的 Banner.png"""
+        return [path for _, path in SEEWO_BANNER_TRIE.match(DirWalker(), drive_path(drive_letter))]
     
     @staticmethod
     def detect_banner_paths():
-        """检测Banner.png路径（支持多驱动器）"""
-        paths = []
-        
-        # 遍历所有可用驱动器
-        for drive_letter in PathDetector._get_available_drives():
-            users_dir = f"{drive_letter}:\\Users"
-            
-            if not os.path.exists(users_dir):
-                continue
-            
-            try:
-                for user_folder in os.listdir(users_dir):
-                    user_dir = os.path.join(users_dir, user_folder)
-                    if not os.path.isdir(user_dir):
-                        continue
-                    
-                    banner_path = os.path.join(
-                        user_dir, 
-                        "AppData\\Roaming\\Seewo\\EasiNote5\\Resources\\Banner\\Banner.png"
-                    )
-                    if os.path.exists(banner_path):
-                        paths.append(banner_path)
-            except (PermissionError, OSError):
-                continue
-        
-        return paths
+        """检测Banner.png路径（支持多驱动器，各驱动器并发扫描）"""
+        return scan_roots(PathDetector._get_available_drives(), PathDetector._scan_drive_banner)
+    
+    @staticmethod
+    def _scan_drive_splashscreen(drive_letter):
+        """扫描单个驱动器 Program Files (x86) / Program Files 下的 SplashScreen.png"""
+        # 先 Program Files (x86)，再 Program Files，与原有顺序一致
+        return [path for _, path in SEEWO_SPLASHSCREEN_TRIE.match(DirWalker(), drive_path(drive_letter))]
     
     @staticmethod
     def detect_splashscreen_paths():
-        """检测SplashScreen.png路径（支持多驱动器）"""
-        paths = []
-        
-        # 遍历所有可用驱动器
-        for drive_letter in PathDetector._get_available_drives():
-            # 检测 Program Files (x86)
-            base_path_x86 = f"{drive_letter}:\\Program Files (x86)\\Seewo\\EasiNote5"
-            if os.path.exists(base_path_x86):
-                # 所有可能的路径组合
-                patterns = [
-                    # 旧版路径格式
-                    os.path.join(base_path_x86, "EasiNote5*", "Main", "Assets", "SplashScreen.png"),
-                    # 新版路径格式
-                    os.path.join(base_path_x86, "EasiNote5_*", "Main", "Resources", "Startup", "SplashScreen.png"),
-                ]
-                
-                for pattern in patterns:
-                    paths.extend(glob.glob(pattern))
-            
-            # 检测 Program Files
-            base_path = f"{drive_letter}:\\Program Files\\Seewo\\EasiNote5"
-            if os.path.exists(base_path):
-                # 所有可能的路径组合
-                patterns = [
-                    # 旧版路径格式
-                    os.path.join(base_path, "EasiNote5*", "Main", "Assets", "SplashScreen.png"),
-                    # 新版路径格式
-                    os.path.join(base_path, "EasiNote5_*", "Main", "Resources", "Startup", "SplashScreen.png"),
-                ]
-                
-                for pattern in patterns:
-                    paths.extend(glob.glob(pattern))
-        
-        return paths
+        """检测SplashScreen.png路径（支持多驱动器，各驱动器并发扫描）"""
+        return scan_roots(PathDetector._get_available_drives(), PathDetector._scan_drive_splashscreen)
     
     @staticmethod
-    def detect_all_paths():
-        """检测所有可能的路径（优先使用注册表中的安装目录解析 SplashScreen，其次为原有扫描逻辑）。"""
-        all_paths = []
+    def _iter_unique(sources, first_only, cancel_token, progress=None, session=None):
+        """依次遍历各来源，按路径去重后逐个产出 (布局类型, 路径)
+        
+        Args:
+            sources: 来源函数列表，每个函数接收 (CancelToken, ScanProgress, ScanSession)
+                并返回 (布局类型, 路径) 生成器
+            first_only: 为 True 时产出第一个路径后立即停止
+            cancel_token: 本次检测使用的 CancelToken
+            progress: 可选的 ScanProgress
+            session: 本次检测的 ScanSession，记录文件系统调用计数与被跳过的根目录
+        """
         seen = set()
+        try:
+            for source in sources:
+                results = source(cancel_token, progress, session)
+                try:
+                    for kind, path in results:
+                        if cancel_token.cancelled:
+                            return
+                        key = path_key(path)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        yield kind, path
+                        if first_only:
+                            return
+                finally:
+                    results.close()
+        finally:
+            # 检测结束或被提前停止时，让仍在运行的扫描线程尽快退出
+            cancel_token.cancel()
+    
+    @staticmethod
+    def _iter_seewo_registry_paths(cancel_token=None, progress=None, session=None):
+        """从注册表安装目录解析 SplashScreen.png"""
+        yield from iter_scan_roots(
+            PathDetector._seewo_install_bases_from_registry(),
+            lambda base_path: PathDetector._collect_seewo_splash_from_install_bases([base_path], cancel_token),
+            cancel_token,
+            progress,
+            session=session,
+        )
+    
+    @staticmethod
+    def _iter_seewo_drive_paths(cancel_token=None, progress=None, session=None):
+        """逐个驱动器遍历，匹配 Banner.png 与 SplashScreen.png
 
-        def _add(path):
-            if not path:
-                return
-            key = os.path.normcase(os.path.normpath(path))
-            if key not in seen:
-                seen.add(key)
-                all_paths.append(path)
+        每个驱动器只遍历一次，但产出顺序与分别扫描时一致：先产出所有驱动器的 Banner.png
+        （逐个驱动器完成后立即产出），再按驱动器顺序产出 SplashScreen.png。
+        """
+        results = iter_scan_roots(
+            PathDetector._get_available_drives(session),
+            lambda drive_letter: PathDetector._scan_drive_seewo(drive_letter, cancel_token),
+            cancel_token,
+            progress,
+            session=session,
+        )
+        splashscreens = []
+        try:
+            for kind, path in results:
+                if kind == SEEWO_BANNER:
+                    yield kind, path
+                else:
+                    splashscreens.append((kind, path))
+        finally:
+            results.close()
+        yield from splashscreens
+    
+    @staticmethod
+    def _paths_only(matches):
+        """把 (布局类型, 路径) 生成器转换为路径生成器，停止迭代时一并关闭来源"""
+        try:
+            for _, path in matches:
+                yield path
+        finally:
+            matches.close()
+    
+    @staticmethod
+    def iter_seewo_matches(first_only=False, cancel_token=None, progress=None, session=None):
+        """按优先级逐个产出希沃白板启动图片 (布局类型, 路径)（生成器）
+        
+        来源依次为：注册表安装目录 → 各驱动器（每个驱动器只遍历一次，先产出所有驱动器上
+        各用户的 Banner.png，再产出各驱动器 Program Files 下的 SplashScreen.png）。
+        布局类型为 utils.splash_layouts 中的 SEEWO_OLD / SEEWO_NEW / SEEWO_BANNER。
+        每个路径在确认存在后立即产出，调用方可以随时停止迭代。
+        
+        Args:
+            first_only: 为 True 时产出第一个路径后立即停止，并取消其余扫描
+            cancel_token: 可选的 CancelToken，取消后不再产出新的结果
+            progress: 可选的 ScanProgress，用于报告已扫描的根目录数与候选路径数
+            session: 可选的 ScanSession，本次检测的文件系统调用计数与被跳过的根目录记入其中
+                （每次检测使用各自的实例）
+        """
+        sources = [
+            PathDetector._iter_seewo_registry_paths,
+            PathDetector._iter_seewo_drive_paths,
+        ]
+        yield from PathDetector._iter_unique(
+            sources, first_only, CancelToken(parent=cancel_token), progress, session or ScanSession()
+        )
+    
+    @staticmethod
+    def iter_seewo_paths(first_only=False, cancel_token=None, progress=None, session=None):
+        """按优先级逐个产出希沃白板启动图片路径（生成器），参数同 iter_seewo_matches"""
+        yield from PathDetector._paths_only(
+            PathDetector.iter_seewo_matches(first_only, cancel_token, progress, session)
+        )
+    
+    @staticmethod
+    def detect_all_paths(session=None):
+        """检测所有可能的路径（优先使用注册表中的安装目录解析 SplashScreen，其次为原有扫描逻辑）。
 
-        if sys.platform == "win32":
-            for p in PathDetector._collect_seewo_splash_from_install_bases(
-                PathDetector._seewo_install_bases_from_registry()
-            ):
-                _add(p)
-        for p in PathDetector.detect_banner_paths():
-            _add(p)
-        for p in PathDetector.detect_splashscreen_paths():
-            _add(p)
-        return all_paths
+        各来源内部按驱动器并发扫描，结果按固定优先级合并：注册表 → 各驱动器（Banner → SplashScreen）。
+        传入 ScanSession 时，本次检测的文件系统调用计数与因响应过慢被跳过的根目录记入其中。
+        """
+        return list(PathDetector.iter_seewo_paths(session=session))
+    
+    @staticmethod
+    def iter_wps_matches(first_only=False, cancel_token=None, progress=None, session=None):
+        """按优先级逐个产出已验证的 WPS splash 目录 (布局类型, 路径)（生成器）
+        
+        来源依次为：注册表安装目录 → 当前用户目录 → 其他用户目录 → Program Files。
+        布局类型为 utils.splash_layouts 中的 WPS_USER / WPS_RESOURCE / WPS_RES。
+        每个目录在验证通过后立即产出，调用方可以随时停止迭代。
+        
+        Args:
+            first_only: 为 True 时产出第一个有效目录后立即停止，并取消其余扫描
+            cancel_token: 可选的 CancelToken，取消后不再产出新的结果
+            progress: 可选的 ScanProgress，用于报告已扫描的根目录数与候选路径数
+            session: 可选的 ScanSession，本次检测的文件系统调用计数与被跳过的根目录记入其中
+                （每次检测使用各自的实例）
+        """
+        sources = [
+            PathDetector._iter_wps_registry_paths,
+            PathDetector._iter_wps_user_paths,
+            PathDetector._iter_wps_program_files_paths,
+        ]
+        yield from PathDetector._iter_unique(
+            sources, first_only, CancelToken(parent=cancel_token), progress, session or ScanSession()
+        )
+    
+    @staticmethod
+    def iter_wps_paths(first_only=False, cancel_token=None, progress=None, session=None):
+        """按优先级逐个产出已验证的 WPS splash 目录（生成器），参数同 iter_wps_matches"""
+        yield from PathDetector._paths_only(
+            PathDetector.iter_wps_matches(first_only, cancel_token, progress, session)
+        )
     
     @staticmethod
-    def detect_wps_paths():
+    def detect_wps_paths(session=None):
         r"""检测WPS Office启动图片路径（splash目录结构）
         
         返回splash目录的路径，如果找到splash目录，则返回该目录路径
@@ -327,251 +344,140 @@ class PathDetector:
         3. Program Files (x86)：C:\Program Files (x86)\Kingsoft\WPS Office\office6\mui\[语言]\res\splash\
         
         优先从注册表（InstallRoot / 卸载项 InstallLocation）解析安装根目录并查找 splash；
-        若未找到则回退到原有的用户目录与盘符扫描逻辑。
-        """
-        splash_dirs = []
+        若未找到则回退到原有的用户目录与盘符扫描逻辑。找到第一个有效目录后即停止扫描。
         
-        if sys.platform == "win32":
-            splash_dirs.extend(
-                PathDetector._collect_wps_splash_from_base_dirs(PathDetector._wps_install_roots_from_registry())
-            )
-        splash_dirs.extend(PathDetector._detect_wps_user_paths())
-        splash_dirs.extend(PathDetector._detect_wps_program_files_paths())
-        
-        seen = set()
-        unique = []
-        for s in splash_dirs:
-            k = os.path.normcase(os.path.normpath(s))
-            if k not in seen:
-                seen.add(k)
-                unique.append(s)
-        if unique:
-            return [unique[0]]
-        return []
+        传入 ScanSession 时，本次检测的文件系统调用计数与因响应过慢被跳过的根目录记入其中。
+        """
+        return list(PathDetector.iter_wps_paths(first_only=True, session=session))
     
     @staticmethod
-    def _detect_wps_user_paths():
+    def _iter_wps_registry_paths(cancel_token=None, progress=None, session=None):
+        """从注册表安装根目录查找 splash 目录"""
+        yield from iter_scan_roots(
+            PathDetector._wps_install_roots_from_registry(),
+            lambda base_path: PathDetector._collect_wps_splash_from_base_dirs([base_path], cancel_token),
+            cancel_token,
+            progress,
+            session=session,
+        )
+    
+    @staticmethod
+    def _iter_wps_user_paths(cancel_token=None, progress=None, session=None):
         r"""检测用户目录下的WPS路径
         
         路径格式：C:\Users\[用户名]\AppData\Local\Kingsoft\WPS Office\[版本号]\office6\mui\[语言]\resource\splash\
         """
-        splash_dirs = []
+        # 优先检查当前用户目录
+        userprofile = os.environ.get("USERPROFILE", "")
+        if userprofile:
+            with scan_session(session):
+                current_user_splash = PathDetector._check_user_wps_path(userprofile, cancel_token)
+            if progress is not None:
+                progress.root_done(1 if current_user_splash else 0)
+            if current_user_splash:
+                # 如果找到当前用户的路径，不再检查其他用户（优先使用当前用户的）
+                yield WPS_USER, current_user_splash
+                return
         
         # 获取所有可能的用户目录
-        # 尝试常见的盘符（C、D、E等）
-        possible_drives = []
-        for drive_letter in "CDEFGHIJKLMNOPQRSTUVWXYZ":
-            users_path = f"{drive_letter}:\\Users"
-            if os.path.exists(users_path):
-                possible_drives.append(drive_letter)
+        # 并发探测常见的盘符（C、D、E等）
+        possible_drives = scan_roots(
+            DRIVE_LETTERS,
+            lambda letter: [letter] if path_exists(drive_path(letter, "Users")) else [],
+            session=session,
+        )
         
         # 如果没有找到Users目录，尝试使用环境变量
-        if not possible_drives:
-            userprofile = os.environ.get("USERPROFILE", "")
-            if userprofile:
-                # 从USERPROFILE提取盘符，如 C:\Users\Luminary -> C
-                drive = os.path.splitdrive(userprofile)[0]
-                if drive:
-                    possible_drives.append(drive[0])  # 提取盘符字母
+        if not possible_drives and userprofile:
+            # 从USERPROFILE提取盘符，如 C:\Users\Luminary -> C
+            drive = os.path.splitdrive(userprofile)[0]
+            if drive:
+                possible_drives.append(drive[0])  # 提取盘符字母
+        
+        def _list_user_dirs(drive_letter):
+            users_dir = drive_path(drive_letter, "Users")
+            # 跳过已经检查过的当前用户目录
+            return [
+                user_dir for user_dir in child_dirs(list_dir(users_dir))
+                if user_dir != userprofile
+            ]
         
-        # 优先检查当前用户目录
-        userprofile = os.environ.get("USERPROFILE", "")
-        if userprofile:
-            current_user_splash = PathDetector._check_user_wps_path(userprofile)
-            if current_user_splash:
-                splash_dirs.append(current_user_splash)
-                # 如果找到当前用户的路径，直接返回（优先使用当前用户的）
-                return splash_dirs
-        
-        # 遍历所有可能的用户目录（检查其他用户）
-        for drive_letter in possible_drives:
-            users_dir = f"{drive_letter}:\\Users"
-            if not os.path.exists(users_dir):
-                continue
-            
-            # 遍历所有用户目录
-            try:
-                for user_name in os.listdir(users_dir):
-                    user_dir = os.path.join(users_dir, user_name)
-                    if not os.path.isdir(user_dir):
-                        continue
-                    
-                    # 跳过已经检查过的当前用户目录
-                    if user_dir == userprofile:
-                        continue
-                    
-                    user_splash = PathDetector._check_user_wps_path(user_dir)
-                    if user_splash:
-                        splash_dirs.append(user_splash)
-            except (PermissionError, OSError):
-                continue
+        def _check_user(user_dir):
+            user_splash = PathDetector._check_user_wps_path(user_dir, cancel_token)
+            return [(WPS_USER, user_splash)] if user_splash else []
         
-        return splash_dirs
+        # 遍历所有可能的用户目录（检查其他用户），各用户目录并发检查
+        user_dirs = scan_roots(possible_drives, _list_user_dirs, session=session)
+        yield from iter_scan_roots(user_dirs, _check_user, cancel_token, progress, session=session)
     
     @staticmethod
-    def _check_user_wps_path(user_dir):
+    def _check_user_wps_path(user_dir, cancel_token=None):
         r"""检查指定用户目录下的WPS路径
         
+        按 utils.splash_layouts.WPS_USER_LAYOUTS 一次遍历：只列举 WPS Office 与 mui 两级
+        含通配符的目录，其余固定名称的层级合并为一次 stat。
+        
         Args:
             user_dir: 用户目录路径，如 C:\Users\Luminary
+            cancel_token: 可选的 CancelToken，取消后立即停止遍历
             
         Returns:
             str: 找到的splash目录路径，如果未找到则返回None
         """
-        # 构建WPS路径
-        wps_base = os.path.join(user_dir, "AppData", "Local", "Kingsoft", "WPS Office")
-        if not os.path.exists(wps_base):
-            return None
-        
-        # 查找所有版本号目录
-        try:
-            for version_dir in os.listdir(wps_base):
-                version_path = os.path.join(wps_base, version_dir)
-                if not os.path.isdir(version_path):
-                    continue
-                
-                # 检查office6目录
-                office6_path = os.path.join(version_path, "office6")
-                if not os.path.exists(office6_path):
-                    continue
-                
-                # 检查mui目录
-                mui_path = os.path.join(office6_path, "mui")
-                if not os.path.exists(mui_path):
-                    continue
-                
-                # 遍历所有语言目录
-                try:
-                    for lang_dir in os.listdir(mui_path):
-                        lang_path = os.path.join(mui_path, lang_dir)
-                        if not os.path.isdir(lang_path):
-                            continue
-                        
-                        # 检查resource目录（注意是resource不是res）
-                        resource_path = os.path.join(lang_path, "resource")
-                        if not os.path.exists(resource_path):
-                            continue
-                        
-                        # 检查splash目录
-                        splash_dir = os.path.join(resource_path, "splash")
-                        if os.path.isdir(splash_dir):
-                            # 验证splash目录是否包含必要的文件
-                            if PathDetector._validate_wps_splash_dir(splash_dir):
-                                return splash_dir
-                except (PermissionError, OSError):
-                    continue
-        except (PermissionError, OSError):
-            pass
+        # 检查 [版本号]\office6\mui\[语言]\resource\splash（注意是resource不是res）
+        for _, splash_dir in WPS_USER_TRIE.match(DirWalker(cancel_token), user_dir):
+            # 验证splash目录是否包含必要的文件
+            if PathDetector._validate_wps_splash_dir(splash_dir):
+                return splash_dir
         
         return None
     
     @staticmethod
-    def _detect_wps_program_files_paths():
+    def _iter_wps_program_files_paths(cancel_token=None, progress=None, session=None):
         r"""检测Program Files下的WPS路径
         
         路径格式：C:\Program Files\Kingsoft\WPS Office\office6\mui\[语言]\res\splash\
         或：C:\Program Files\Kingsoft\WPS Office\office6\mui\[语言]\resource\splash\
         """
-        possible_base_paths = [
-            "C:\\Program Files\\Kingsoft\\WPS Office",
-            "C:\\Program Files (x86)\\Kingsoft\\WPS Office",
-            "C:\\Program Files\\WPS Office",
-            "C:\\Program Files (x86)\\WPS Office",
-        ]
-        
-        for drive_letter in "CDEFGHIJKLMNOPQRSTUVWXYZ":
-            possible_base_paths.extend([
-                f"{drive_letter}:\\Program Files\\Kingsoft\\WPS Office",
-                f"{drive_letter}:\\Program Files (x86)\\Kingsoft\\WPS Office",
-                f"{drive_letter}:\\Program Files\\WPS Office",
-                f"{drive_letter}:\\Program Files (x86)\\WPS Office",
-            ])
+        def _scan_drive(drive_letter):
+            # 四个安装根目录（Kingsoft\WPS Office、WPS Office × 两个 Program Files）
+            # 编译在同一棵前缀树中，每个驱动器只遍历一次
+            return [
+                (kind, splash_dir)
+                for kind, splash_dir in WPS_DRIVE_TRIE.match(DirWalker(cancel_token), drive_path(drive_letter))
+                if PathDetector._validate_wps_splash_dir(splash_dir)
+            ]
         
-        return PathDetector._collect_wps_splash_from_base_dirs(possible_base_paths)
+        # 每个驱动器在线程池中独立扫描，结果按盘符顺序产出
+        yield from iter_scan_roots(DRIVE_LETTERS, _scan_drive, cancel_token, progress, session=session)
     
     @staticmethod
     def _validate_wps_splash_dir(splash_dir):
         """验证WPS splash目录是否包含必要的启动图文件
         
+        只列举 splash 目录与其 hdpi 子目录各一次，从列举结果中校验文件是否齐全。
+        
         Args:
             splash_dir: splash目录路径
             
         Returns:
             bool: 如果目录包含必要的文件则返回True
         """
-        required_files = [
-            "splash_default_bg.png",
-            "splash_sup_default_bg.png",
-            "splash_wps365_default_bg.png",
-        ]
-        
-        hdpi_required_files = [
-            "hdpi/splash_default_bg.png",
-            "hdpi/splash_sup_default_bg.png",
-            "hdpi/splash_wps365_default_bg.png",
-        ]
-        
-        # 检查根目录下的文件
-        for filename in required_files:
-            file_path = os.path.join(splash_dir, filename)
-            if not os.path.exists(file_path):
-                return False
-        
-        # 检查hdpi目录下的文件
-        hdpi_dir = os.path.join(splash_dir, "hdpi")
-        if os.path.isdir(hdpi_dir):
-            for filename in hdpi_required_files:
-                file_path = os.path.join(splash_dir, filename)
-                if not os.path.exists(file_path):
-                    return False
-        else:
-            # 如果hdpi目录不存在，也认为无效
-            return False
-        
-        return True
+        return SplashDirSnapshot.capture(splash_dir, with_stats=False).valid
     
     @staticmethod
     def get_wps_splash_files(splash_dir):
         """获取WPS splash目录下的所有启动图文件路径
         
+        需要同时使用文件列表与有效性、大小等信息时，请直接使用 SplashDirSnapshot。
+        
         Args:
             splash_dir: splash目录路径
             
         Returns:
-            list: 包含6个文件路径的列表
+            list: 包含6个文件路径的列表（先根目录，再 hdpi 目录，只包含存在的文件）
         """
-        if not splash_dir or not os.path.exists(splash_dir):
-            return []
-        
-        files = []
-        
-        # 根目录下的3个文件
-        root_files = [
-            "splash_default_bg.png",
-            "splash_sup_default_bg.png",
-            "splash_wps365_default_bg.png",
-        ]
-        
-        # hdpi目录下的3个文件
-        hdpi_files = [
-            "hdpi/splash_default_bg.png",
-            "hdpi/splash_sup_default_bg.png",
-            "hdpi/splash_wps365_default_bg.png",
-        ]
-        
-        # 添加根目录文件
-        for filename in root_files:
-            file_path = os.path.join(splash_dir, filename)
-            if os.path.exists(file_path):
-                files.append(file_path)
-        
-        # 添加hdpi目录文件
-        for filename in hdpi_files:
-            file_path = os.path.join(splash_dir, filename)
-            if os.path.exists(file_path):
-                files.append(file_path)
-        
-        return files
+        return SplashDirSnapshot.capture(splash_dir, with_stats=False).paths
     
     @staticmethod
     def manual_select_target_image(parent=None, app_type="seewo"):
@@ -585,6 +491,10 @@ class PathDetector:
         Returns:
             str: 选中的图片路径,如果取消则返回空字符串
         """
+        # 界面依赖在此处导入，检测逻辑本身不依赖 Qt（可在无界面环境下测试与基准测量）
+        from qfluentwidgets import MessageBox
+        from PyQt6.QtWidgets import QFileDialog
+        
         if app_type == "wps":
             content = (
                 "无法自动检测到WPS Office的启动图片目录。\n\n"
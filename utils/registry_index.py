@@ -0,0 +1,225 @@
+r"""注册表卸载信息索引 - 一次枚举，供希沃白板与 WPS 检测共用
+
+卸载信息位于以下三个位置：
+    HKLM\SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall
+    HKLM\SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall
+    HKCU\SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall
+
+每个子键都需要打开一次才能读取 DisplayName，因此整个进程只枚举一遍，
+建立 DisplayName → InstallLocation 的内存索引后重复使用。
+注册表访问通过 RegistryProvider 接口完成，非 Windows 平台可以注入
+FakeRegistryProvider 进行测试与基准测量。
+"""
+
+import sys
+import threading
+from abc import ABC, abstractmethod
+
+
+HKLM = "HKLM"
+HKCU = "HKCU"
+
+UNINSTALL_ROOTS = (
+    (HKLM, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+    (HKLM, r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
+    (HKCU, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+)
+
+
+class RegistryProvider(ABC):
+    """注册表访问接口"""
+
+    @abstractmethod
+    def enum_subkeys(self, hive, path):
+        """枚举子键名称
+
+        Args:
+            hive: 根键，HKLM 或 HKCU
+            path: 键路径
+
+        Returns:
+            list: 子键名称列表，键不存在时返回空列表
+        """
+
+    @abstractmethod
+    def read_values(self, hive, path, names):
+        """读取键下的若干字符串值
+
+        Args:
+            hive: 根键，HKLM 或 HKCU
+            path: 键路径
+            names: 值名称列表
+
+        Returns:
+            dict: {值名称: 值}，只包含存在且为字符串的值；键不存在时返回空字典
+        """
+
+
+class WinRegistryProvider(RegistryProvider):
+    """基于 winreg 的真实注册表访问（仅 Windows）"""
+
+    def __init__(self):
+        import winreg
+        self._winreg = winreg
+        self._hives = {
+            HKLM: winreg.HKEY_LOCAL_MACHINE,
+            HKCU: winreg.HKEY_CURRENT_USER,
+        }
+
+    def enum_subkeys(self, hive, path):
+        winreg = self._winreg
+        names = []
+        try:
+            with winreg.OpenKey(self._hives[hive], path, 0, winreg.KEY_READ) as key:
+                i = 0
+                while True:
+                    try:
+                        names.append(winreg.EnumKey(key, i))
+                        i += 1
+                    except OSError:
+                        break
+        except OSError:
+            pass
+        return names
+
+    def read_values(self, hive, path, names):
+        winreg = self._winreg
+        values = {}
+        try:
+            with winreg.OpenKey(self._hives[hive], path, 0, winreg.KEY_READ) as key:
+                for name in names:
+                    try:
+                        value, _ = winreg.QueryValueEx(key, name)
+                    except OSError:
+                        continue
+                    if isinstance(value, str):
+                        values[name] = value
+        except OSError:
+            pass
+        return values
+
+
+class FakeRegistryProvider(RegistryProvider):
+    """内存注册表 - 用于在任意平台上测试与基准测量注册表相关的检测逻辑"""
+
+    def __init__(self):
+        self._values = {}  # {(hive, 规范化路径): {值名称: 值}}
+        self._children = {}  # {(hive, 规范化路径): [子键名称]}
+        self.open_count = 0  # 打开键的次数（对应真实注册表的 OpenKey 调用）
+
+    @staticmethod
+    def _key(hive, path):
+        return hive, path.strip("\\").lower()
+
+    def _ensure_key(self, hive, path):
+        parts = path.strip("\\").split("\\")
+        for i in range(1, len(parts) + 1):
+            key = self._key(hive, "\\".join(parts[:i]))
+            if key in self._values:
+                continue
+            self._values[key] = {}
+            self._children.setdefault(key, [])
+            if i > 1:
+                parent = self._key(hive, "\\".join(parts[:i - 1]))
+                self._children[parent].append(parts[i - 1])
+        return self._key(hive, path)
+
+    def set_value(self, hive, path, name, value):
+        """写入一个值（自动创建所需的键）"""
+        self._values[self._ensure_key(hive, path)][name] = value
+
+    def add_uninstall_entry(self, subkey, display_name, install_location="", root=UNINSTALL_ROOTS[0]):
+        """添加一条卸载信息"""
+        hive, parent_path = root
+        path = f"{parent_path}\\{subkey}"
+        self.set_value(hive, path, "DisplayName", display_name)
+        if install_location:
+            self.set_value(hive, path, "InstallLocation", install_location)
+
+    def enum_subkeys(self, hive, path):
+        self.open_count += 1
+        return list(self._children.get(self._key(hive, path), []))
+
+    def read_values(self, hive, path, names):
+        self.open_count += 1
+        stored = self._values.get(self._key(hive, path), {})
+        return {
+            name: stored[name] for name in names
+            if isinstance(stored.get(name), str)
+        }
+
+
+class UninstallIndex:
+    """卸载信息索引：[(DisplayName, InstallLocation)]"""
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    @classmethod
+    def build(cls, provider):
+        """一次枚举全部卸载信息并建立索引"""
+        entries = []
+        if provider is None:
+            return cls(entries)
+        for hive, parent_path in UNINSTALL_ROOTS:
+            for subname in provider.enum_subkeys(hive, parent_path):
+                values = provider.read_values(
+                    hive, f"{parent_path}\\{subname}", ("DisplayName", "InstallLocation")
+                )
+                display = values.get("DisplayName")
+                if not display:
+                    continue
+                entries.append((display, values.get("InstallLocation", "")))
+        return cls(entries)
+
+    def find_install_locations(self, predicate):
+        """按 DisplayName 筛选安装目录
+
+        Args:
+            predicate: 接收小写 DisplayName，返回是否匹配
+
+        Returns:
+            list: 匹配条目中非空的 InstallLocation（已去除首尾空白与末尾分隔符）
+        """
+        locations = []
+        for display, location in self.entries:
+            if not location or not location.strip():
+                continue
+            if predicate(display.lower()):
+                locations.append(location.strip().rstrip("\\/"))
+        return locations
+
+
+_lock = threading.Lock()
+_provider = None
+_provider_initialized = False
+_index = None
+
+
+def get_registry_provider():
+    """获取当前注册表访问实现（非 Windows 且未注入时返回 None）"""
+    global _provider, _provider_initialized
+    with _lock:
+        if not _provider_initialized:
+            _provider = WinRegistryProvider() if sys.platform == "win32" else None
+            _provider_initialized = True
+        return _provider
+
+
+def set_registry_provider(provider):
+    """注入注册表访问实现（如 FakeRegistryProvider），并清空已建立的索引"""
+    global _provider, _provider_initialized, _index
+    with _lock:
+        _provider = provider
+        _provider_initialized = True
+        _index = None
+
+
+def get_uninstall_index():
+    """获取卸载信息索引（进程内只建立一次）"""
+    global _index
+    provider = get_registry_provider()
+    with _lock:
+        if _index is None:
+            _index = UninstallIndex.build(provider)
+        return _index
@@ -0,0 +1,568 @@
+"""路径检测引擎 - 在有界线程池上并发扫描各驱动器 / 安装根目录"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+
+# 并发扫描的最大线程数（扫描以阻塞 IO 为主，慢速 U 盘 / 网络驱动器不会拖住其他根目录）
+MAX_SCAN_WORKERS = 8
+
+# 单次文件系统调用（根目录探测、一次目录列举）的时间预算（秒）：
+# 某次调用超出预算仍未返回时跳过该根目录，并将其标记为慢速；遍历整棵目录树的总耗时不受限制
+ROOT_TIME_BUDGET = 3.0
+
+# 慢速根目录的隔离时长（秒）：隔离期内的检测直接跳过，不再等待
+SLOW_ROOT_TTL = 10 * 60
+
+# 检测扫描的盘符
+DRIVE_LETTERS = "CDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# 替代文件系统根目录：设置后盘符 X 映射为 <root>/X，用于在非 Windows 环境下测试与基准测量
+_fs_root = None
+
+
+def set_fs_root(root):
+    """设置替代文件系统根目录（传入 None 恢复使用真实盘符）"""
+    global _fs_root
+    _fs_root = root
+
+
+def drive_path(drive_letter, *parts):
+    """构造盘符下的路径
+
+    drive_path("C", "Users") 在 Windows 上返回 C:\\Users；
+    设置了替代根目录时返回 <root>/C/Users。
+    """
+    if _fs_root:
+        return os.path.join(_fs_root, drive_letter, *parts)
+    return os.path.join(f"{drive_letter}:\\", *parts)
+
+
+def root_key(root):
+    """返回根目录的隔离键：盘符统一为大写字母，路径使用规范化路径"""
+    if len(root) == 1 and root.isalpha():
+        return root.upper()
+    return path_key(root)
+
+
+def root_volume(root):
+    """返回路径所在卷的隔离键（盘符），无法确定时返回 None
+
+    例如 Z:\\Program Files\\WPS Office 返回 "Z"；设置了替代根目录时，<root>/Z/... 同样返回 "Z"。
+    """
+    if len(root) == 1 and root.isalpha():
+        return root.upper()
+    if _fs_root:
+        rel = os.path.relpath(os.path.abspath(root), os.path.abspath(_fs_root))
+        first = rel.split(os.sep, 1)[0]
+        if len(first) == 1 and first.isalpha():
+            return first.upper()
+        return None
+    drive = os.path.splitdrive(root)[0]
+    if len(drive) == 2 and drive[1] == ":":
+        return drive[0].upper()
+    return None
+
+
+def describe_root(root):
+    """返回用于界面展示的根目录名称（盘符显示为 Z:\\）"""
+    if len(root) == 1 and root.isalpha():
+        return f"{root.upper()}:\\"
+    return root
+
+
+class ScanStats:
+    """文件系统调用计数器（线程安全）
+
+    scandir: 目录列举次数（每次列举对应一次 scandir 调用）
+    stat: 单路径探测次数（exists / isdir 等）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {"scandir": 0, "stat": 0}
+
+    def reset(self):
+        """清零所有计数"""
+        with self._lock:
+            for name in self._counts:
+                self._counts[name] = 0
+
+    def add(self, name, count=1):
+        """累加指定计数"""
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + count
+
+    def snapshot(self):
+        """返回当前计数的副本（附带总数 total）"""
+        with self._lock:
+            counts = dict(self._counts)
+        counts["total"] = sum(counts.values())
+        return counts
+
+
+class CancelToken:
+    """取消令牌 - 检测过程中调用 cancel() 即可让剩余扫描尽快结束
+
+    可以指定 parent：父令牌被取消时，子令牌也视为已取消（子令牌取消不影响父令牌）。
+    """
+
+    def __init__(self, parent=None):
+        self._event = threading.Event()
+        self._parent = parent
+
+    def cancel(self):
+        """请求取消"""
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        """是否已请求取消"""
+        if self._event.is_set():
+            return True
+        return self._parent is not None and self._parent.cancelled
+
+
+class RootQuarantine:
+    """慢速根目录隔离表（线程安全）
+
+    扫描超出时间预算的根目录会被记录一段时间（默认 SLOW_ROOT_TTL），期间的检测直接跳过。
+    盘符被隔离时，位于该盘符下的路径（如注册表中的安装目录）也一并跳过。
+    """
+
+    def __init__(self, ttl=SLOW_ROOT_TTL):
+        self._lock = threading.Lock()
+        self._ttl = ttl
+        self._until = {}  # {隔离键: 到期时间戳}
+
+    def _active(self, key, now):
+        until = self._until.get(key)
+        if until is None:
+            return False
+        if until <= now:
+            del self._until[key]
+            return False
+        return True
+
+    def is_quarantined(self, root):
+        """根目录（或其所在盘符）是否处于隔离期"""
+        now = time.time()
+        volume = root_volume(root)
+        with self._lock:
+            if self._active(root_key(root), now):
+                return True
+            return volume is not None and self._active(volume, now)
+
+    def mark_slow(self, root):
+        """将根目录标记为慢速"""
+        with self._lock:
+            self._until[root_key(root)] = time.time() + self._ttl
+
+    def snapshot(self):
+        """返回仍在隔离期内的记录 {隔离键: 到期时间戳}，用于持久化"""
+        now = time.time()
+        with self._lock:
+            return {key: until for key, until in self._until.items() if until > now}
+
+    def restore(self, data):
+        """合并持久化的隔离记录（已过期的记录会被忽略）"""
+        now = time.time()
+        with self._lock:
+            for key, until in (data or {}).items():
+                if isinstance(until, (int, float)) and until > now:
+                    self._until[key] = max(until, self._until.get(key, 0))
+
+    def clear(self):
+        """清空全部隔离记录"""
+        with self._lock:
+            self._until.clear()
+
+
+class SkippedRoots:
+    """一次检测中被跳过的根目录（线程安全）
+
+    reason 为 "slow"（本次扫描超出时间预算）或 "quarantined"（之前被标记为慢速，仍在隔离期）。
+    """
+
+    SLOW = "slow"
+    QUARANTINED = "quarantined"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = []
+
+    def reset(self):
+        with self._lock:
+            self._items = []
+
+    def add(self, root, reason):
+        with self._lock:
+            self._items.append((root, reason))
+
+    def snapshot(self):
+        """返回 [(根目录, 原因)] 的副本"""
+        with self._lock:
+            return list(self._items)
+
+
+class ScanProgress:
+    """检测进度 - 已扫描完成的根目录数与已找到的候选路径数
+
+    callback(roots_scanned, candidates) 会在扫描线程中被调用，调用方需自行保证线程安全
+    （如通过 Qt 信号转发到界面线程）。
+    """
+
+    def __init__(self, callback=None):
+        self._lock = threading.Lock()
+        self._callback = callback
+        self.roots_scanned = 0
+        self.candidates = 0
+
+    def root_done(self, found_count):
+        """记录一个根目录扫描完成"""
+        with self._lock:
+            self.roots_scanned += 1
+            self.candidates += found_count
+            # 在锁内回调，保证进度按递增顺序送达
+            if self._callback is not None:
+                self._callback(self.roots_scanned, self.candidates)
+
+
+class ScanSession:
+    """一次检测的计数范围：文件系统调用计数（stats）与被跳过的根目录（skipped）
+
+    每次检测创建各自的实例并传给 iter_scan_roots / scan_roots，首页与 WPS 页在不同线程中
+    同时检测时互不干扰。扫描线程通过 scan_session() 激活实例，其中的 path_exists、
+    list_dir 等调用计入该实例；没有激活的实例时不计数。
+    """
+
+    def __init__(self):
+        self.stats = ScanStats()
+        self.skipped = SkippedRoots()
+
+
+# 慢速根目录的隔离记录在进程内共享（并持久化到检测缓存中）
+root_quarantine = RootQuarantine()
+
+# 当前线程（上下文）中激活的计数范围
+_current_session = ContextVar("scan_session", default=None)
+
+# 当前扫描线程正在进行的文件系统调用（见 _CallWatch）
+_current_watch = ContextVar("scan_watch", default=None)
+
+
+class _CallWatch:
+    """记录扫描线程中正在进行的文件系统调用的开始时间（没有进行中的调用时为 None）
+
+    iter_scan_roots 只用它判断单次调用是否超出时间预算，遍历目录树的总耗时不计入。
+    """
+
+    __slots__ = ("since",)
+
+    def __init__(self):
+        self.since = None
+
+
+def _watched(func, *args):
+    """执行一次可能阻塞的文件系统调用，并在扫描线程的 _CallWatch 中记录开始时间"""
+    watch = _current_watch.get()
+    if watch is None:
+        return func(*args)
+    watch.since = time.monotonic()
+    try:
+        return func(*args)
+    finally:
+        watch.since = None
+
+
+def current_session():
+    """当前线程中激活的 ScanSession，没有时返回 None"""
+    return _current_session.get()
+
+
+@contextmanager
+def scan_session(session):
+    """在当前线程中激活计数范围（退出时恢复之前的范围）
+
+    只用于同步调用：不要在生成器中跨 yield 保持激活。
+
+    Args:
+        session: ScanSession，为 None 时在此范围内不计数
+    """
+    token = _current_session.set(session)
+    try:
+        yield session
+    finally:
+        _current_session.reset(token)
+
+
+def _count(name):
+    session = _current_session.get()
+    if session is not None:
+        session.stats.add(name)
+
+
+def path_exists(path):
+    """计数版 os.path.exists"""
+    _count("stat")
+    return _watched(os.path.exists, path)
+
+
+def is_dir(path):
+    """计数版 os.path.isdir"""
+    _count("stat")
+    return _watched(os.path.isdir, path)
+
+
+def stat_path(path):
+    """计数版 os.stat，路径不存在或无权限时返回 None"""
+    _count("stat")
+    try:
+        return _watched(os.stat, path)
+    except OSError:
+        return None
+
+
+def list_dir(path):
+    """一次 scandir 列出目录项
+
+    Returns:
+        dict: {规范化名称: DirEntry}，目录不存在或无权限时返回空字典。
+        DirEntry 自带类型信息，后续 is_dir() / is_file() 不再产生额外的系统调用。
+    """
+    _count("scandir")
+    try:
+        return _watched(_scandir, path)
+    except OSError:
+        return {}
+
+
+def _scandir(path):
+    with os.scandir(path) as it:
+        return {os.path.normcase(entry.name): entry for entry in it}
+
+
+def _entry_is_dir(entry):
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+def child_dirs(entries, name="*"):
+    """从目录列举结果中取子目录
+
+    Args:
+        entries: list_dir 的返回值
+        name: 子目录名（忽略大小写），"*" 表示全部子目录
+
+    Returns:
+        list: 匹配的子目录完整路径
+    """
+    if name == "*":
+        return [entry.path for entry in entries.values() if _entry_is_dir(entry)]
+    entry = entries.get(os.path.normcase(name))
+    if entry is not None and _entry_is_dir(entry):
+        return [entry.path]
+    return []
+
+
+class DirWalker:
+    """基于 scandir 的目录遍历器
+
+    同一次遍历中每个目录只列举一次（结果缓存在 walker 内），多个模式共享的
+    前缀目录（如 office6、office6\\mui）不会被重复列举。
+    每个线程（每个扫描根目录）使用各自的 walker 实例。
+    传入 cancel_token 后，取消时后续列举直接返回空结果，遍历随即结束。
+    """
+
+    def __init__(self, cancel_token=None):
+        self._listings = {}
+        self._cancel_token = cancel_token
+
+    def entries(self, path):
+        """获取目录项（带缓存）"""
+        if self._cancel_token is not None and self._cancel_token.cancelled:
+            return {}
+        key = os.path.normcase(path)
+        if key not in self._listings:
+            self._listings[key] = list_dir(path)
+        return self._listings[key]
+
+    def stat(self, path):
+        """单路径探测（取消后直接返回 None）"""
+        if self._cancel_token is not None and self._cancel_token.cancelled:
+            return None
+        return stat_path(path)
+
+
+def path_key(path):
+    """返回用于去重比较的规范化路径键"""
+    return os.path.normcase(os.path.normpath(path))
+
+
+def dedupe_paths(paths):
+    """按首次出现顺序去重路径列表（忽略大小写与分隔符差异）"""
+    seen = set()
+    unique = []
+    for path in paths:
+        if not path:
+            continue
+        key = path_key(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+
+def _safe_scan(scan_func):
+    """包装扫描函数：单个根目录出错时返回空列表，不影响其他根目录"""
+    def wrapper(root):
+        try:
+            return scan_func(root) or []
+        except (PermissionError, OSError):
+            return []
+    return wrapper
+
+
+class _DaemonWorkers:
+    """在守护线程上依次执行任务 [(Future, 函数, 参数)]，结果写入对应的 Future
+
+    守护线程不会在解释器退出时被等待：卡在断开的网络驱动器上的扫描不会阻塞程序退出。
+    尚未开始的任务可以通过 Future.cancel() 取消。
+    放弃等待某个任务时调用 add_worker() 补充一个线程，卡住的线程不会让排在后面的任务无法开始。
+    """
+
+    def __init__(self, jobs, max_workers, name):
+        self._queue = deque(jobs)
+        self._name = name
+        self._started = 0
+        for _ in range(max_workers):
+            self.add_worker()
+
+    def _work(self):
+        while True:
+            try:
+                future, func, args = self._queue.popleft()
+            except IndexError:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def add_worker(self):
+        """补充一个工作线程（队列已空时立即结束）"""
+        if not self._queue:
+            return
+        threading.Thread(target=self._work, name=f"{self._name}-{self._started}", daemon=True).start()
+        self._started += 1
+
+
+def scan_roots(roots, scan_func, max_workers=MAX_SCAN_WORKERS, time_budget=ROOT_TIME_BUDGET, session=None):
+    """并发扫描多个根目录，并按 roots 的原始顺序合并结果
+
+    Args:
+        roots: 根目录（或盘符）列表，列表顺序即结果的优先级顺序
+        scan_func: 扫描单个根目录的函数，返回该根目录下找到的路径列表
+        max_workers: 线程池大小上限
+        time_budget: 单次文件系统调用的时间预算（秒），None 表示不限制
+        session: 本次检测的 ScanSession（见 iter_scan_roots）
+
+    Returns:
+        list: 按优先级顺序合并后的结果列表（未去重）
+    """
+    return list(iter_scan_roots(roots, scan_func, max_workers=max_workers, time_budget=time_budget, session=session))
+
+
+def iter_scan_roots(roots, scan_func, cancel_token=None, progress=None, max_workers=MAX_SCAN_WORKERS,
+                    time_budget=ROOT_TIME_BUDGET, session=None):
+    """并发扫描多个根目录，按 roots 顺序逐个产出结果（生成器）
+
+    所有根目录同时提交到线程池，但结果严格按 roots 的顺序产出：前一个根目录
+    扫描完成后，其结果立即交给调用方，无需等待其余根目录。
+    调用方停止迭代（关闭生成器）或取消令牌后，尚未开始的扫描会被取消。
+
+    扫描根目录时，某一次文件系统调用（根目录探测、一次目录列举或 stat）超过 time_budget
+    仍未返回（如断开的网络驱动器、休眠的移动硬盘），就放弃等待该根目录的结果，
+    记入 session.skipped 并在 root_quarantine 中隔离一段时间；处于隔离期的根目录不再提交扫描。
+    只计算单次调用的耗时，较大的目录树遍历时间再长也不会被当作慢速根目录。
+    扫描在守护线程上进行，被放弃的线程不会阻塞程序退出；每放弃一个根目录就补充一个线程，
+    即使卡住的根目录多于 max_workers，排在后面的根目录也会开始扫描。
+
+    Args:
+        roots: 根目录（或盘符）列表，列表顺序即产出顺序
+        scan_func: 扫描单个根目录的函数，返回该根目录下找到的路径列表
+        cancel_token: 可选的 CancelToken
+        progress: 可选的 ScanProgress，每个根目录扫描完成时更新
+        max_workers: 线程池大小上限
+        time_budget: 单次文件系统调用的时间预算（秒），None 表示不限制
+        session: 本次检测的 ScanSession，扫描线程中的文件系统调用与被跳过的根目录记入其中；
+            为 None 时使用调用线程中激活的范围（见 scan_session），没有时不记录
+    """
+    if session is None:
+        session = current_session()
+    pending = []
+    for root in roots:
+        if root_quarantine.is_quarantined(root):
+            if session is not None:
+                session.skipped.add(root, SkippedRoots.QUARANTINED)
+        else:
+            pending.append(root)
+    roots = pending
+    if not roots:
+        return
+
+    safe_scan = _safe_scan(scan_func)
+    watches = [_CallWatch() for _ in roots]
+
+    def scan(index, root):
+        token = _current_watch.set(watches[index])
+        try:
+            with scan_session(session):
+                found = safe_scan(root)
+        finally:
+            _current_watch.reset(token)
+        if progress is not None:
+            progress.root_done(len(found))
+        return found
+
+    futures = [Future() for _ in roots]
+    workers = _DaemonWorkers(
+        [(future, scan, (index, root)) for index, (future, root) in enumerate(zip(futures, roots))],
+        min(max_workers, len(roots)),
+        "path-scan",
+    )
+    try:
+        for index, future in enumerate(futures):
+            found = None
+            while True:
+                if cancel_token is not None and cancel_token.cancelled:
+                    return
+                try:
+                    found = future.result(timeout=0.1)
+                    break
+                except FutureTimeoutError:
+                    since = watches[index].since
+                    if time_budget is not None and since is not None and time.monotonic() - since > time_budget:
+                        # 单次调用超出预算：不再等待该根目录，线程结束后其结果被丢弃；
+                        # 卡住的线程由新线程代替，排队的根目录按顺序开始扫描
+                        workers.add_worker()
+                        root_quarantine.mark_slow(roots[index])
+                        if session is not None:
+                            session.skipped.add(roots[index], SkippedRoots.SLOW)
+                        break
+            for item in found or ():
+                yield item
+    finally:
+        # 取消尚未开始的扫描；不等待仍在运行的扫描线程，它们会在检查取消令牌后尽快退出
+        for future in futures:
+            future.cancel()
+
@@ -0,0 +1,214 @@
+r"""启动图布局表 - 声明各类启动图的目录布局，并编译为前缀树一次遍历匹配
+
+每条布局为 (类型, 相对路径各级名称, 目标类型)：
+    ("seewo_new", ("EasiNote5_*", "Main", "Resources", "Startup", "SplashScreen.png"), "file")
+名称中可以使用通配符（* / ? / [...]，忽略大小写）。
+
+同一组布局编译为一棵前缀树：共享的前缀目录（如 Program Files\Seewo\EasiNote5、
+office6\mui\[语言]）只列举一次，一次遍历即可匹配组内全部布局，
+结果附带布局类型（希沃新版 / 旧版 / Banner、WPS 用户目录 / resource / res）。
+"""
+
+import fnmatch
+import os
+import stat
+
+
+# 布局类型
+SEEWO_OLD = "seewo_old"          # EasiNote5*\Main\Assets\SplashScreen.png
+SEEWO_NEW = "seewo_new"          # EasiNote5_*\Main\Resources\Startup\SplashScreen.png
+SEEWO_BANNER = "seewo_banner"    # 用户目录下的 Banner.png
+WPS_USER = "wps_user"            # 用户目录下的 WPS splash 目录
+WPS_RESOURCE = "wps_resource"    # 安装目录下 office6\mui\[语言]\resource\splash
+WPS_RES = "wps_res"              # 安装目录下 ...\res\splash
+
+# 目标类型
+TARGET_FILE = "file"
+TARGET_DIR = "dir"
+
+PROGRAM_FILES_DIRS = ("Program Files (x86)", "Program Files")
+
+# 希沃白板：相对于 ...\Seewo\EasiNote5 安装目录
+SEEWO_INSTALL_LAYOUTS = (
+    # 旧版路径格式
+    (SEEWO_OLD, ("EasiNote5*", "Main", "Assets", "SplashScreen.png"), TARGET_FILE),
+    # 新版路径格式
+    (SEEWO_NEW, ("EasiNote5_*", "Main", "Resources", "Startup", "SplashScreen.png"), TARGET_FILE),
+)
+
+# 希沃白板：注册表中的安装目录可能是 EasiNote5 目录本身，也可能已经是版本目录
+SEEWO_REGISTRY_LAYOUTS = SEEWO_INSTALL_LAYOUTS + (
+    (SEEWO_OLD, ("Main", "Assets", "SplashScreen.png"), TARGET_FILE),
+    (SEEWO_NEW, ("Main", "Resources", "Startup", "SplashScreen.png"), TARGET_FILE),
+)
+
+# 希沃白板：相对于盘符根目录（先 Banner，再 Program Files (x86)、Program Files）
+SEEWO_DRIVE_LAYOUTS = (
+    (
+        SEEWO_BANNER,
+        ("Users", "*", "AppData", "Roaming", "Seewo", "EasiNote5", "Resources", "Banner", "Banner.png"),
+        TARGET_FILE,
+    ),
+) + tuple(
+    (kind, (program_files, "Seewo", "EasiNote5") + parts, target)
+    for program_files in PROGRAM_FILES_DIRS
+    for kind, parts, target in SEEWO_INSTALL_LAYOUTS
+)
+
+# WPS：相对于安装根目录（按优先级排列）
+WPS_INSTALL_LAYOUTS = (
+    (WPS_RESOURCE, ("office6", "mui", "*", "resource", "splash"), TARGET_DIR),
+    (WPS_RES, ("office6", "mui", "*", "res", "splash"), TARGET_DIR),
+    (WPS_RES, ("office6", "res", "splash"), TARGET_DIR),
+    (WPS_RES, ("wps", "res", "splash"), TARGET_DIR),
+)
+
+# WPS：相对于用户目录
+WPS_USER_LAYOUTS = (
+    (
+        WPS_USER,
+        ("AppData", "Local", "Kingsoft", "WPS Office", "*", "office6", "mui", "*", "resource", "splash"),
+        TARGET_DIR,
+    ),
+)
+
+# WPS：相对于盘符根目录，安装根目录的顺序与原有扫描顺序一致
+WPS_PROGRAM_FILES_BASES = (
+    ("Program Files", "Kingsoft", "WPS Office"),
+    ("Program Files (x86)", "Kingsoft", "WPS Office"),
+    ("Program Files", "WPS Office"),
+    ("Program Files (x86)", "WPS Office"),
+)
+WPS_DRIVE_LAYOUTS = tuple(
+    (kind, base + parts, target)
+    for base in WPS_PROGRAM_FILES_BASES
+    for kind, parts, target in WPS_INSTALL_LAYOUTS
+)
+
+
+def _has_wildcard(name):
+    return any(ch in name for ch in "*?[")
+
+
+class _Node:
+    __slots__ = ("literals", "patterns", "terminals", "edges")
+
+    def __init__(self):
+        self.literals = {}   # {规范化名称: (原始名称, _Node)}
+        self.patterns = []   # [(通配符, _Node)]，按首次出现顺序
+        self.terminals = []  # [(布局序号, 类型, 目标类型)]
+        self.edges = []      # 压缩后的固定名称路径 [(各级名称, 终点 _Node)]
+
+
+class LayoutTrie:
+    r"""由布局表编译而成的前缀树
+
+    匹配时，含通配符的层级列举一次目录；只有固定名称的层级不列举目录，
+    而是把连续的固定名称合并为一条路径，只做一次 stat
+    （如 AppData\Roaming\Seewo\...\Banner.png、Program Files\Seewo\EasiNote5），
+    在 Users、Program Files 这类大目录下也不会产生完整列举。
+    """
+
+    def __init__(self, layouts):
+        self.layouts = tuple(layouts)
+        self._root = _Node()
+        for index, (kind, parts, target) in enumerate(self.layouts):
+            node = self._root
+            for part in parts:
+                node = self._child(node, part)
+            node.terminals.append((index, kind, target))
+        self._compress(self._root)
+
+    @staticmethod
+    def _child(node, part):
+        if _has_wildcard(part):
+            for pattern, child in node.patterns:
+                if pattern == part:
+                    return child
+            child = _Node()
+            node.patterns.append((part, child))
+            return child
+        key = os.path.normcase(part)
+        if key not in node.literals:
+            node.literals[key] = (part, _Node())
+        return node.literals[key][1]
+
+    def _compress(self, node):
+        """合并只有单一固定名称子节点的连续层级"""
+        for name, child in node.literals.values():
+            parts = [name]
+            while not child.terminals and not child.patterns and len(child.literals) == 1:
+                next_name, child = next(iter(child.literals.values()))
+                parts.append(next_name)
+            node.edges.append((tuple(parts), child))
+            self._compress(child)
+        for _, child in node.patterns:
+            self._compress(child)
+
+    def match(self, walker, base):
+        """从 base 开始一次遍历，匹配全部布局
+
+        Args:
+            walker: DirWalker（目录列举带缓存，支持取消）
+            base: 起始目录
+
+        Returns:
+            list: [(类型, 路径)]，按布局表顺序排列，同一布局内按目录列举顺序
+        """
+        found = []
+        self._walk(walker, self._root, base, found)
+        found.sort(key=lambda item: item[0])
+        return [(kind, path) for _, kind, path in found]
+
+    def _walk(self, walker, node, directory, found):
+        entries = None
+        if node.patterns:
+            entries = walker.entries(directory)
+            if not entries:
+                return
+
+        for parts, child in node.edges:
+            if entries is not None and len(parts) == 1:
+                # 本层已列举，直接使用 DirEntry 的类型信息
+                entry = entries.get(os.path.normcase(parts[0]))
+                if entry is not None:
+                    self._visit_entry(walker, child, entry, found)
+                continue
+            path = os.path.join(directory, *parts)
+            st = walker.stat(path)
+            if st is not None:
+                self._visit(walker, child, path, stat.S_ISDIR(st.st_mode), stat.S_ISREG(st.st_mode), found)
+
+        for pattern, child in node.patterns:
+            for entry in entries.values():
+                if fnmatch.fnmatch(entry.name, pattern):
+                    self._visit_entry(walker, child, entry, found)
+
+    def _visit_entry(self, walker, node, entry, found):
+        try:
+            entry_is_dir = entry.is_dir()
+            entry_is_file = not entry_is_dir and entry.is_file()
+        except OSError:
+            return
+        self._visit(walker, node, entry.path, entry_is_dir, entry_is_file, found)
+
+    def _visit(self, walker, node, path, path_is_dir, path_is_file, found):
+        for index, kind, target in node.terminals:
+            if path_is_dir if target == TARGET_DIR else path_is_file:
+                found.append((index, kind, path))
+        if path_is_dir:
+            self._walk(walker, node, path, found)
+
+
+def _select(layouts, *kinds):
+    return tuple(layout for layout in layouts if layout[0] in kinds)
+
+
+# 编译后的前缀树（模块加载时编译一次）
+SEEWO_REGISTRY_TRIE = LayoutTrie(SEEWO_REGISTRY_LAYOUTS)
+SEEWO_DRIVE_TRIE = LayoutTrie(SEEWO_DRIVE_LAYOUTS)
+SEEWO_BANNER_TRIE = LayoutTrie(_select(SEEWO_DRIVE_LAYOUTS, SEEWO_BANNER))
+SEEWO_SPLASHSCREEN_TRIE = LayoutTrie(_select(SEEWO_DRIVE_LAYOUTS, SEEWO_OLD, SEEWO_NEW))
+WPS_INSTALL_TRIE = LayoutTrie(WPS_INSTALL_LAYOUTS)
+WPS_USER_TRIE = LayoutTrie(WPS_USER_LAYOUTS)
+WPS_DRIVE_TRIE = LayoutTrie(WPS_DRIVE_LAYOUTS)
@@ -0,0 +1,100 @@
+"""WPS splash 目录快照 - 一次列举 splash 目录与 hdpi 子目录，供校验、计数与替换共用"""
+
+import os
+from utils.scan_engine import list_dir, child_dirs
+
+
+# WPS splash 目录必须包含的启动图文件（根目录与 hdpi 子目录各一套）
+WPS_SPLASH_FILES = (
+    "splash_default_bg.png",
+    "splash_sup_default_bg.png",
+    "splash_wps365_default_bg.png",
+)
+
+
+class SplashDirSnapshot:
+    """WPS splash 目录快照
+
+    创建时只列举 splash 目录与其 hdpi 子目录各一次，记录其中的启动图文件、大小与修改时间。
+    同一次用户操作中的校验、计数、界面显示与替换都使用同一个快照，不再重复访问目录。
+
+    属性:
+        splash_dir: splash 目录路径
+        valid: 根目录与 hdpi 目录下的启动图是否齐全
+        files: 存在的启动图文件列表（先根目录，再 hdpi），
+               每项为 {"path": 路径, "size": 字节数, "mtime": 修改时间（纳秒）}
+    """
+
+    def __init__(self, splash_dir, files, valid):
+        self.splash_dir = splash_dir
+        self.files = files
+        self.valid = valid
+
+    @classmethod
+    def capture(cls, splash_dir, with_stats=True):
+        """列举 splash 目录并创建快照
+
+        Args:
+            splash_dir: splash 目录路径
+            with_stats: 是否记录文件大小与修改时间（只需判断有效性时可以关闭）
+
+        Returns:
+            SplashDirSnapshot: 目录不存在时返回无效的空快照
+        """
+        if not splash_dir:
+            return cls(splash_dir, [], False)
+
+        entries = list_dir(splash_dir)
+        hdpi_dirs = child_dirs(entries, "hdpi")
+        hdpi_entries = list_dir(hdpi_dirs[0]) if hdpi_dirs else {}
+
+        files = []
+        valid = True
+        for directory, listing in (
+            (splash_dir, entries),
+            (os.path.join(splash_dir, "hdpi"), hdpi_entries),
+        ):
+            for filename in WPS_SPLASH_FILES:
+                info = cls._file_info(listing.get(os.path.normcase(filename)), with_stats)
+                if info is None:
+                    valid = False
+                    continue
+                info["path"] = os.path.join(directory, filename)
+                files.append(info)
+        return cls(splash_dir, files, valid)
+
+    @staticmethod
+    def _file_info(entry, with_stats):
+        """从 DirEntry 读取文件信息（Windows 上列举结果自带大小与时间，不产生额外调用）"""
+        if entry is None:
+            return None
+        try:
+            if not entry.is_file():
+                return None
+            if not with_stats:
+                return {"size": None, "mtime": None}
+            st = entry.stat()
+        except OSError:
+            return None
+        return {"size": st.st_size, "mtime": st.st_mtime_ns}
+
+    @property
+    def paths(self):
+        """存在的启动图文件路径列表"""
+        return [info["path"] for info in self.files]
+
+    @property
+    def file_count(self):
+        """存在的启动图文件数量"""
+        return len(self.files)
+
+    @property
+    def total_size(self):
+        """启动图文件总大小（字节）"""
+        return sum(info["size"] or 0 for info in self.files)
+
+    @property
+    def latest_mtime(self):
+        """最近一次修改时间（秒），没有文件时返回 None"""
+        mtimes = [info["mtime"] for info in self.files if info["mtime"] is not None]
+        return max(mtimes) / 1e9 if mtimes else None